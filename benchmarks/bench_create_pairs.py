@@ -0,0 +1,92 @@
+# benchmarks/bench_create_pairs.py
+"""
+Compara el muestreo vectorizado de `create_pairs_from_data` con la versión
+iterativa original, sobre etiquetas sintéticas del tamaño de dataset/variations.
+
+Uso:
+    python -m benchmarks.bench_create_pairs
+"""
+import time
+import numpy as np
+
+from src.ml_core.data.data_utils import create_pairs_from_data
+
+# --- CONFIGURACIÓN ---
+NUM_CLASSES = 68           # caracteres de generate_templates.CHARACTERS
+IMAGES_PER_CLASS = 800     # NUM_VARIATIONS_PER_TEMPLATE de augment_dataset.py
+REPEATS = 3
+
+
+def create_pairs_loop(images, labels):
+    """Versión iterativa original, conservada solo como referencia."""
+    num_classes = len(np.unique(labels))
+    map_label_to_indices = {label: np.flatnonzero(labels == label) for label in range(num_classes)}
+
+    pair_indices = []
+    pair_labels = []
+
+    num_images = len(images)
+    for i in range(num_images):
+        current_label = labels[i]
+
+        pos_idx = i
+        while pos_idx == i:
+            pos_idx = np.random.choice(map_label_to_indices[current_label])
+        pair_indices.append([i, pos_idx])
+        pair_labels.append(1.0)
+
+        neg_label = np.random.randint(0, num_classes)
+        while neg_label == current_label:
+            neg_label = np.random.randint(0, num_classes)
+        neg_idx = np.random.choice(map_label_to_indices[neg_label])
+        pair_indices.append([i, neg_idx])
+        pair_labels.append(0.0)
+
+    return np.array(pair_indices), np.array(pair_labels, dtype="float32")
+
+
+def check_pairs(pair_indices, pair_labels, labels):
+    """Verifica que los positivos sean de la misma clase (y no la misma imagen) y los negativos de otra."""
+    same_class = labels[pair_indices[:, 0]] == labels[pair_indices[:, 1]]
+    positives = pair_labels == 1.0
+    assert np.all(same_class[positives]), "Hay pares positivos de clases distintas."
+    assert np.all(pair_indices[positives, 0] != pair_indices[positives, 1]), "Hay pares positivos de una imagen consigo misma."
+    assert np.all(~same_class[~positives]), "Hay pares negativos de la misma clase."
+
+
+def best_time(fn, *args, **kwargs):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    rng = np.random.default_rng(0)
+    labels = rng.permutation(np.repeat(np.arange(NUM_CLASSES), IMAGES_PER_CLASS)).astype("int32")
+    # Solo se usa len(images): un array vacío por imagen basta para medir el muestreo
+    images = np.empty((len(labels), 0), dtype=np.uint8)
+    print(f"Benchmark con {len(labels)} imágenes y {NUM_CLASSES} clases (mejor de {REPEATS}).")
+
+    loop_time, (loop_pairs, loop_labels) = best_time(create_pairs_loop, images, labels)
+    check_pairs(loop_pairs, loop_labels, labels)
+
+    vec_time, (vec_pairs, vec_labels) = best_time(create_pairs_from_data, images, labels, seed=42)
+    check_pairs(vec_pairs, vec_labels, labels)
+    assert vec_pairs.shape == loop_pairs.shape and vec_labels.shape == loop_labels.shape
+
+    # Misma semilla, mismos pares
+    repeat_pairs, _ = create_pairs_from_data(images, labels, seed=42)
+    assert np.array_equal(vec_pairs, repeat_pairs), "La semilla no reproduce los mismos pares."
+
+    print("-" * 30)
+    print(f"Bucle original:  {loop_time:.3f} s")
+    print(f"Vectorizado:     {vec_time:.3f} s")
+    print(f"Aceleración:     {loop_time / vec_time:.1f}x")
+    print("-" * 30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_pair_pipeline.py
+"""
+Mide el rendimiento (pares/segundo) del pipeline de pares dentro del grafo
+frente al pipeline anterior basado en `tf.data.Dataset.from_generator`.
+
+Uso:
+    python -m benchmarks.bench_pair_pipeline
+"""
+import time
+import numpy as np
+import tensorflow as tf
+
+from src.ml_core.data.data_utils import create_pairs_from_data
+from src.ml_core.data.pair_pipeline import build_pair_dataset
+
+# --- CONFIGURACIÓN ---
+IMG_SHAPE = (128, 128, 1)
+NUM_CLASSES = 68
+IMAGES_PER_CLASS = 100
+BATCH_SIZE = 128
+NUM_BATCHES = 200
+WARMUP_BATCHES = 10
+
+
+def build_generator_dataset(images, pair_indices, pair_labels, batch_size):
+    """Pipeline anterior de train_siamese.py, conservado como referencia."""
+    def gen():
+        for (idx_a, idx_b), label in zip(pair_indices, pair_labels):
+            yield (images[idx_a], images[idx_b]), label
+
+    output_signature = (
+        (tf.TensorSpec(shape=IMG_SHAPE, dtype=tf.float32), tf.TensorSpec(shape=IMG_SHAPE, dtype=tf.float32)),
+        tf.TensorSpec(shape=(), dtype=tf.float32)
+    )
+    dataset = tf.data.Dataset.from_generator(gen, output_signature=output_signature)
+    return dataset.shuffle(len(pair_indices)).batch(batch_size).repeat().prefetch(tf.data.AUTOTUNE)
+
+
+def measure_pairs_per_second(dataset, batch_size):
+    iterator = iter(dataset)
+    for _ in range(WARMUP_BATCHES):
+        next(iterator)
+    start = time.perf_counter()
+    for _ in range(NUM_BATCHES):
+        next(iterator)
+    elapsed = time.perf_counter() - start
+    return NUM_BATCHES * batch_size / elapsed
+
+
+def main():
+    rng = np.random.default_rng(0)
+    labels = np.repeat(np.arange(NUM_CLASSES), IMAGES_PER_CLASS).astype("int32")
+    images = rng.random((len(labels), *IMG_SHAPE), dtype=np.float32)
+    pair_indices, pair_labels = create_pairs_from_data(images, labels, seed=0)
+    print(f"Benchmark con {len(images)} imágenes, {len(pair_indices)} pares, batch_size={BATCH_SIZE}.")
+
+    results = {
+        "from_generator": measure_pairs_per_second(
+            build_generator_dataset(images, pair_indices, pair_labels, BATCH_SIZE), BATCH_SIZE),
+        "in_graph_float32": measure_pairs_per_second(
+            build_pair_dataset(images, pair_indices, pair_labels, BATCH_SIZE, repeat=True), BATCH_SIZE),
+        "in_graph_uint8": measure_pairs_per_second(
+            build_pair_dataset((images * 255).astype(np.uint8), pair_indices, pair_labels, BATCH_SIZE, repeat=True), BATCH_SIZE),
+    }
+
+    print("-" * 30)
+    baseline = results["from_generator"]
+    for name, pairs_per_sec in results.items():
+        print(f"{name:<18} {pairs_per_sec:>10.0f} pares/s  ({pairs_per_sec / baseline:.1f}x)")
+    print("-" * 30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/fake_openai_server.py
+"""
+Servidor local compatible con la API de chat de OpenAI, para probar los
+generadores de feedback sin red ni costes.
+
+Responde a POST /v1/chat/completions con un JSON de feedback válido tras una
+latencia configurable, y puede fallar o tardar de más a propósito para
+ejercitar el plazo y el feedback por reglas de `AsyncLLMFeedbackGenerator`.
+También entiende las peticiones por lotes de `generate_feedback_batch`.
+
+Uso:
+    python -m benchmarks.fake_openai_server --port 8900 --latency 0.5 --slow-rate 0.2
+
+    generator = AsyncLLMFeedbackGenerator(api_key="test", base_url="http://localhost:8900/v1")
+"""
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    # Se configuran desde main()
+    latency = 0.5
+    slow_rate = 0.0
+    slow_latency = 10.0
+    error_rate = 0.0
+    requests_served = 0
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        type(self).requests_served += 1
+
+        time.sleep(self.slow_latency if random.random() < self.slow_rate else self.latency)
+        if random.random() < self.error_rate:
+            self.send_error(500, "Error simulado")
+            return
+
+        content = json.dumps(self.build_content(body), ensure_ascii=False)
+        payload = {
+            "id": f"chatcmpl-fake-{self.requests_served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def build_content(self, body):
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        if "'resultados'" in prompt:
+            # Petición por lotes: un resultado por práctica del bloque JSON del prompt
+            items = json.loads(prompt.split("```json", 1)[1].split("```", 1)[0])
+            return {"resultados": [
+                {"id": item["id"], "fortalezas": "¡Buen trabajo!", "areas_mejora": f"Consejo simulado para '{item['letra']}'."}
+                for item in items
+            ]}
+        return {
+            "fortalezas": "¡Buen trabajo! Tu trazo es claro.",
+            "areas_mejora": f"Consejo simulado número {self.requests_served}."
+        }
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso compatible con OpenAI para pruebas locales.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.5, help="Segundos por respuesta normal")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fracción de respuestas lentas")
+    parser.add_argument("--slow-latency", type=float, default=10.0, help="Segundos de una respuesta lenta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500")
+    args = parser.parse_args()
+
+    FakeChatHandler.latency = args.latency
+    FakeChatHandler.slow_rate = args.slow_rate
+    FakeChatHandler.slow_latency = args.slow_latency
+    FakeChatHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer(("localhost", args.port), FakeChatHandler)
+    print(f"Servidor OpenAI falso escuchando en http://localhost:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# benchmarks/load_test.py
+"""
+Prueba de carga de extremo a extremo de POST /analysis/perform.
+
+Levanta, en local:
+    - un servidor estático con imágenes sintéticas de distintos tamaños,
+    - un TraceService falso que registra cada PUT de resultados,
+    - la aplicación FastAPI (uvicorn en un subproceso), apuntando al TraceService falso.
+
+Después envía peticiones a ritmo fijo (bucle abierto: el ritmo no depende de
+lo que tarde el servicio) para cada ritmo de `--rates` y mide:
+    - rendimiento: análisis notificados por segundo,
+    - latencia de aceptación (hasta el 202) y de extremo a extremo (desde la
+      petición hasta que el PUT llega al TraceService): p50, p95 y p99,
+    - tasa de errores: respuestas distintas de 202 y análisis que nunca se notificaron.
+
+El resultado se guarda en JSON junto con el commit, para comparar entre versiones.
+
+Uso:
+    python -m benchmarks.load_test --rates 2,5,10 --duration 30 --mix small=0.6,medium=0.3,large=0.1
+    python -m benchmarks.load_test --rates 5 --compare benchmarks/results/load_test_<commit>.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import datetime
+import threading
+import subprocess
+import cv2
+import numpy as np
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# --- CONFIGURACIÓN ---
+RESULTS_DIR = "benchmarks/results"
+# Caracteres con plantilla que se piden en las prácticas
+CHARACTERS = list("abcdefghijklmnopqrstuvwxyz")
+# Clases de imagen: (ancho, alto, formato)
+IMAGE_CLASSES = {
+    "small": (128, 128, ".png"),
+    "medium": (640, 480, ".png"),
+    "large": (2048, 1536, ".jpg"),
+}
+VARIANTS_PER_CLASS = 20
+
+
+# --- Imágenes sintéticas ---
+
+def render_character_image(char: str, width: int, height: int, rng: random.Random) -> np.ndarray:
+    """Dibuja un caracter oscuro sobre papel claro, con inclinación, grosor y ruido aleatorios."""
+    image = np.full((height, width), rng.randint(200, 245), dtype=np.uint8)
+    scale = min(width, height) / 40.0 * rng.uniform(0.6, 0.9)
+    thickness = max(int(scale * rng.uniform(1.5, 3.0)), 1)
+    (text_w, text_h), _ = cv2.getTextSize(char, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    origin = ((width - text_w) // 2, (height + text_h) // 2)
+    cv2.putText(image, char, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, rng.randint(0, 60), thickness, cv2.LINE_AA)
+
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), rng.uniform(-12, 12), 1.0)
+    image = cv2.warpAffine(image, rotation, (width, height), borderMode=cv2.BORDER_REPLICATE)
+    noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, 6, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def build_image_set(seed: int = 0) -> Dict[str, List[Tuple[str, bytes, str]]]:
+    """
+    Genera las imágenes de cada clase de tamaño.
+
+    Returns:
+        Por clase, lista de (caracter, bytes codificados, content-type)
+    """
+    rng = random.Random(seed)
+    image_set = {}
+    for name, (width, height, extension) in IMAGE_CLASSES.items():
+        content_type = "image/png" if extension == ".png" else "image/jpeg"
+        variants = []
+        for _ in range(VARIANTS_PER_CLASS):
+            char = rng.choice(CHARACTERS)
+            ok, encoded = cv2.imencode(extension, render_character_image(char, width, height, rng))
+            if not ok:
+                raise RuntimeError(f"No se pudo codificar la imagen {name}.")
+            variants.append((char, encoded.tobytes(), content_type))
+        image_set[name] = variants
+    return image_set
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'small=0.6,large=0.4' -> {'small': 0.6, 'large': 0.4}"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in IMAGE_CLASSES:
+            raise ValueError(f"Clase de imagen desconocida: '{name}'. Opciones: {', '.join(IMAGE_CLASSES)}")
+        weights[name] = float(weight or 1.0)
+    return weights
+
+
+# --- Servicios locales ---
+
+class StaticImageHandler(BaseHTTPRequestHandler):
+    # name -> (bytes, content-type); se rellena desde main()
+    images: Dict[str, Tuple[bytes, str]] = {}
+
+    def do_GET(self):
+        image = self.images.get(self.path.lstrip("/"))
+        if image is None:
+            self.send_error(404)
+            return
+        data, content_type = image
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TraceRecorder:
+    """Guarda cuándo llega el PUT de cada práctica (reloj de `time.perf_counter`)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.arrivals: Dict[str, float] = {}
+        self.payloads_bytes = 0
+
+    def record(self, practice_id: str, size: int):
+        now = time.perf_counter()
+        with self._lock:
+            self.arrivals.setdefault(practice_id, now)
+            self.payloads_bytes += size
+
+    def arrival(self, practice_id: str) -> Optional[float]:
+        with self._lock:
+            return self.arrivals.get(practice_id)
+
+
+class StubTraceHandler(BaseHTTPRequestHandler):
+    recorder: TraceRecorder = None
+    path_pattern = re.compile(r"^/practices/([^/]+)/analysis/?$")
+
+    def do_PUT(self):
+        match = self.path_pattern.match(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if match is None:
+            self.send_error(404)
+            return
+        self.recorder.record(match.group(1), len(body))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler, port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("localhost", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app(port: int, trace_url: str, log_path: str) -> subprocess.Popen:
+    """Arranca la API con uvicorn en un subproceso y espera a que responda /health."""
+    env = dict(os.environ, TRACE_SERVICE_BASE_URL=trace_url)
+    log_file = open(log_path, "w", encoding="utf-8")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.adapters.api.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+    deadline = time.time() + 180  # La carga del modelo puede tardar
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"La API terminó al arrancar (código {process.returncode}); ver {log_path}")
+        try:
+            if requests.get(f"http://localhost:{port}/health", timeout=1).ok:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"La API no respondió a tiempo; ver {log_path}")
+
+
+# --- Generador de carga ---
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4),
+            "p99": round(float(p99), 4), "mean": round(float(np.mean(values)), 4)}
+
+
+def run_step(
+    app_url: str,
+    image_base_url: str,
+    image_set: Dict[str, List[Tuple[str, bytes, str]]],
+    mix: Dict[str, float],
+    recorder: TraceRecorder,
+    rate: float,
+    duration: float,
+    drain_timeout: float,
+    max_in_flight: int,
+    poisson: bool,
+    rng: random.Random
+) -> dict:
+    """Envía peticiones a `rate` por segundo durante `duration` segundos y mide el resultado."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+    session.mount("http://", adapter)
+
+    classes, weights = zip(*mix.items())
+    sent: List[dict] = []
+    lock = threading.Lock()
+
+    def send(record: dict):
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{app_url}/analysis/perform", json=record["payload"], timeout=30)
+            record["status"] = response.status_code
+        except requests.exceptions.RequestException as e:
+            record["status"] = type(e).__name__
+        record["accept_latency"] = time.perf_counter() - start
+
+    num_requests = max(int(rate * duration), 1)
+    step_start = time.perf_counter()
+    next_at = step_start
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for _ in range(num_requests):
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            image_class = rng.choices(classes, weights)[0]
+            index = rng.randrange(len(image_set[image_class]))
+            char = image_set[image_class][index][0]
+            practice_id = str(uuid.uuid4())
+            record = {
+                "practice_id": practice_id,
+                "image_class": image_class,
+                "sent_at": time.perf_counter(),
+                "payload": {
+                    "practice_id": practice_id,
+                    "image_url": f"{image_base_url}/{image_class}_{index}",
+                    "template_char": char
+                }
+            }
+            with lock:
+                sent.append(record)
+            executor.submit(send, record)
+            next_at += rng.expovariate(rate) if poisson else 1.0 / rate
+    send_window = time.perf_counter() - step_start
+
+    # Esperar a que lleguen los PUT de todo lo aceptado
+    accepted = [r for r in sent if r.get("status") == 202]
+    deadline = time.perf_counter() + drain_timeout
+    while time.perf_counter() < deadline and any(recorder.arrival(r["practice_id"]) is None for r in accepted):
+        time.sleep(0.05)
+
+    e2e, last_arrival = [], step_start
+    e2e_by_class: Dict[str, List[float]] = {name: [] for name in classes}
+    for record in accepted:
+        arrival = recorder.arrival(record["practice_id"])
+        if arrival is not None:
+            e2e.append(arrival - record["sent_at"])
+            e2e_by_class[record["image_class"]].append(arrival - record["sent_at"])
+            last_arrival = max(last_arrival, arrival)
+
+    rejected = len(sent) - len(accepted)
+    not_notified = len(accepted) - len(e2e)
+    elapsed = max(last_arrival - step_start, send_window)
+    return {
+        "offered_rate": rate,
+        "achieved_send_rate": round(len(sent) / send_window, 3),
+        "requests": len(sent),
+        "completed": len(e2e),
+        "throughput": round(len(e2e) / elapsed, 3) if elapsed > 0 else 0.0,
+        "accept_latency": percentiles([r["accept_latency"] for r in sent if "accept_latency" in r]),
+        "e2e_latency": percentiles(e2e),
+        "e2e_latency_by_image_class": {name: percentiles(values) for name, values in e2e_by_class.items()},
+        "http_error_rate": round(rejected / len(sent), 4),
+        "not_notified_rate": round(not_notified / max(len(accepted), 1), 4),
+        "error_rate": round((rejected + not_notified) / len(sent), 4),
+        "status_counts": {str(k): sum(1 for r in sent if r.get("status") == k) for k in {r.get("status") for r in sent}}
+    }
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(report: dict, baseline_path: str):
+    """Muestra la diferencia de rendimiento y latencia p95 con un informe anterior, ritmo a ritmo."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {step["offered_rate"]: step for step in baseline["steps"]}
+    print(f"\nComparación con {baseline_path} (commit {baseline.get('commit')}):")
+    for step in report["steps"]:
+        old = previous.get(step["offered_rate"])
+        if old is None:
+            continue
+        new_p95, old_p95 = step["e2e_latency"]["p95"], old["e2e_latency"]["p95"]
+        p95_change = f"{(new_p95 / old_p95 - 1) * 100:+.1f}%" if new_p95 and old_p95 else "n/a"
+        print(f"  {step['offered_rate']:>6} req/s | rendimiento {old['throughput']:.2f} -> {step['throughput']:.2f} | "
+              f"p95 e2e {old_p95} -> {new_p95} s ({p95_change}) | errores {old['error_rate']} -> {step['error_rate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de /analysis/perform con servicios locales.")
+    parser.add_argument("--rates", default="2,5,10", help="Ritmos a probar, en peticiones por segundo")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de envío por ritmo")
+    parser.add_argument("--mix", default="small=0.6,medium=0.3,large=0.1", help="Proporción de cada clase de imagen")
+    parser.add_argument("--poisson", action="store_true", help="Llegadas de Poisson en lugar de a intervalos fijos")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="Segundos a esperar los PUT tras cada ritmo")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Peticiones HTTP simultáneas como máximo")
+    parser.add_argument("--warmup", type=int, default=5, help="Peticiones previas, fuera de la medida")
+    parser.add_argument("--app-port", type=int, default=8000)
+    parser.add_argument("--app-url", default=None,
+                        help="Usar una API ya arrancada (debe apuntar su TRACE_SERVICE_BASE_URL al TraceService falso)")
+    parser.add_argument("--trace-port", type=int, default=8901)
+    parser.add_argument("--images-port", type=int, default=8902)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados (por defecto, con el commit en el nombre)")
+    parser.add_argument("--compare", default=None, help="Informe anterior con el que comparar")
+    args = parser.parse_args()
+
+    rates = [float(rate) for rate in args.rates.split(",")]
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+
+    print("Generando imágenes sintéticas...")
+    image_set = build_image_set(args.seed)
+    StaticImageHandler.images = {
+        f"{name}_{i}": (data, content_type)
+        for name, variants in image_set.items()
+        for i, (_, data, content_type) in enumerate(variants)
+    }
+    recorder = TraceRecorder()
+    StubTraceHandler.recorder = recorder
+    servers = [start_server(StaticImageHandler, args.images_port), start_server(StubTraceHandler, args.trace_port)]
+    image_base_url = f"http://localhost:{args.images_port}"
+    trace_url = f"http://localhost:{args.trace_port}"
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    app_process = None
+    app_url = args.app_url
+    if app_url is None:
+        print("Arrancando la API...")
+        app_process = start_app(args.app_port, trace_url, os.path.join(RESULTS_DIR, "load_test_app.log"))
+        app_url = f"http://localhost:{args.app_port}"
+
+    try:
+        if args.warmup:
+            print(f"Calentando con {args.warmup} peticiones...")
+            run_step(app_url, image_base_url, image_set, mix, recorder, rate=max(args.warmup / 2, 1),
+                     duration=2, drain_timeout=args.drain_timeout, max_in_flight=args.max_in_flight,
+                     poisson=False, rng=rng)
+
+        steps = []
+        for rate in rates:
+            print(f"\nRitmo {rate} req/s durante {args.duration:.0f} s...")
+            step = run_step(app_url, image_base_url, image_set, mix, recorder, rate, args.duration,
+                            args.drain_timeout, args.max_in_flight, args.poisson, rng)
+            steps.append(step)
+            e2e = step["e2e_latency"]
+            print(f"  rendimiento: {step['throughput']} análisis/s | e2e p50/p95/p99: "
+                  f"{e2e['p50']}/{e2e['p95']}/{e2e['p99']} s | errores: {step['error_rate'] * 100:.1f}%")
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        for server in servers:
+            server.shutdown()
+
+    commit = current_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            "rates": rates, "duration": args.duration, "mix": mix, "poisson": args.poisson,
+            "image_classes": {name: list(spec) for name, spec in IMAGE_CLASSES.items()}
+        },
+        "steps": steps
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test_{commit or 'local'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        print_comparison(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# benchmarks/microbench.py
+"""
+Microbenchmarks por componente, para seguir su rendimiento entre versiones.
+
+Cubre:
+    - preprocess_image con imágenes pequeñas (PNG 128x128) y grandes (foto JPEG 2048x2048),
+    - cada analizador de geometric_analysis, _skeletonize y find_main_contour,
+    - el embedding de la red base con batches de 1 a 256,
+    - el cálculo de distancias a las plantillas (TemplateIndex).
+
+Las imágenes se generan con `generate_templates` (plantillas) y el pipeline de
+`augment_dataset` (variaciones manuscritas), sin depender de dataset/.
+
+Por cada benchmark se informa de operaciones por segundo (mejor de varias
+repeticiones) y de la memoria que reserva una operación según tracemalloc
+(pico y retenida). tracemalloc ve las reservas de Python y NumPy (incluidas
+las salidas de OpenCV), pero no las internas de OpenCV ni de TensorFlow.
+
+Uso:
+    python -m benchmarks.microbench --save-baseline
+    python -m benchmarks.microbench --filter preprocess --threshold 0.1
+    python -m benchmarks.microbench --model ml_models/registry/v3/model
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import itertools
+import subprocess
+import tempfile
+import tracemalloc
+import cv2
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.ml_core.data import generate_templates
+from src.ml_core.data.augment_dataset import transform as augment_transform
+from src.ml_core.image_preprocessor import preprocess_image, binarize_image
+from src.ml_core.geometric_analysis.proportion_analyzer import analyze_proportion
+from src.ml_core.geometric_analysis.inclination_analyzer import analyze_inclination
+from src.ml_core.geometric_analysis.internal_spacing_analyzer import analyze_internal_spacing
+from src.ml_core.geometric_analysis.stroke_consistency_analyzer import analyze_stroke_consistency, _skeletonize
+from src.ml_core.utils.image_preprocessor import find_main_contour
+from src.ml_core.template_index import TemplateIndex
+
+# --- CONFIGURACIÓN ---
+DEFAULT_BASELINE_PATH = "benchmarks/results/microbench_baseline.json"
+# Caída de ops/s (fracción) a partir de la cual se considera una regresión
+DEFAULT_THRESHOLD = 0.15
+# Caracteres con los que se generan las imágenes (incluye letras con y sin huecos internos)
+CHARACTERS = list("aeghlmoqsBDPR8")
+VARIATIONS_PER_CHAR = 6
+LARGE_SIZE = (2048, 2048)
+EMBEDDING_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+# Banco de plantillas sintético para las distancias: caracteres x variantes
+TEMPLATE_CHARS = 68
+TEMPLATE_VARIANTS = 4
+DISTANCE_BATCH_SIZES = [1, 64, 256]
+ALLOCATION_CALLS = 5
+
+
+# --- Datos sintéticos ---
+
+def build_images(seed: int = 0) -> Dict[str, list]:
+    """
+    Genera plantillas con `generate_templates` y variaciones con el pipeline de
+    `augment_dataset`, y las prepara en los formatos que consume cada componente.
+    """
+    np.random.seed(seed)  # albumentations usa el generador global
+    templates, variations = [], []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for char in CHARACTERS:
+            path = os.path.join(tmp_dir, f"{ord(char[0])}.png")
+            generate_templates.generate_character_image(char, path)
+            template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            templates.append(template)
+            variations.extend(augment_transform(image=template)["image"] for _ in range(VARIATIONS_PER_CHAR))
+
+    rng = np.random.default_rng(seed)
+    small_bytes = [cv2.imencode(".png", image)[1].tobytes() for image in variations]
+    # Foto grande: la variación ampliada, con el fondo gris y ruido de cámara, en JPEG
+    large_bytes = []
+    for image in variations[::VARIATIONS_PER_CHAR]:
+        photo = cv2.resize(image, LARGE_SIZE, interpolation=cv2.INTER_CUBIC).astype(np.float32) * 0.8 + 30
+        photo += rng.normal(0, 8, photo.shape)
+        large_bytes.append(cv2.imencode(".jpg", np.clip(photo, 0, 255).astype(np.uint8))[1].tobytes())
+
+    return {
+        "small_bytes": small_bytes,
+        "large_bytes": large_bytes,
+        "user_bin": [binarize_image(data) for data in small_bytes],
+        "template_bin": [binarize_image(cv2.imencode(".png", t)[1].tobytes()) for t in templates],
+        "model_inputs": np.stack([preprocess_image(data) for data in small_bytes]),
+    }
+
+
+# --- Medición ---
+
+def cycling(items) -> Callable:
+    """Devuelve una función que entrega los elementos por turnos (para no medir siempre la misma entrada)."""
+    iterator = itertools.cycle(items)
+    return lambda: next(iterator)
+
+
+def measure_speed(fn: Callable[[], object], min_time: float, repeats: int) -> Tuple[float, float]:
+    """
+    Ejecuta `fn` en `repeats` tandas de al menos `min_time / repeats` segundos.
+
+    Returns:
+        Tupla de (ops/s de la mejor tanda, ops/s de la mediana)
+    """
+    fn()  # Calentamiento: cachés, trazado del grafo, carga perezosa
+    # Calibrar el número de llamadas por tanda
+    calls, target = 1, min_time / repeats
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or calls >= 1 << 20:
+            break
+        calls = max(calls * 2, int(calls * target / max(elapsed, 1e-9)))
+
+    rates = [calls / elapsed]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        rates.append(calls / (time.perf_counter() - start))
+    return max(rates), float(np.median(rates))
+
+
+def measure_allocations(fn: Callable[[], object], calls: int = ALLOCATION_CALLS) -> Dict[str, float]:
+    """
+    Memoria por llamada según tracemalloc (en KiB): el pico durante la llamada
+    y la que sigue reservada al volver, incluido el resultado.
+    """
+    tracemalloc.start()
+    try:
+        peaks, retained = [], []
+        for _ in range(calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = fn()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+            del result
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": round(max(peaks) / 1024, 1), "retained_kib": round(float(np.median(retained)) / 1024, 1)}
+
+
+# --- Benchmarks ---
+
+def build_benchmarks(data: Dict[str, list], model_path: Optional[str]) -> List[Tuple[str, Callable, int]]:
+    """
+    Returns:
+        Lista de (nombre, función sin argumentos, elementos procesados por llamada)
+    """
+    small, large = cycling(data["small_bytes"]), cycling(data["large_bytes"])
+    pairs = [
+        (user, data["template_bin"][i // VARIATIONS_PER_CHAR])
+        for i, user in enumerate(data["user_bin"])
+    ]
+    user, pair = cycling(data["user_bin"]), cycling(pairs)
+
+    benchmarks = [
+        ("preprocess_image[small]", lambda: preprocess_image(small()), 1),
+        ("preprocess_image[large]", lambda: preprocess_image(large()), 1),
+        ("analyze_proportion", lambda: analyze_proportion(*pair()), 1),
+        ("analyze_inclination", lambda: analyze_inclination(user()), 1),
+        ("analyze_internal_spacing", lambda: analyze_internal_spacing(*pair()), 1),
+        ("analyze_stroke_consistency", lambda: analyze_stroke_consistency(user()), 1),
+        ("_skeletonize", lambda: _skeletonize(user()), 1),
+        ("find_main_contour", lambda: find_main_contour(user()), 1),
+    ]
+
+    # Embedding: el coste no depende de los pesos, así que sin modelo se usa la red base sin entrenar
+    if model_path:
+        from src.ml_core.model_registry import load_base_model
+        base_model = load_base_model(model_path)
+    else:
+        from src.ml_core.models import build_base_network
+        base_model = build_base_network()
+    inputs = data["model_inputs"]
+    for batch_size in EMBEDDING_BATCH_SIZES:
+        batch = inputs[np.arange(batch_size) % len(inputs)]
+        benchmarks.append((f"embed[batch={batch_size}]", lambda b=batch: base_model.predict(b, verbose=0), batch_size))
+
+    # Distancias a las plantillas: embeddings reales como consultas, banco sintético del tamaño habitual
+    queries_pool = base_model.predict(inputs, verbose=0)
+    rng = np.random.default_rng(0)
+    bank = rng.normal(size=(TEMPLATE_CHARS * TEMPLATE_VARIANTS, queries_pool.shape[1])).astype(np.float32)
+    chars = [f"c{i}" for i in range(TEMPLATE_CHARS) for _ in range(TEMPLATE_VARIANTS)]
+    for aggregation in ("min", "softmin"):
+        index = TemplateIndex(chars, bank, aggregation=aggregation)
+        for batch_size in DISTANCE_BATCH_SIZES:
+            queries = queries_pool[np.arange(batch_size) % len(queries_pool)]
+            benchmarks.append((
+                f"template_distances[{aggregation},batch={batch_size}]",
+                lambda q=queries, idx=index: idx.distances(q),
+                batch_size
+            ))
+    return benchmarks
+
+
+def compare_with_baseline(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Nombres de los benchmarks cuyo ops/s cayó más que `threshold` respecto a la referencia."""
+    regressions = []
+    print(f"\n{'benchmark':<42} {'referencia':>12} {'actual':>12} {'cambio':>9}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<42} {'-':>12} {result['ops_per_sec']:>12.1f} {'nuevo':>9}")
+            continue
+        change = result["ops_per_sec"] / reference["ops_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  <-- REGRESIÓN"
+        print(f"{name:<42} {reference['ops_per_sec']:>12.1f} {result['ops_per_sec']:>12.1f} {change * 100:>+8.1f}%{flag}")
+    return regressions
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de preprocesamiento, analizadores y embedding.")
+    parser.add_argument("--filter", default=None, help="Solo los benchmarks cuyo nombre contenga este texto")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Segundos de medida por benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="Tandas por benchmark (se informa la mejor)")
+    parser.add_argument("--model", default=None, help="Modelo para el embedding (por defecto, red base sin entrenar)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Resultados de referencia")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar estos resultados como nueva referencia")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Caída de ops/s (fracción) que se considera regresión")
+    parser.add_argument("--output", default=None, help="Archivo JSON donde guardar estos resultados")
+    args = parser.parse_args()
+
+    print("Generando imágenes sintéticas...")
+    data = build_images()
+    benchmarks = build_benchmarks(data, args.model)
+    if args.filter:
+        benchmarks = [b for b in benchmarks if args.filter in b[0]]
+
+    results = {}
+    for name, fn, items_per_call in benchmarks:
+        best, median = measure_speed(fn, args.min_time, args.repeats)
+        results[name] = {
+            "ops_per_sec": round(best, 2),
+            "median_ops_per_sec": round(median, 2),
+            "items_per_sec": round(best * items_per_call, 2),
+            **measure_allocations(fn)
+        }
+        r = results[name]
+        print(f"{name:<42} {r['ops_per_sec']:>12.1f} ops/s {r['items_per_sec']:>12.1f} elem/s "
+              f"pico {r['peak_kib']:>9.1f} KiB  retenida {r['retained_kib']:>7.1f} KiB")
+
+    report = {
+        "commit": current_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.save_baseline:
+        # Se fusiona con la referencia existente para que --filter no borre el resto
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.setdefault("results", {}).update(results)
+        baseline.update(commit=report["commit"], timestamp=report["timestamp"])
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nReferencia guardada en {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo hay referencia en {args.baseline}; usa --save-baseline para crearla.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"Comparación con la referencia del commit {baseline.get('commit')} (umbral {args.threshold * 100:.0f}%):")
+    regressions = compare_with_baseline(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regresiones: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nSin regresiones.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# src/adapters/api/admin_routes.py
+from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+
+from typing import Optional
+from src.adapters.api.analysis_routes import handwriting_service_singleton
+from src.config import settings
+
+router = APIRouter(prefix="/admin/models", tags=["Administración de Modelos"])
+
+# --- Endpoints ---
+
+@router.get("", status_code=status.HTTP_200_OK)
+def list_models():
+    """
+    Lista las versiones del registro y el estado del modelo activo.
+    """
+    registry = handwriting_service_singleton.registry
+    shadow = handwriting_service_singleton.shadow
+    return {
+        "active_version": handwriting_service_singleton.model_version,
+        "loading_version": handwriting_service_singleton.loading_version,
+        "last_error": handwriting_service_singleton.last_swap_error,
+        "available_versions": registry.list_versions() if registry else [],
+        "shadow": {"version": shadow.version, "sample_rate": shadow.sample_rate, "stats": dict(shadow.stats)} if shadow else None
+    }
+
+
+@router.post("/{version}/activate", status_code=status.HTTP_202_ACCEPTED)
+def activate_model(version: str, background_tasks: BackgroundTasks):
+    """
+    Carga y calienta una versión en segundo plano y la pone en servicio sin reiniciar.
+    """
+    registry = handwriting_service_singleton.registry
+    if registry is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No hay un registro de modelos configurado.")
+    if version not in registry.list_versions():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"La versión '{version}' no existe en el registro.")
+    if handwriting_service_singleton.loading_version is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ya se está cargando la versión '{handwriting_service_singleton.loading_version}'."
+        )
+
+    # Si la carga falla, el modelo anterior sigue activo y el error queda en last_swap_error
+    def _activate():
+        try:
+            handwriting_service_singleton.activate_version(version)
+        except Exception as e:
+            print(f"No se activó la versión '{version}': {e}")
+
+    background_tasks.add_task(_activate)
+    return {"version": version, "status": "LOADING"}
+
+
+@router.post("/{version}/shadow", status_code=status.HTTP_202_ACCEPTED)
+def enable_shadow_model(
+    version: str,
+    background_tasks: BackgroundTasks,
+    sample_rate: Optional[float] = None,
+    cpu_share: Optional[float] = None
+):
+    """
+    Ejecuta una versión candidata en sombra sobre una muestra del tráfico real.
+    Las comparaciones se registran en el archivo configurado en SHADOW_LOG_PATH.
+    """
+    registry = handwriting_service_singleton.registry
+    if registry is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No hay un registro de modelos configurado.")
+    if version not in registry.list_versions():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"La versión '{version}' no existe en el registro.")
+
+    options = {
+        "sample_rate": sample_rate if sample_rate is not None else settings.shadow_sample_rate,
+        "cpu_share": cpu_share if cpu_share is not None else settings.shadow_cpu_share,
+        "max_workers": settings.shadow_max_workers,
+        "log_path": settings.shadow_log_path
+    }
+    if not 0.0 <= options["sample_rate"] <= 1.0 or not 0.0 < options["cpu_share"] <= 1.0:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="sample_rate o cpu_share fuera de rango.")
+
+    def _enable():
+        try:
+            handwriting_service_singleton.enable_shadow(version, **options)
+        except Exception as e:
+            print(f"Error al activar la inferencia en sombra con '{version}': {e}")
+
+    background_tasks.add_task(_enable)
+    return {"version": version, "status": "LOADING", **options}
+
+
+@router.delete("/shadow", status_code=status.HTTP_200_OK)
+def disable_shadow_model():
+    """
+    Desactiva la inferencia en sombra.
+    """
+    handwriting_service_singleton.disable_shadow()
+    return {"status": "DISABLED"}
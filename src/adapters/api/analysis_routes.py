@@ -1,18 +1,29 @@
 # src/adapters/api/analysis_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from src.use_cases.dtos import AnalysisRequestDTO, AnalysisResponseDTO
+import uuid
+import threading
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from src.use_cases.dtos import (
+    AnalysisRequestDTO, AnalysisResponseDTO, AnalysisUploadResponseDTO,
+    AnalysisBulkRequestDTO, AnalysisBulkResponseDTO, StrokeAnalysisRequestDTO
+)
 from src.use_cases.perform_analysis import PerformAnalysisUseCase
 
 # Importación de nuestras dependencias
 from src.ml_core.analysis_service import HandwritingAnalysisService
 from src.adapters.trace_service_adapter import TraceServiceAdapter
+from src.config import settings
 
 router = APIRouter(prefix="/analysis", tags=["Análisis de Caligrafía"])
 
 # --- Inyección de Dependencias (Singleton para el modelo de IA) ---
 # Creamos una única instancia del servicio de análisis para que el modelo de ML
 # se cargue en memoria solo una vez al iniciar la aplicación.
-handwriting_service_singleton = HandwritingAnalysisService()
+handwriting_service_singleton = HandwritingAnalysisService(
+    registry_dir=settings.model_registry_dir,
+    template_aggregation=settings.template_aggregation
+)
 trace_service_adapter_singleton = TraceServiceAdapter()
 
 def get_perform_analysis_use_case() -> PerformAnalysisUseCase:
@@ -21,6 +32,80 @@ def get_perform_analysis_use_case() -> PerformAnalysisUseCase:
         trace_service_adapter=trace_service_adapter_singleton
     )
 
+
+class AnalysisQueue:
+    """
+    Cuenta los análisis en cola o en curso, para decidir si una petición
+    síncrona puede atenderse al momento sin esperar detrás de las demás.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.depth = 0
+
+    def enter(self):
+        with self._lock:
+            self.depth += 1
+
+    def leave(self):
+        with self._lock:
+            self.depth -= 1
+
+    def run(self, fn, *args):
+        """Ejecuta una tarea ya contada con `enter` y la descuenta al terminar."""
+        try:
+            return fn(*args)
+        finally:
+            self.leave()
+
+analysis_queue = AnalysisQueue()
+
+# Tamaño de cada lectura del cuerpo de la petición
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+async def read_upload(request: Request) -> bytes:
+    """
+    Lee la imagen de una petición multipart (campo 'image' o 'file') o del
+    cuerpo crudo, por trozos y sin superar `settings.max_upload_bytes`.
+
+    En multipart el formulario se analiza entero antes de poder contar los
+    bytes del archivo, así que se exige Content-Length para acotarlo antes.
+    """
+    limit = settings.max_upload_bytes
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"La imagen supera el máximo de {limit} bytes."
+    )
+    declared = request.headers.get("content-length")
+    # Margen para las cabeceras de las partes en multipart
+    if declared and declared.isdigit() and int(declared) > limit + UPLOAD_CHUNK_BYTES:
+        raise too_large
+
+    buffer = bytearray()
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        if not (declared and declared.isdigit()):
+            raise HTTPException(
+                status_code=status.HTTP_411_LENGTH_REQUIRED,
+                detail="Las subidas multipart deben indicar Content-Length; sin él, envía la imagen como cuerpo crudo."
+            )
+        form = await request.form()
+        upload = form.get("image") or form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Falta el archivo 'image'.")
+        while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+            buffer.extend(chunk)
+            if len(buffer) > limit:
+                raise too_large
+    else:
+        async for chunk in request.stream():
+            buffer.extend(chunk)
+            if len(buffer) > limit:
+                raise too_large
+
+    if not buffer:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="La imagen está vacía.")
+    return bytes(buffer)
+
 # --- Endpoints ---
 
 @router.post("/perform", response_model=AnalysisResponseDTO, status_code=status.HTTP_202_ACCEPTED)
@@ -37,10 +122,181 @@ async def perform_analysis(
     # El análisis de IA puede tardar. Lo ejecutamos como una tarea en segundo plano
     # para no bloquear la respuesta HTTP. El cliente recibe un 202 Aceptado
     # y nuestro servicio trabaja por detrás.
-    background_tasks.add_task(use_case.execute, request)
+    analysis_queue.enter()
+    background_tasks.add_task(analysis_queue.run, use_case.execute, request)
     
     return AnalysisResponseDTO(
         practice_id=str(request.practice_id),
         status="QUEUED",
         message="La solicitud de análisis ha sido aceptada y está en proceso."
-    )
\ No newline at end of file
+    )
+
+
+@router.post("/perform-upload", response_model=AnalysisUploadResponseDTO, status_code=status.HTTP_202_ACCEPTED)
+async def perform_analysis_upload(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    practice_id: uuid.UUID,
+    template_char: Optional[str] = None,
+    expected_word: Optional[str] = None,
+    sync: bool = False,
+    use_case: PerformAnalysisUseCase = Depends(get_perform_analysis_use_case)
+):
+    """
+    Recibe la imagen en la propia petición (multipart o cuerpo crudo) en lugar
+    de una URL, evitando la descarga desde el almacenamiento.
+
+    Indica `template_char` para un solo caracter o `expected_word` para una
+    palabra completa: la imagen se segmenta en glifos y cada uno se puntúa
+    contra su caracter esperado en una sola pasada.
+
+    Con `sync=true` y pocos análisis en cola, analiza al momento y devuelve las
+    puntuaciones en la respuesta (200); la notificación al TraceService se hace
+    igualmente en segundo plano. Si la cola está ocupada, se encola como siempre (202).
+    """
+    if (template_char is None) == (expected_word is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Indica exactamente uno de 'template_char' o 'expected_word'."
+        )
+    word_mode = expected_word is not None
+    expected = expected_word if word_mode else template_char
+
+    image_bytes = await read_upload(request)
+    print(f"Recibida imagen de {len(image_bytes)} bytes para practice_id: {practice_id}")
+
+    if sync and analysis_queue.depth < settings.sync_analysis_max_queue:
+        analysis_queue.enter()
+        try:
+            # La inferencia es bloqueante: se ejecuta fuera del bucle de eventos
+            analyze = use_case.analyze_word if word_mode else use_case.analyze
+            results = await run_in_threadpool(analyze, image_bytes, expected)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        finally:
+            analysis_queue.leave()
+        background_tasks.add_task(use_case.notify, practice_id, results)
+        response.status_code = status.HTTP_200_OK
+        return AnalysisUploadResponseDTO(
+            practice_id=str(practice_id),
+            status="COMPLETED",
+            message="Análisis completado; la notificación al TraceService está en proceso.",
+            results=results
+        )
+
+    analysis_queue.enter()
+    background_tasks.add_task(analysis_queue.run, use_case.execute_bytes, practice_id, expected, image_bytes, word_mode)
+    return AnalysisUploadResponseDTO(
+        practice_id=str(practice_id),
+        status="QUEUED",
+        message="La imagen ha sido recibida y el análisis está en proceso."
+    )
+
+
+@router.post("/perform-strokes", response_model=AnalysisUploadResponseDTO, status_code=status.HTTP_202_ACCEPTED)
+async def perform_analysis_strokes(
+    request: StrokeAnalysisRequestDTO,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    sync: bool = False,
+    use_case: PerformAnalysisUseCase = Depends(get_perform_analysis_use_case)
+):
+    """
+    Recibe el caracter como trazos vectoriales (puntos x, y, t y presión
+    opcionales) capturados por una tableta, en lugar de una imagen.
+
+    Los trazos se dibujan directamente en el canvas de la red: la petición
+    ocupa unos pocos KB y no hay decodificación ni umbral adaptativo. El modo
+    `sync` funciona igual que en `/perform-upload`.
+    """
+    num_points = sum(len(stroke) for stroke in request.strokes)
+    if num_points == 0:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="No se recibió ningún trazo.")
+    if num_points > settings.max_stroke_points:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se admiten como máximo {settings.max_stroke_points} puntos por petición."
+        )
+    print(f"Recibidos {len(request.strokes)} trazos ({num_points} puntos) para practice_id: {request.practice_id}")
+
+    if sync and analysis_queue.depth < settings.sync_analysis_max_queue:
+        analysis_queue.enter()
+        try:
+            results = await run_in_threadpool(
+                use_case.analyze_strokes, request.strokes, request.template_char, settings.stroke_pen_width
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        finally:
+            analysis_queue.leave()
+        background_tasks.add_task(use_case.notify, request.practice_id, results)
+        response.status_code = status.HTTP_200_OK
+        return AnalysisUploadResponseDTO(
+            practice_id=str(request.practice_id),
+            status="COMPLETED",
+            message="Análisis completado; la notificación al TraceService está en proceso.",
+            results=results
+        )
+
+    analysis_queue.enter()
+    background_tasks.add_task(analysis_queue.run, use_case.execute_strokes, request, settings.stroke_pen_width)
+    return AnalysisUploadResponseDTO(
+        practice_id=str(request.practice_id),
+        status="QUEUED",
+        message="Los trazos han sido recibidos y el análisis está en proceso."
+    )
+
+
+@router.post("/perform-bulk", response_model=AnalysisBulkResponseDTO, status_code=status.HTTP_202_ACCEPTED)
+async def perform_analysis_bulk(
+    request: AnalysisBulkRequestDTO,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    sync: bool = False,
+    use_case: PerformAnalysisUseCase = Depends(get_perform_analysis_use_case)
+):
+    """
+    Recibe muchas prácticas en una sola petición (por ejemplo, una hoja de ejercicios).
+
+    Se procesan como un único trabajo: descargas en paralelo, una sola pasada
+    por la red y notificaciones en bloque. Con `sync=true` y la cola libre se
+    espera al resultado y se devuelve el estado final de cada práctica (200);
+    si no, se encola (202) y cada práctica queda como QUEUED.
+    """
+    items = request.items
+    if not items:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="La lista de prácticas está vacía.")
+    if len(items) > settings.max_bulk_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se admiten como máximo {settings.max_bulk_items} prácticas por petición."
+        )
+    if len({item.practice_id for item in items}) != len(items):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Hay practice_id repetidos en la petición.")
+    print(f"Recibida solicitud de análisis masivo con {len(items)} prácticas.")
+
+    if sync and analysis_queue.depth < settings.sync_analysis_max_queue:
+        analysis_queue.enter()
+        try:
+            results = await run_in_threadpool(use_case.execute_bulk, items)
+        finally:
+            analysis_queue.leave()
+        response.status_code = status.HTTP_200_OK
+        completed = sum(result.status == "COMPLETED" for result in results)
+        return AnalysisBulkResponseDTO(
+            status="COMPLETED",
+            message=f"{completed} de {len(items)} prácticas completadas.",
+            items=results
+        )
+
+    analysis_queue.enter()
+    background_tasks.add_task(analysis_queue.run, use_case.execute_bulk, items)
+    return AnalysisBulkResponseDTO(
+        status="QUEUED",
+        message=f"{len(items)} prácticas aceptadas; el análisis está en proceso.",
+        items=[
+            AnalysisResponseDTO(practice_id=str(item.practice_id), status="QUEUED", message="En proceso.")
+            for item in items
+        ]
+    )
@@ -2,7 +2,7 @@
 from fastapi import FastAPI, status
 
 # Importamos el router que contiene nuestros endpoints de análisis
-from src.adapters.api import analysis_routes
+from src.adapters.api import analysis_routes, admin_routes, stream_routes
 
 # --- Creación de la Aplicación Principal FastAPI ---
 app = FastAPI(
@@ -13,6 +13,8 @@ app = FastAPI(
 
 # --- Inclusión de Rutas ---
 app.include_router(analysis_routes.router)
+app.include_router(admin_routes.router)
+app.include_router(stream_routes.router)
 
 # --- Endpoints de Nivel de Aplicación ---
 @app.get("/health", status_code=status.HTTP_200_OK, tags=["Monitoring"])
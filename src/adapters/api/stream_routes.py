@@ -0,0 +1,133 @@
+# src/adapters/api/stream_routes.py
+import json
+import uuid
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+
+from src.adapters.api.analysis_routes import handwriting_service_singleton, get_perform_analysis_use_case
+from src.use_cases.stream_scoring import InferenceBatcher, StrokeStreamSession, TokenBucket
+from src.config import settings
+
+router = APIRouter(prefix="/analysis", tags=["Análisis de Caligrafía"])
+
+# Un único batcher para todas las sesiones: sus puntuaciones comparten las pasadas por la red
+stream_batcher = InferenceBatcher(
+    handwriting_service_singleton,
+    max_batch_size=settings.stream_max_batch_size,
+    max_wait_ms=settings.stream_max_batch_wait_ms,
+    pen_width=settings.stroke_pen_width
+)
+active_sessions = 0
+
+# --- Endpoints ---
+
+@router.websocket("/stream")
+async def stream_analysis(websocket: WebSocket):
+    """
+    Puntúa el caracter mientras el alumno lo escribe.
+
+    Mensajes del cliente (JSON):
+        {"type": "start", "template_char": "a", "practice_id": "..."}   practice_id es opcional
+        {"type": "stroke", "points": [[x, y, t, presion], ...]}          empieza un trazo
+        {"type": "points", "points": [[x, y, t, presion], ...]}          continúa el último trazo
+        {"type": "undo"} / {"type": "clear"}
+        {"type": "finish"}                                               puntuación final y cierre
+
+    Mensajes del servidor:
+        {"type": "score", "revision": n, "results": {...}}   puntuación parcial (con límite de frecuencia)
+        {"type": "final", "results": {...}}                  se notifica al TraceService si hay practice_id
+        {"type": "error", "detail": "..."}
+    """
+    global active_sessions
+    await websocket.accept()
+    if active_sessions >= settings.stream_max_sessions:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Demasiadas sesiones abiertas.")
+        return
+    active_sessions += 1
+
+    scorer = None
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        # El bucle de recepción y el de puntuación escriben en el mismo socket
+        async with send_lock:
+            await websocket.send_json(message)
+
+    try:
+        start = await websocket.receive_json()
+        template_char = start.get("template_char") if isinstance(start, dict) and start.get("type") == "start" else None
+        if not template_char or template_char not in handwriting_service_singleton.templates:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Se esperaba un mensaje 'start' con un template_char válido.")
+            return
+        practice_id = start.get("practice_id")
+        if practice_id is not None:
+            practice_id = uuid.UUID(str(practice_id))
+
+        session = StrokeStreamSession(
+            stream_batcher, template_char,
+            min_interval=settings.stream_min_score_interval,
+            max_points=settings.max_stroke_points
+        )
+        limiter = TokenBucket(settings.stream_messages_per_second, settings.stream_message_burst)
+        scorer = asyncio.create_task(session.run_scorer(send))
+
+        while True:
+            message = json.loads(await websocket.receive_text())
+            if not limiter.allow():
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Demasiados mensajes por segundo.")
+                return
+            kind = message.get("type") if isinstance(message, dict) else None
+            try:
+                if kind == "stroke":
+                    session.add_stroke(message.get("points") or [])
+                elif kind == "points":
+                    session.extend_stroke(message.get("points") or [])
+                elif kind == "undo":
+                    session.undo()
+                elif kind == "clear":
+                    session.clear()
+                elif kind == "finish":
+                    break
+                else:
+                    await send({"type": "error", "detail": f"Tipo de mensaje desconocido: {kind}"})
+            except (ValueError, TypeError) as e:
+                # El cambio no se aplica; la sesión sigue con el dibujo anterior
+                await send({"type": "error", "detail": str(e)})
+
+        scorer.cancel()
+        try:
+            results = await session.score_now()
+        except ValueError as e:
+            await send({"type": "error", "detail": str(e)})
+            await websocket.close()
+            return
+        except Exception as e:
+            print(f"Error al puntuar la sesión de trazos: {e}")
+            await send({"type": "error", "detail": f"Ocurrió un error al puntuar: {e}"})
+            await websocket.close()
+            return
+        await send({"type": "final", "results": results})
+        if practice_id is not None:
+            await run_in_threadpool(get_perform_analysis_use_case().notify, practice_id, results)
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        pass
+    except ValueError:
+        # JSON o practice_id inválidos
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason="Mensaje inválido.")
+    finally:
+        if scorer is not None:
+            scorer.cancel()
+        active_sessions -= 1
+
+
+@router.get("/stream/stats", status_code=status.HTTP_200_OK)
+def stream_stats():
+    """
+    Sesiones abiertas y estadísticas de los batches de inferencia del streaming.
+    """
+    stats = dict(stream_batcher.stats)
+    stats["mean_batch"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+    return {"active_sessions": active_sessions, **stats}
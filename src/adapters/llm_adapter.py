@@ -2,21 +2,49 @@
 
 import os
 import json
-from openai import OpenAI
-from typing import Dict, Any, List
+import asyncio
+import inspect
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, Any, Callable, List, Optional
+
+from src.adapters.llm_feedback_cache import FeedbackCache
+from src.ml_core.feedback_generator import RuleBasedFeedbackGenerator
+
+SYSTEM_MESSAGE = "Eres un asistente servicial que solo responde en formato JSON."
+
+# El rol y la personalidad del tutor de IA
+ROLE_DEFINITION = (
+    "Actúa como un tutor de caligrafía experto, amable, motivador y muy conciso. "
+    "Tu objetivo es ayudar a un adulto analfabeta a mejorar su escritura a mano."
+)
+
+# Estimación de tokens sin tokenizador: ~4 caracteres por token en español
+CHARS_PER_TOKEN = 4
 
 class LLMFeedbackGenerator:
     """
     Se comunica con un Modelo de Lenguaje Grande (LLM) para generar
     feedback de caligrafía personalizado y empático.
     """
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        cache: Optional[FeedbackCache] = None,
+        use_cache: bool = True,
+        base_url: Optional[str] = None,
+        timeout: float = 30.0
+    ):
         """
         Inicializa el cliente de OpenAI.
         
         Args:
             api_key: Tu clave de API de OpenAI. Si es None, intentará
                      leerla de la variable de entorno OPENAI_API_KEY.
+            cache: Caché de respuestas a usar. Si es None, se crea una en memoria.
+            use_cache: Si False, se llama al LLM en cada petición.
+            base_url: URL de un servidor compatible con OpenAI (por ejemplo, uno local de pruebas).
+                      Si es None, se usa la API de OpenAI (o OPENAI_BASE_URL).
+            timeout: Segundos máximos de cada llamada a la API.
         """
         if api_key is None:
             api_key = os.getenv("OPENAI_API_KEY")
@@ -24,12 +52,16 @@ class LLMFeedbackGenerator:
             raise ValueError("No se encontró la clave de API de OpenAI. "
                              "Por favor, configúrala en la variable de entorno OPENAI_API_KEY.")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = self._create_client(api_key=api_key, base_url=base_url, timeout=timeout)
         self.model = "gpt-4o" # Puedes cambiar a "gpt-3.5-turbo" si prefieres
+        self.cache = (cache if cache is not None else FeedbackCache()) if use_cache else None
 
-    def _build_prompt(self, character: str, metrics: Dict[str, Any]) -> str:
+    def _create_client(self, **client_options):
+        return OpenAI(**client_options)
+
+    def _summarize_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Construye el prompt detallado para el LLM a partir de las métricas de análisis.
+        Reduce las métricas a lo que ve el LLM: la puntuación general y la peor métrica.
         """
         # 1. Identificar la fortaleza principal y el área de mejora principal
         # Se asume que las métricas contienen un 'score' entre 0 y 100.
@@ -57,15 +89,22 @@ class LLMFeedbackGenerator:
                 "codigo": details.get("deviation_code", "N/A"),
                 "puntuacion": details.get("score", "N/A")
             })
+        return prompt_data
+
+    def _cache_key(self, character: str, metrics: Dict[str, Any]):
+        # Ojo: una caché vacía es "falsa" (len == 0), por eso se compara con None
+        if self.cache is None:
+            return None
+        return self.cache.make_key(character, self._summarize_metrics(metrics))
+
+    def _build_prompt(self, character: str, metrics: Dict[str, Any]) -> str:
+        """
+        Construye el prompt detallado para el LLM a partir de las métricas de análisis.
+        """
+        prompt_data = self._summarize_metrics(metrics)
             
         # 3. Construir el prompt final usando una plantilla
         
-        # El rol y la personalidad del tutor de IA
-        role_definition = (
-            "Actúa como un tutor de caligrafía experto, amable, motivador y muy conciso. "
-            "Tu objetivo es ayudar a un adulto analfabeta a mejorar su escritura a mano."
-        )
-        
         # El contexto y los datos del análisis
         context = (
             f"El usuario acaba de practicar la letra '{character}'. "
@@ -84,7 +123,7 @@ class LLMFeedbackGenerator:
         )
 
         prompt = f"""
-        {role_definition}
+        {ROLE_DEFINITION}
 
         {context}
         ```json
@@ -96,6 +135,162 @@ class LLMFeedbackGenerator:
         
         return prompt.strip()
 
+    def _build_batch_prompt(self, items: List[Dict[str, Any]]) -> str:
+        """
+        Construye un único prompt para varias prácticas.
+
+        Args:
+            items: Entradas compactas {"id", "letra", "datos"}, donde "datos" es
+                   el resultado de `_summarize_metrics`
+        """
+        task = (
+            "Para CADA práctica de la lista, basado SOLAMENTE en sus datos, genera un consejo. "
+            "1. Empieza con un comentario positivo y de ánimo general. "
+            "2. Luego, enfócate en el área de mejora más importante (la métrica con la puntuación más baja) "
+            "y da un consejo práctico y accionable. "
+            "3. Sé breve y directo. Evita usar los nombres técnicos de las métricas o los códigos de error. "
+            "4. Tu respuesta DEBE ser un objeto JSON válido con una única clave 'resultados': una lista con "
+            "un objeto por práctica, con las claves 'id' (el mismo de la entrada), 'fortalezas' y 'areas_mejora'. "
+            "No incluyas nada más en tu respuesta."
+        )
+        # JSON compacto: en un lote, los espacios de indentación se pagan en cada práctica
+        items_json = json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+        return f"{ROLE_DEFINITION}\n\nPrácticas de escritura (JSON):\n```json\n{items_json}\n```\n\n{task}"
+
+    def _pack_batches(
+        self,
+        items: List[Dict[str, Any]],
+        max_prompt_tokens: int,
+        max_items_per_request: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Agrupa las entradas en lotes cuyo prompt estimado no supera `max_prompt_tokens`."""
+        overhead = len(self._build_batch_prompt([])) // CHARS_PER_TOKEN
+        batches, current, current_tokens = [], [], overhead
+        for item in items:
+            item_tokens = len(json.dumps(item, ensure_ascii=False, separators=(",", ":"))) // CHARS_PER_TOKEN + 1
+            if current and (current_tokens + item_tokens > max_prompt_tokens or len(current) >= max_items_per_request):
+                batches.append(current)
+                current, current_tokens = [], overhead
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _parse_batch_feedback(self, content: str, expected_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Extrae el feedback válido de cada práctica de una respuesta por lotes.
+        Las entradas mal formadas, repetidas o con un id desconocido se descartan.
+        """
+        results = json.loads(content).get("resultados", [])
+        expected = set(expected_ids)
+        valid = {}
+        for entry in results if isinstance(results, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            item_id = str(entry.get("id"))
+            fortalezas, areas_mejora = entry.get("fortalezas"), entry.get("areas_mejora")
+            if item_id in expected and item_id not in valid \
+                    and isinstance(fortalezas, str) and fortalezas.strip() \
+                    and isinstance(areas_mejora, str) and areas_mejora.strip():
+                valid[item_id] = {"fortalezas": fortalezas, "areas_mejora": areas_mejora}
+        return valid
+
+    def generate_feedback_batch(
+        self,
+        practices: List[Dict[str, Any]],
+        max_prompt_tokens: int = 3000,
+        max_items_per_request: int = 40
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Genera feedback para muchas prácticas con pocas llamadas al LLM.
+
+        Pensado para cargas masivas (recálculo nocturno, informes de clase). Las
+        prácticas se empaquetan en lotes que respetan un presupuesto de tokens y
+        comparten el rol y las instrucciones; cada resultado se valida, y solo
+        las prácticas que faltan o vienen mal formadas se reintentan una a una
+        con `generate_feedback`.
+
+        Args:
+            practices: Lista de {"id", "character", "metrics"}
+            max_prompt_tokens: Tokens estimados máximos por prompt
+            max_items_per_request: Prácticas máximas por llamada (acota también la respuesta)
+
+        Returns:
+            Diccionario {id: {"fortalezas", "areas_mejora"}}
+        """
+        feedback_by_id, pending, cache_keys, batches = self._prepare_batches(
+            practices, max_prompt_tokens, max_items_per_request
+        )
+        for batch in batches:
+            batch_ids = [item["id"] for item in batch]
+            try:
+                response = self.client.chat.completions.create(**self._completion_options(self._build_batch_prompt(batch)))
+                valid = self._parse_batch_feedback(response.choices[0].message.content, batch_ids)
+            except Exception as e:
+                print(f"Error en la llamada por lotes al LLM: {e}")
+                valid = {}
+            self._store_batch_feedback(valid, feedback_by_id, cache_keys)
+
+        # Reintento individual solo de lo que falló
+        for practice in self._failed_practices(practices, pending, feedback_by_id):
+            feedback_by_id[str(practice["id"])] = self.generate_feedback(practice["character"], practice["metrics"])
+        return feedback_by_id
+
+    def _prepare_batches(self, practices: List[Dict[str, Any]], max_prompt_tokens: int, max_items_per_request: int):
+        """Resuelve desde la caché lo que se pueda y empaqueta el resto en lotes."""
+        feedback_by_id: Dict[str, Dict[str, str]] = {}
+        pending, cache_keys = [], {}
+        for practice in practices:
+            item_id = str(practice["id"])
+            cache_key = self._cache_key(practice["character"], practice["metrics"])
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                feedback_by_id[item_id] = cached
+                continue
+            cache_keys[item_id] = cache_key
+            pending.append({"id": item_id, "letra": practice["character"], "datos": self._summarize_metrics(practice["metrics"])})
+
+        batches = self._pack_batches(pending, max_prompt_tokens, max_items_per_request)
+        print(f"Feedback por lotes: {len(practices)} prácticas, {len(feedback_by_id)} desde la caché, "
+              f"{len(pending)} en {len(batches)} llamada(s) al LLM.")
+        return feedback_by_id, pending, cache_keys, batches
+
+    def _store_batch_feedback(self, valid: Dict[str, Dict[str, str]], feedback_by_id: Dict[str, Dict[str, str]], cache_keys: Dict[str, Any]):
+        for item_id, feedback in valid.items():
+            feedback_by_id[item_id] = feedback
+            if cache_keys[item_id] is not None:
+                self.cache.put(cache_keys[item_id], feedback)
+
+    def _failed_practices(self, practices: List[Dict[str, Any]], pending: List[Dict[str, Any]], feedback_by_id: Dict[str, Dict[str, str]]):
+        """Prácticas sin feedback válido tras las llamadas por lotes."""
+        by_id = {str(practice["id"]): practice for practice in practices}
+        failed = [by_id[item["id"]] for item in pending if item["id"] not in feedback_by_id]
+        if failed:
+            print(f"Reintentando {len(failed)} práctica(s) de forma individual.")
+        return failed
+
+    def _completion_options(self, prompt: str) -> Dict[str, Any]:
+        """Argumentos de `chat.completions.create`, comunes al cliente síncrono y al asíncrono."""
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5, # Un poco de creatividad, pero no demasiada
+            response_format={"type": "json_object"} # Forzar la salida JSON
+        )
+
+    def _parse_feedback(self, content: str) -> Dict[str, str]:
+        """Parsea y valida la respuesta JSON del LLM."""
+        feedback = json.loads(content)
+        
+        # Asegurarse de que las claves esperadas existan
+        if "fortalezas" not in feedback or "areas_mejora" not in feedback:
+            raise KeyError("La respuesta del LLM no contiene las claves esperadas.")
+        return feedback
+
     def generate_feedback(self, character: str, metrics: Dict[str, Any]) -> Dict[str, str]:
         """
         Llama a la API del LLM para generar feedback y parsea la respuesta.
@@ -107,6 +302,12 @@ class LLMFeedbackGenerator:
         Returns:
             Un diccionario con las claves "fortalezas" y "areas_mejora".
         """
+        cache_key = self._cache_key(character, metrics)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         prompt = self._build_prompt(character, metrics)
         
         try:
@@ -114,26 +315,17 @@ class LLMFeedbackGenerator:
             print(f"Prompt enviado a {self.model}:")
             print(prompt)
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un asistente servicial que solo responde en formato JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5, # Un poco de creatividad, pero no demasiada
-                response_format={"type": "json_object"} # Forzar la salida JSON
-            )
+            response = self.client.chat.completions.create(**self._completion_options(prompt))
             
             content = response.choices[0].message.content
             print(f"Respuesta recibida del LLM: {content}")
             
             # Parsear la respuesta JSON del LLM
-            feedback = json.loads(content)
-            
-            # Asegurarse de que las claves esperadas existan
-            if "fortalezas" not in feedback or "areas_mejora" not in feedback:
-                raise KeyError("La respuesta del LLM no contiene las claves esperadas.")
-                
+            feedback = self._parse_feedback(content)
+
+            # Solo se cachean respuestas válidas: el feedback genérico de error no
+            if cache_key is not None:
+                self.cache.put(cache_key, feedback)
             return feedback
 
         except Exception as e:
@@ -142,4 +334,169 @@ class LLMFeedbackGenerator:
             return {
                 "fortalezas": "¡Sigue practicando! La constancia es la clave para mejorar.",
                 "areas_mejora": "Hubo un problema al generar el consejo. Por favor, inténtalo de nuevo."
-            }
\ No newline at end of file
+            }
+
+
+class AsyncLLMFeedbackGenerator(LLMFeedbackGenerator):
+    """
+    Variante asíncrona de `LLMFeedbackGenerator` para usar dentro de un bucle de asyncio.
+
+    Cada petición tiene un plazo (`deadline_seconds`) y un semáforo limita las
+    llamadas simultáneas al LLM. Si el plazo vence (incluida la espera en el
+    semáforo) o la llamada falla, se responde al momento con el feedback de
+    `RuleBasedFeedbackGenerator`. La llamada al LLM sigue en curso: cuando
+    termina, su respuesta se guarda en la caché y, si se indicó `on_upgrade`,
+    se entrega para actualizar el resultado ya almacenado.
+
+    Las llamadas tardías no se acumulan: si al vencer el plazo aún esperaban
+    turno en el semáforo se cancelan (no llegaron a cargar al proveedor), y
+    de las que ya estaban en curso se conservan como mucho `max_late_calls`.
+    """
+    def __init__(
+        self,
+        api_key: str = None,
+        cache: Optional[FeedbackCache] = None,
+        use_cache: bool = True,
+        base_url: Optional[str] = None,
+        timeout: float = 30.0,
+        deadline_seconds: float = 2.0,
+        max_concurrency: int = 8,
+        max_late_calls: Optional[int] = None,
+        fallback: Optional[RuleBasedFeedbackGenerator] = None
+    ):
+        """
+        Args:
+            deadline_seconds: Tiempo máximo de espera por el LLM antes de usar el feedback por reglas
+            max_concurrency: Llamadas simultáneas máximas al LLM
+            max_late_calls: Llamadas en curso que se conservan tras vencer su plazo (por defecto, max_concurrency)
+            fallback: Generador por reglas (por defecto, uno nuevo)
+            (el resto, como en `LLMFeedbackGenerator`; `timeout` acota la llamada tardía)
+        """
+        super().__init__(api_key=api_key, cache=cache, use_cache=use_cache, base_url=base_url, timeout=timeout)
+        self.deadline_seconds = deadline_seconds
+        self.fallback = fallback or RuleBasedFeedbackGenerator()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_late_calls = max_late_calls if max_late_calls is not None else max_concurrency
+        # Referencias fuertes: el bucle de eventos solo guarda referencias débiles a las tareas
+        self._late_tasks = set()
+        self._upgrade_tasks = set()
+        self.stats = {
+            "llm": 0, "cache": 0, "fallback_deadline": 0, "fallback_error": 0,
+            "upgrades": 0, "late_cancelled": 0
+        }
+
+    def _create_client(self, **client_options):
+        return AsyncOpenAI(**client_options)
+
+    async def _call_llm(self, prompt: str, started: Optional[asyncio.Event] = None) -> Dict[str, str]:
+        async with self._semaphore:
+            if started is not None:
+                started.set()
+            response = await self.client.chat.completions.create(**self._completion_options(prompt))
+        return self._parse_feedback(response.choices[0].message.content)
+
+    def _finish_late_call(self, task: "asyncio.Task", cache_key, on_upgrade: Optional[Callable]):
+        """Guarda la respuesta que llegó después del plazo y avisa a quien quiera actualizar el resultado."""
+        self._late_tasks.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            return
+        feedback = task.result()
+        if cache_key is not None:
+            self.cache.put(cache_key, feedback)
+        if on_upgrade is not None:
+            self.stats["upgrades"] += 1
+            result = on_upgrade(feedback)
+            if inspect.isawaitable(result):
+                upgrade_task = asyncio.ensure_future(result)
+                self._upgrade_tasks.add(upgrade_task)
+                upgrade_task.add_done_callback(self._upgrade_tasks.discard)
+
+    async def _call_llm_batch(self, batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+        batch_ids = [item["id"] for item in batch]
+        try:
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(**self._completion_options(self._build_batch_prompt(batch)))
+            return self._parse_batch_feedback(response.choices[0].message.content, batch_ids)
+        except Exception as e:
+            print(f"Error en la llamada por lotes al LLM: {e}")
+            return {}
+
+    async def generate_feedback_batch(
+        self,
+        practices: List[Dict[str, Any]],
+        max_prompt_tokens: int = 3000,
+        max_items_per_request: int = 40
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Versión asíncrona de `LLMFeedbackGenerator.generate_feedback_batch`.
+
+        Los lotes se envían a la vez (limitados por el semáforo) y sin plazo,
+        solo con el `timeout` del cliente; los reintentos individuales sí usan
+        `generate_feedback` con su plazo y su feedback por reglas.
+        """
+        feedback_by_id, pending, cache_keys, batches = self._prepare_batches(
+            practices, max_prompt_tokens, max_items_per_request
+        )
+        for valid in await asyncio.gather(*(self._call_llm_batch(batch) for batch in batches)):
+            self._store_batch_feedback(valid, feedback_by_id, cache_keys)
+
+        failed = self._failed_practices(practices, pending, feedback_by_id)
+        retried = await asyncio.gather(*(
+            self.generate_feedback(practice["character"], practice["metrics"]) for practice in failed
+        ))
+        for practice, feedback in zip(failed, retried):
+            feedback_by_id[str(practice["id"])] = feedback
+        return feedback_by_id
+
+    async def generate_feedback(
+        self,
+        character: str,
+        metrics: Dict[str, Any],
+        on_upgrade: Optional[Callable[[Dict[str, str]], Any]] = None
+    ) -> Dict[str, str]:
+        """
+        Genera feedback sin esperar más de `deadline_seconds` al LLM.
+
+        Args:
+            character: La letra que fue analizada.
+            metrics: El diccionario completo de métricas de los analizadores geométricos.
+            on_upgrade: Función (o corrutina) que recibe el feedback del LLM si llega
+                        después del plazo, para sustituir al feedback por reglas ya entregado.
+
+        Returns:
+            Un diccionario con las claves "fortalezas" y "areas_mejora".
+        """
+        cache_key = self._cache_key(character, metrics)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.stats["cache"] += 1
+                return cached
+
+        started = asyncio.Event()
+        task = asyncio.ensure_future(self._call_llm(self._build_prompt(character, metrics), started))
+        try:
+            # shield: al vencer el plazo se deja de esperar, pero la llamada no se cancela
+            feedback = await asyncio.wait_for(asyncio.shield(task), timeout=self.deadline_seconds)
+        except asyncio.TimeoutError:
+            self.stats["fallback_deadline"] += 1
+            if (
+                (cache_key is None and on_upgrade is None)  # Nadie aprovecharía la respuesta tardía
+                or not started.is_set()  # Aún esperaba turno: no llamar al proveedor si ya va sobrecargado
+                or len(self._late_tasks) >= self.max_late_calls
+            ):
+                task.cancel()
+                self.stats["late_cancelled"] += 1
+            else:
+                self._late_tasks.add(task)
+                task.add_done_callback(lambda t: self._finish_late_call(t, cache_key, on_upgrade))
+            return self.fallback.generate_feedback(metrics)
+        except Exception as e:
+            print(f"Error al comunicarse con la API del LLM: {e}")
+            self.stats["fallback_error"] += 1
+            return self.fallback.generate_feedback(metrics)
+
+        self.stats["llm"] += 1
+        if cache_key is not None:
+            self.cache.put(cache_key, feedback)
+        return feedback
@@ -0,0 +1,211 @@
+# src/adapters/llm_feedback_cache.py
+
+import os
+import json
+import time
+import atexit
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+FeedbackKey = Tuple[str, Any, str, str, Any]
+
+# Respuestas del LLM (repetidas o no) que se aceptan por variante antes de dar la clave por completa
+MAX_ATTEMPTS_PER_VARIANT = 2
+
+
+def _bucket(score: Any, bucket_size: int) -> Any:
+    """Redondea una puntuación 0-100 hacia abajo a su tramo; deja igual lo que no es numérico."""
+    if isinstance(score, (int, float)):
+        return int(score // bucket_size) * bucket_size
+    return score
+
+
+class FeedbackCache:
+    """
+    Caché de respuestas del LLM para feedback de caligrafía.
+
+    El prompt solo depende del caracter, la puntuación general y la peor métrica
+    (nombre, código de desviación y puntuación), así que con las puntuaciones
+    agrupadas en tramos el espacio de claves es pequeño. Cada clave guarda
+    varias respuestas distintas que se devuelven por turnos, para que el mismo
+    error no reciba siempre el mismo texto.
+
+    Una clave se sirve desde su primera respuesta. Mientras no reúna
+    `variants_per_key` variantes, una fracción `refresh_rate` de los aciertos
+    se trata como fallo para pedir otra al LLM; como las respuestas cortas se
+    repiten a menudo, la clave se da por completa tras
+    `MAX_ATTEMPTS_PER_VARIANT * variants_per_key` respuestas aunque no sean distintas.
+
+    Las claves se expulsan por LRU cuando se supera `max_keys` y caducan tras
+    `ttl_seconds`. Si se indica `persist_path`, la caché se guarda en un JSON
+    y se recupera al reiniciar el servicio. `put` solo marca la caché como
+    modificada: un hilo la escribe cada `save_interval_seconds` (y al salir del
+    proceso o con `close`), fuera del lock y del bucle de eventos.
+    """
+    def __init__(
+        self,
+        max_keys: int = 2048,
+        ttl_seconds: float = 7 * 24 * 3600,
+        variants_per_key: int = 3,
+        refresh_rate: float = 0.2,
+        bucket_size: int = 10,
+        persist_path: Optional[str] = None,
+        save_interval_seconds: float = 30.0
+    ):
+        """
+        Args:
+            max_keys: Número máximo de claves en memoria
+            ttl_seconds: Segundos que una clave sigue siendo válida desde su primera respuesta
+            variants_per_key: Respuestas distintas a reunir por clave antes de dejar de llamar al LLM
+            refresh_rate: Fracción de aciertos que piden otra variante mientras la clave no está completa
+            bucket_size: Anchura de los tramos de puntuación (0-100)
+            persist_path: Archivo JSON donde persistir la caché (opcional)
+            save_interval_seconds: Cada cuánto se escriben en disco los cambios pendientes
+        """
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self.variants_per_key = variants_per_key
+        self.refresh_rate = refresh_rate
+        self.bucket_size = bucket_size
+        self.persist_path = persist_path
+        self.save_interval_seconds = save_interval_seconds
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "evictions": 0, "expirations": 0}
+
+        self._entries: "OrderedDict[FeedbackKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializa las escrituras a disco (hilo periódico, `flush` manual y salida del proceso)
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        if persist_path:
+            if os.path.exists(persist_path):
+                self._load()
+            threading.Thread(target=self._save_periodically, name="feedback-cache-saver", daemon=True).start()
+            atexit.register(self.flush)
+
+    def make_key(self, character: str, prompt_data: Dict[str, Any]) -> FeedbackKey:
+        """
+        Construye la clave a partir de los datos del prompt de `LLMFeedbackGenerator`.
+        """
+        overall = _bucket(prompt_data.get("puntuacion_general", "N/A"), self.bucket_size)
+        worst = (prompt_data.get("metricas_principales") or [{}])[0]
+        return (
+            character,
+            overall,
+            worst.get("metrica", ""),
+            worst.get("codigo", ""),
+            _bucket(worst.get("puntuacion", "N/A"), self.bucket_size)
+        )
+
+    def get(self, key: FeedbackKey) -> Optional[Dict[str, str]]:
+        """
+        Devuelve una de las respuestas guardadas para la clave, o None si hay que llamar al LLM
+        (la clave no existe, caducó o, con probabilidad `refresh_rate`, aún le faltan variantes).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                entry = None
+            if entry is None or not entry["variants"]:
+                self.stats["misses"] += 1
+                return None
+            if not self._is_complete(entry) and random.random() < self.refresh_rate:
+                self.stats["refreshes"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            variant = entry["variants"][entry["next"] % len(entry["variants"])]
+            entry["next"] += 1
+            return dict(variant)
+
+    def put(self, key: FeedbackKey, feedback: Dict[str, str]):
+        """Añade una respuesta del LLM a la clave (si aún no está completa y no está repetida)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"variants": [], "attempts": 0, "next": 0, "created_at": time.time()}
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self._is_complete(entry):
+                return
+            entry["attempts"] += 1
+            self._dirty = True
+            if feedback in entry["variants"]:
+                return
+            entry["variants"].append(dict(feedback))
+
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_complete(self, entry: Dict[str, Any]) -> bool:
+        return (
+            len(entry["variants"]) >= self.variants_per_key
+            or entry["attempts"] >= MAX_ATTEMPTS_PER_VARIANT * self.variants_per_key
+        )
+
+    def flush(self):
+        """Escribe en disco los cambios pendientes (no hace nada sin `persist_path` o sin cambios)."""
+        if not self.persist_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                # Bajo el lock solo se copian las referencias; la serialización y la escritura van fuera
+                records: List[Dict[str, Any]] = [
+                    {"key": list(key), "variants": list(entry["variants"]), "attempts": entry["attempts"], "created_at": entry["created_at"]}
+                    for key, entry in self._entries.items()
+                ]
+                self._dirty = False
+            try:
+                self._save(records)
+            except OSError as e:
+                print(f"No se pudo guardar la caché de feedback '{self.persist_path}': {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def close(self):
+        """Detiene el guardado periódico y escribe los cambios pendientes."""
+        self._stop.set()
+        self.flush()
+
+    def _save_periodically(self):
+        while not self._stop.wait(self.save_interval_seconds):
+            self.flush()
+
+    def _save(self, records: List[Dict[str, Any]]):
+        # Escritura atómica: un reinicio nunca lee un JSON a medias
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
+
+    def _load(self):
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer la caché de feedback '{self.persist_path}': {e}")
+            return
+        now = time.time()
+        for record in records[-self.max_keys:]:
+            if now - record["created_at"] <= self.ttl_seconds:
+                variants = record["variants"][:self.variants_per_key]
+                self._entries[tuple(record["key"])] = {
+                    "variants": variants,
+                    "attempts": record.get("attempts", len(variants)),
+                    "next": 0,
+                    "created_at": record["created_at"]
+                }
+        print(f"Caché de feedback cargada: {len(self._entries)} claves desde {self.persist_path}")
@@ -1,6 +1,7 @@
 # src/adapters/trace_service_adapter.py
 import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 from src.ports.trace_service_port import ITraceServicePort
 from src.config import settings
@@ -9,6 +10,11 @@ class TraceServiceAdapter(ITraceServicePort):
     """
     Adaptador del puerto para comunicarse con el TraceService.
     """
+    def __init__(self, max_parallel_notifications: int = 8):
+        # Sesión compartida: reutiliza las conexiones HTTP entre notificaciones
+        self.session = requests.Session()
+        self.max_parallel_notifications = max_parallel_notifications
+
     def notify_analysis_complete(self, practice_id: uuid.UUID, analysis_data: Dict[str, Any]) -> bool:
         """
         Realiza una llamada HTTP PUT al endpoint del TraceService.
@@ -20,7 +26,7 @@ class TraceServiceAdapter(ITraceServicePort):
             print(f"Enviando resultados a TraceService en la URL: {url}")
             print(f"Datos: {analysis_data}")
             
-            response = requests.put(url, json=analysis_data, timeout=10) # Timeout de 10 segundos
+            response = self.session.put(url, json=analysis_data, timeout=10) # Timeout de 10 segundos
             
             # Lanza una excepción si la respuesta es un error HTTP (4xx o 5xx)
             response.raise_for_status()
@@ -30,4 +36,17 @@ class TraceServiceAdapter(ITraceServicePort):
             
         except requests.exceptions.RequestException as e:
             print(f"Error al notificar a TraceService para practice_id {practice_id}: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def notify_analysis_batch(self, analyses: Dict[uuid.UUID, Dict[str, Any]]) -> Dict[uuid.UUID, bool]:
+        """
+        Notifica varios análisis en paralelo sobre las conexiones de la sesión.
+        """
+        if not analyses:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel_notifications, len(analyses))) as executor:
+            futures = {
+                practice_id: executor.submit(self.notify_analysis_complete, practice_id, analysis_data)
+                for practice_id, analysis_data in analyses.items()
+            }
+        return {practice_id: future.result() for practice_id, future in futures.items()}
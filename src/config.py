@@ -3,6 +3,32 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     trace_service_base_url: str
+    # Registro de modelos versionados (si no existe se usa el modelo suelto de ml_models/)
+    model_registry_dir: str = "ml_models/registry"
+    # Agregación de las variantes de plantilla por caracter: "min" o "softmin"
+    template_aggregation: str = "min"
+    # Inferencia en sombra de modelos candidatos
+    shadow_sample_rate: float = 0.1
+    shadow_max_workers: int = 1
+    shadow_cpu_share: float = 0.25
+    shadow_log_path: str = "logs/shadow_inference.jsonl"
+    # Subida directa de imágenes
+    max_upload_bytes: int = 5 * 1024 * 1024
+    # El modo síncrono solo se atiende si hay como mucho estos análisis en cola
+    sync_analysis_max_queue: int = 2
+    # Prácticas máximas por petición de análisis masivo
+    max_bulk_items: int = 200
+    # Entrada vectorial: grosor del trazo en el canvas de 128x128 y puntos máximos por petición
+    stroke_pen_width: float = 10.0
+    max_stroke_points: int = 5000
+    # Streaming por WebSocket: sesiones abiertas, frecuencia de repuntuación y límite de mensajes por sesión
+    stream_max_sessions: int = 500
+    stream_min_score_interval: float = 0.25
+    stream_messages_per_second: float = 60.0
+    stream_message_burst: int = 120
+    # Batches de inferencia compartidos entre sesiones
+    stream_max_batch_size: int = 64
+    stream_max_batch_wait_ms: float = 10.0
 
     class Config:
         env_file = ".env"
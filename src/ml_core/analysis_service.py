@@ -1,48 +1,139 @@
 # src/ml_core/analysis_service.py
 import numpy as np
-import tensorflow as tf
-import cv2
 import os
+import threading
+from typing import List, Optional, Sequence, Tuple, Union
 
-from .image_preprocessor import preprocess_image # Usamos nuestra función mejorada
+from .image_preprocessor import preprocess_image, binarize_image # Usamos nuestra función mejorada
+from .stroke_rasterizer import parse_strokes, strokes_to_model_input, stroke_geometry, DEFAULT_PEN_WIDTH
+from .word_segmentation import segment_glyphs, fit_to_count, tokenize_word, assign_boxes, crop_glyphs
+from .model_registry import ModelRegistry, load_legacy_model
+from .shadow_inference import ShadowInferenceRunner
+from .template_index import TemplateIndex
 
 class HandwritingAnalysisService:
-    def __init__(self, model_path: str = "ml_models/base_handwriting_model.h5"):
-        # Carga SOLO la red base entrenada
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"El modelo no se encontró en {model_path}. Asegúrate de entrenarlo y guardarlo.")
-        self.base_model = tf.keras.models.load_model(model_path)
-        print(f"Modelo base cargado desde {model_path}")
-        
-        # Carga las plantillas perfectas
-        self.templates = self._load_templates("dataset/plantillas")
-
-    def _load_templates(self, templates_dir: str):
-        templates = {}
-        if not os.path.isdir(templates_dir):
-            print(f"ADVERTENCIA: El directorio de plantillas '{templates_dir}' no existe.")
-            return {}
-            
-        for filename in os.listdir(templates_dir):
-            char = filename.split('_')[0]
-            path = os.path.join(templates_dir, filename)
-            
-            # Leer y preprocesar la plantilla
-            with open(path, 'rb') as f:
-                image_bytes = f.read()
-            
-            processed_template = preprocess_image(image_bytes)
-            # Extraer su embedding y guardarlo para no recalcularlo cada vez
-            templates[char] = self.base_model.predict(np.expand_dims(processed_template, axis=0))[0]
-            
-        print(f"Se cargaron y procesaron {len(templates)} plantillas.")
-        return templates
+    def __init__(
+        self,
+        model_path: str = "ml_models/base_handwriting_model.h5",
+        registry_dir: Optional[str] = None,
+        templates_dir: str = "dataset/plantillas",
+        template_aggregation: str = "min"
+    ):
+        """
+        Args:
+            model_path: Modelo suelto que se usa si no hay un registro de versiones
+            registry_dir: Directorio del registro de modelos versionados (opcional)
+            templates_dir: Directorio con las imágenes de plantillas
+            template_aggregation: Cómo combinar las variantes de un caracter ("min" o "softmin")
+        """
+        self.registry = None
+        if registry_dir and os.path.isdir(registry_dir):
+            self.registry = ModelRegistry(registry_dir, templates_dir, template_aggregation)
+
+        # Impide dos cargas de versiones a la vez; las peticiones nunca lo toman
+        self._swap_lock = threading.Lock()
+        self.loading_version: Optional[str] = None
+        self.last_swap_error: Optional[str] = None
+        # Modelo candidato que se evalúa en sombra (desactivado por defecto)
+        self.shadow: Optional[ShadowInferenceRunner] = None
+
+        active_version = self.registry.get_active_version() if self.registry else None
+        if active_version:
+            self._active = self.registry.load(active_version)
+        else:
+            # Carga SOLO la red base entrenada, fuera del registro
+            self._active = load_legacy_model(model_path, templates_dir, aggregation=template_aggregation)
+
+    @property
+    def model_version(self) -> str:
+        return self._active.version
+
+    @property
+    def base_model(self):
+        return self._active.base_model
+
+    @property
+    def templates(self):
+        return self._active.templates
+
+    def activate_version(self, version: str):
+        """
+        Carga una versión del registro, la calienta y la pone en servicio.
+
+        El cambio es una sola asignación de referencia: las peticiones en curso
+        terminan con la versión anterior y las nuevas usan la recién cargada.
+        """
+        if self.registry is None:
+            raise RuntimeError("El servicio no tiene un registro de modelos configurado.")
+
+        # Sin esperar: si ya hay una carga en curso, esta activación se rechaza en lugar de encolarse
+        if not self._swap_lock.acquire(blocking=False):
+            raise RuntimeError(f"Ya se está cargando la versión '{self.loading_version}'.")
+        try:
+            self.loading_version = version
+            candidate = self.registry.load(version)
+            candidate.warm_up()
+            # Primero el puntero ACTIVE: si no se puede guardar, se sigue sirviendo la versión anterior
+            self.registry.set_active_version(version)
+            self._active = candidate
+            self.last_swap_error = None
+            print(f"Modelo activo cambiado a la versión '{version}'.")
+        except Exception as e:
+            self.last_swap_error = f"{version}: {e}"
+            print(f"Error al activar la versión '{version}': {e}")
+            raise
+        finally:
+            self.loading_version = None
+            self._swap_lock.release()
+
+    def enable_shadow(self, version: str, **runner_options):
+        """
+        Carga una versión del registro y la ejecuta en sombra sobre una muestra de las peticiones.
+
+        Args:
+            version: Versión candidata del registro
+            **runner_options: Opciones de ShadowInferenceRunner (sample_rate, cpu_share, log_path...)
+        """
+        if self.registry is None:
+            raise RuntimeError("El servicio no tiene un registro de modelos configurado.")
+        candidate = self.registry.load(version)
+        candidate.warm_up()
+        previous = self.shadow
+        self.shadow = ShadowInferenceRunner(candidate, score_fn=self._distance_to_score, **runner_options)
+        if previous is not None:
+            previous.shutdown()
+        print(f"Inferencia en sombra activada con la versión '{version}'.")
+
+    def disable_shadow(self):
+        previous, self.shadow = self.shadow, None
+        if previous is not None:
+            previous.shutdown()
+            print(f"Inferencia en sombra desactivada (versión '{previous.version}').")
 
     def _distance_to_score(self, distance: float, max_distance=15.0) -> int:
         # El valor de max_distance depende de tu espacio de embedding, se ajusta empíricamente
         similarity = max(0, 1 - (distance / max_distance))
         return int(similarity * 100)
     
+    def _predict_char(self, templates: TemplateIndex, distances: np.ndarray, k: int = 3) -> List[dict]:
+        """
+        Caracter más cercano para cada fila de `distances` y margen de confianza:
+        la diferencia relativa entre la distancia al segundo candidato y al primero
+        (0 = empate, 1 = sin competidor cercano).
+        """
+        top_chars, top_dists = templates.top_k(distances, k)
+        predictions = []
+        for chars, dists in zip(top_chars, top_dists):
+            margin = 1.0
+            if len(dists) > 1 and dists[1] > 0:
+                margin = float((dists[1] - dists[0]) / dists[1])
+            predictions.append({
+                "predicted_char": chars[0] if chars else None,
+                "prediction_margin": round(margin, 3),
+                "top_candidates": [{"char": c, "distance": round(float(d), 4)} for c, d in zip(chars, dists)]
+            })
+        return predictions
+
     def _analizar_errores_cv(self, user_image_bytes):
         # Implementa aquí las funciones de análisis detallado (inclinación, etc.)
         # usando OpenCV como se describió en el plan.
@@ -52,34 +143,62 @@ class HandwritingAnalysisService:
             "proporcion_wh": 0.8 # width/height
         }
 
-    def analyze_handwriting(self, image_bytes: bytes, template_char: str) -> dict:
-        # 1. Obtener el embedding pre-calculado de la plantilla
-        template_embedding = self.templates.get(template_char)
-        if template_embedding is None:
-            raise ValueError(f"No se encontró una plantilla para el caracter '{template_char}'.")
-
-        # 2. Preprocesar la imagen del usuario
-        user_img_processed = preprocess_image(image_bytes)
+    def _score_batch(
+        self,
+        model,
+        user_batch: np.ndarray,
+        template_chars: List[str],
+        detalles_cv: List[dict],
+        submit_shadow: bool = True
+    ) -> List[dict]:
+        """
+        Puntúa un batch de imágenes ya preprocesadas con una sola pasada por la red.
 
-        # 3. Extraer el embedding de la imagen del usuario
-        user_embedding = self.base_model.predict(np.expand_dims(user_img_processed, axis=0))[0]
+        Args:
+            model: Versión del modelo fijada para toda la petición
+            user_batch: Imágenes preprocesadas (N, alto, ancho, 1)
+            template_chars: Caracter esperado de cada imagen
+            detalles_cv: Métricas geométricas de cada fila (de `_analizar_errores_cv` o de los trazos)
+            submit_shadow: Si enviar el batch a la inferencia en sombra (si está activada)
+        """
+        # 3. Extraer los embeddings de todas las imágenes del usuario
+        user_embeddings = model.embed(user_batch)
 
-        # 4. Calcular la distancia euclidiana entre los embeddings
-        distance = np.linalg.norm(user_embedding - template_embedding)
+        # 4. Distancias a todas las plantillas en una sola operación: la de la
+        # plantilla pedida da la puntuación y las más cercanas, el caracter reconocido
+        all_distances = model.templates.distances(user_embeddings)
+        columns = [model.templates.char_to_index[char] for char in template_chars]
+        distances = all_distances[np.arange(len(columns)), columns]
+        predictions = self._predict_char(model.templates, all_distances)
 
         # 5. Convertir distancia a una puntuación global
-        score_global = self._distance_to_score(float(distance))
+        scores = [self._distance_to_score(float(distance)) for distance in distances]
 
-        # 6. Realizar análisis detallado con Computer Vision
-        detalles_cv = self._analizar_errores_cv(image_bytes)
+        # El modelo en sombra reutiliza el mismo batch preprocesado, en su propio executor
+        shadow = self.shadow
+        if shadow is not None and submit_shadow:
+            # Un fallo de la sombra nunca debe afectar a la petición del usuario
+            try:
+                shadow.maybe_submit(
+                    user_batch, list(template_chars),
+                    [{"version": model.version, "distance": float(d), "score": score} for d, score in zip(distances, scores)]
+                )
+            except Exception as e:
+                print(f"Error al enviar la petición a la inferencia en sombra: {e}")
 
+        return [
+            self._build_result(score_global, detalles, prediction, model.version)
+            for score_global, detalles, prediction in zip(scores, detalles_cv, predictions)
+        ]
+
+    def _build_result(self, score_global: int, detalles_cv: dict, prediction: dict, model_version: str) -> dict:
         # 7. Generar feedback basado en reglas
         # Esta es una implementación simple, se puede hacer mucho más compleja
         fortalezas = "Buen intento, sigue practicando."
         areas_mejora = "Concéntrate en la forma general de la letra."
         if score_global > 85:
             fortalezas = "¡Excelente! La forma es muy similar a la plantilla."
-        if detalles_cv['inclinacion'] > 10:
+        if abs(detalles_cv['inclinacion']) > 10:
             areas_mejora = "Intenta mantener la letra un poco más vertical."
 
         return {
@@ -89,5 +208,157 @@ class HandwritingAnalysisService:
             "puntuacion_espaciado": 75, # Simulado
             "puntuacion_consistencia": 85, # Simulado
             "fortalezas": fortalezas,
-            "areas_mejora": areas_mejora
-        }
\ No newline at end of file
+            "areas_mejora": areas_mejora,
+            "predicted_char": prediction["predicted_char"],
+            "prediction_margin": prediction["prediction_margin"],
+            "model_version": model_version
+        }
+
+    def analyze_handwriting(self, image_bytes: bytes, template_char: str) -> dict:
+        # Fijar la versión del modelo para toda la petición (puede cambiar en caliente)
+        model = self._active
+
+        # 1. Verificar que exista la plantilla pre-calculada
+        if template_char not in model.templates:
+            raise ValueError(f"No se encontró una plantilla para el caracter '{template_char}'.")
+
+        # 2. Preprocesar la imagen del usuario
+        user_img_processed = preprocess_image(image_bytes)
+
+        # 3-7. Puntuar como un batch de una imagen
+        user_batch = np.expand_dims(user_img_processed, axis=0)
+        return self._score_batch(model, user_batch, [template_char], [self._analizar_errores_cv(image_bytes)])[0]
+
+    def analyze_handwriting_batch(self, items: List[Tuple[bytes, str]]) -> List[Union[dict, Exception]]:
+        """
+        Analiza muchas imágenes con una sola pasada por la red.
+
+        Los errores son por elemento: una imagen ilegible o un caracter sin
+        plantilla no impide puntuar el resto.
+
+        Args:
+            items: Lista de (bytes de la imagen, caracter esperado)
+
+        Returns:
+            Por cada elemento, en el mismo orden, su resultado o la excepción que lo impidió
+        """
+        model = self._active
+        outcomes: List[Union[dict, Exception]] = [None] * len(items)
+        valid_rows, processed = [], []
+        for i, (image_bytes, template_char) in enumerate(items):
+            try:
+                if template_char not in model.templates:
+                    raise ValueError(f"No se encontró una plantilla para el caracter '{template_char}'.")
+                processed.append(preprocess_image(image_bytes))
+                valid_rows.append(i)
+            except ValueError as e:
+                outcomes[i] = e
+
+        if valid_rows:
+            results = self._score_batch(
+                model, np.stack(processed),
+                [items[i][1] for i in valid_rows], [self._analizar_errores_cv(items[i][0]) for i in valid_rows]
+            )
+            for i, result in zip(valid_rows, results):
+                outcomes[i] = result
+        return outcomes
+
+    def analyze_word(self, image_bytes: bytes, expected_word: str) -> dict:
+        """
+        Analiza una palabra completa escrita en una sola imagen.
+
+        La imagen se segmenta en glifos, que se asignan en orden a los caracteres
+        de `expected_word` (los dígrafos como 'Ch' o 'll' cuentan como uno), y
+        todos se puntúan con una sola pasada por la red.
+
+        Returns:
+            Diccionario con la puntuación media de la palabra y el resultado de cada glifo
+        """
+        model = self._active
+        tokens = tokenize_word(expected_word.replace(" ", ""), model.templates.chars)
+
+        binary = binarize_image(image_bytes)
+        boxes = segment_glyphs(binary)
+        num_letters = sum(len(token) for token in tokens)
+        if len(boxes) not in (len(tokens), num_letters):
+            boxes = fit_to_count(binary, boxes, num_letters)
+        boxes = assign_boxes(boxes, tokens)
+
+        detalles_cv = self._analizar_errores_cv(image_bytes)
+        results = self._score_batch(model, crop_glyphs(binary, boxes), tokens, [detalles_cv] * len(tokens))
+        return {
+            "palabra": expected_word,
+            "puntuacion_general": int(round(np.mean([r["puntuacion_general"] for r in results]))),
+            "glifos": [
+                {"caracter": token, "caja": list(box), **result}
+                for token, box, result in zip(tokens, boxes, results)
+            ],
+            "model_version": model.version
+        }
+
+    def analyze_strokes(
+        self,
+        strokes: Sequence[Sequence[Sequence[float]]],
+        template_char: str,
+        pen_width: float = DEFAULT_PEN_WIDTH,
+        max_points: Optional[int] = None
+    ) -> dict:
+        """
+        Analiza un caracter enviado como trazos vectoriales de una tableta.
+
+        Los trazos se dibujan directamente en el canvas de la red (sin PNG ni
+        umbral adaptativo) y la proporción, la inclinación y la consistencia
+        del grosor se calculan sobre los puntos.
+
+        Args:
+            strokes: Lista de trazos; cada uno, lista de puntos [x, y, t?, presion?]
+            template_char: Caracter esperado
+            pen_width: Grosor del trazo en píxeles del canvas
+            max_points: Máximo de puntos admitidos entre todos los trazos (opcional)
+        """
+        outcome = self.analyze_strokes_batch([(parse_strokes(strokes, max_points), template_char)], pen_width)[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def analyze_strokes_batch(
+        self,
+        items: List[Tuple[List[np.ndarray], str]],
+        pen_width: float = DEFAULT_PEN_WIDTH,
+        submit_shadow: bool = True
+    ) -> List[Union[dict, Exception]]:
+        """
+        Analiza los trazos de muchos caracteres con una sola pasada por la red.
+
+        Args:
+            items: Lista de (trazos ya validados con `parse_strokes`, caracter esperado)
+            pen_width: Grosor del trazo en píxeles del canvas
+            submit_shadow: Si enviar el batch a la inferencia en sombra (no tiene
+                           sentido para las puntuaciones parciales del streaming)
+
+        Returns:
+            Por cada elemento, en el mismo orden, su resultado o la excepción que lo impidió
+        """
+        model = self._active
+        outcomes: List[Union[dict, Exception]] = [None] * len(items)
+        valid_rows, processed, geometries = [], [], []
+        for i, (parsed, template_char) in enumerate(items):
+            if template_char not in model.templates:
+                outcomes[i] = ValueError(f"No se encontró una plantilla para el caracter '{template_char}'.")
+                continue
+            processed.append(strokes_to_model_input(parsed, pen_width))
+            geometries.append(stroke_geometry(parsed))
+            valid_rows.append(i)
+
+        if valid_rows:
+            results = self._score_batch(
+                model, np.stack(processed), [items[i][1] for i in valid_rows], geometries, submit_shadow
+            )
+            for i, result, geometry in zip(valid_rows, results, geometries):
+                # Las puntuaciones que se pueden medir sobre los puntos sustituyen a las simuladas
+                for key in ("puntuacion_inclinacion", "puntuacion_consistencia"):
+                    if key in geometry:
+                        result[key] = geometry[key]
+                result["detalles_geometricos"] = geometry
+                outcomes[i] = result
+        return outcomes
@@ -1,6 +1,7 @@
 # src/ml_core/data/__init__.py
 from .dataset_loader import EMNISTDataLoader
-from .pair_generator import SiamesePairGenerator
-
-__all__ = ['EMNISTDataLoader', 'SiamesePairGenerator']
+from .pair_generator import SiamesePairGenerator, random_pairs_from_batch
+from .pair_pipeline import build_pair_dataset
+from .pk_sampler import build_pk_dataset
 
+__all__ = ['EMNISTDataLoader', 'SiamesePairGenerator', 'random_pairs_from_batch', 'build_pair_dataset', 'build_pk_dataset']
@@ -4,8 +4,6 @@ import cv2
 import albumentations as A
 import numpy as np
 
-print("Iniciando la aumentación del dataset...")
-
 # --- CONFIGURACIÓN ---
 INPUT_DIR = "dataset/plantillas"
 OUTPUT_DIR = "dataset/variations"
@@ -25,6 +23,8 @@ def main():
     """
     Función principal que orquesta la aumentación de datos.
     """
+    print("Iniciando la aumentación del dataset...")
+
     if not os.path.exists(INPUT_DIR):
         print(f"Error: El directorio de plantillas '{INPUT_DIR}' no existe.")
         print("Por favor, ejecuta 'generate_templates.py' primero.")
@@ -0,0 +1,182 @@
+# src/ml_core/data/augment_sharded.py
+"""
+Aumentación de datos en paralelo, escrita en shards en lugar de PNG sueltos.
+
+Cada plantilla se procesa en un proceso del pool con una semilla derivada de
+la semilla base y del nombre del caracter, así que el resultado es el mismo
+sin importar cuántos procesos se usen ni en qué orden terminen. Cada
+plantilla produce un único shard `.npy` uint8 (variaciones, alto, ancho, 1):
+
+    dataset/variations_shards/
+        manifest.json
+        a_ord97.npy
+        B_ord66.npy
+        ...
+
+Los shards se escriben con un nombre temporal y se renombran al terminar,
+por lo que una ejecución interrumpida se reanuda saltando los que ya existen.
+"""
+import os
+import json
+import zlib
+import random
+import argparse
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict
+
+from .augment_dataset import transform, INPUT_DIR, NUM_VARIATIONS_PER_TEMPLATE
+from .dataset_cache import IMAGES_FILENAME, LABELS_FILENAME, CLASSES_FILENAME
+
+# --- CONFIGURACIÓN ---
+OUTPUT_DIR = "dataset/variations_shards"
+MANIFEST_FILENAME = "manifest.json"
+IMG_SIZE = (128, 128)
+
+
+def template_seed(base_seed: int, character_name: str) -> int:
+    """Semilla estable por plantilla, independiente del worker que la procese."""
+    return int(np.random.SeedSequence([base_seed, zlib.crc32(character_name.encode("utf-8"))]).generate_state(1)[0])
+
+
+def _augment_template(template_path: str, shard_path: str, num_variations: int, seed: int) -> int:
+    """
+    Genera todas las variaciones de una plantilla y las guarda en un shard.
+    Se ejecuta dentro de un proceso del pool.
+    """
+    # albumentations usa los generadores globales de `random` y de NumPy
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+
+    image = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"No se pudo leer la imagen {template_path}")
+
+    height, width = IMG_SIZE
+    variations = np.empty((num_variations, height, width, 1), dtype=np.uint8)
+    for i in range(num_variations):
+        augmented = transform(image=image)["image"]
+        if augmented.shape[:2] != (height, width):
+            augmented = cv2.resize(augmented, (width, height), interpolation=cv2.INTER_AREA)
+        variations[i, :, :, 0] = augmented
+
+    tmp_path = shard_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, variations)
+    os.replace(tmp_path, shard_path)
+    return num_variations
+
+
+def _write_manifest(output_dir: str, manifest: Dict[str, Dict]):
+    tmp_path = os.path.join(output_dir, MANIFEST_FILENAME + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_FILENAME))
+
+
+def augment_to_shards(
+    input_dir: str = INPUT_DIR,
+    output_dir: str = OUTPUT_DIR,
+    num_variations: int = NUM_VARIATIONS_PER_TEMPLATE,
+    num_workers: int = None,
+    base_seed: int = 42
+) -> Dict[str, Dict]:
+    """
+    Aumenta todas las plantillas de `input_dir` en paralelo.
+
+    Args:
+        input_dir: Directorio de plantillas (`<caracter>_template.png`)
+        output_dir: Directorio de los shards
+        num_variations: Variaciones por plantilla
+        num_workers: Procesos del pool (por defecto, uno por núcleo)
+        base_seed: Semilla base de la que se derivan las de cada plantilla
+
+    Returns:
+        El manifiesto: {caracter: {"shard", "count", "seed"}}
+    """
+    template_files = sorted(f for f in os.listdir(input_dir) if f.endswith('.png'))
+    if not template_files:
+        raise ValueError(f"No se encontraron plantillas en '{input_dir}'.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest, pending = {}, []
+    for template_file in template_files:
+        character_name = template_file.replace('_template.png', '')
+        shard_name = f"{character_name}.npy"
+        seed = template_seed(base_seed, character_name)
+        manifest[character_name] = {"shard": shard_name, "count": num_variations, "seed": seed}
+        # Reanudación: un shard que existe está completo (se renombra solo al terminar)
+        if not os.path.exists(os.path.join(output_dir, shard_name)):
+            pending.append((character_name, os.path.join(input_dir, template_file), os.path.join(output_dir, shard_name), seed))
+
+    print(f"{len(template_files)} plantillas, {len(template_files) - len(pending)} ya aumentadas, "
+          f"{len(pending)} pendientes ({num_variations} variaciones cada una).")
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            executor.submit(_augment_template, template_path, shard_path, num_variations, seed): character_name
+            for character_name, template_path, shard_path, seed in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            print(f"[{done}/{len(pending)}] Shard listo: {futures[future]}")
+
+    _write_manifest(output_dir, manifest)
+    return manifest
+
+
+def shards_to_cache(shard_dir: str, cache_dir: str) -> int:
+    """
+    Concatena los shards en la caché mapeada en memoria que usa el entrenamiento
+    (mismo formato que `dataset_cache.build_dataset_cache`).
+
+    Returns:
+        Número de imágenes escritas
+    """
+    with open(os.path.join(shard_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    class_names = sorted(manifest.keys())
+    shards = [np.load(os.path.join(shard_dir, manifest[name]["shard"]), mmap_mode='r') for name in class_names]
+    total = sum(len(shard) for shard in shards)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    images_tmp = os.path.join(cache_dir, IMAGES_FILENAME + ".tmp")
+    images = np.lib.format.open_memmap(images_tmp, mode='w+', dtype=np.uint8, shape=(total, *shards[0].shape[1:]))
+    labels = np.empty(total, dtype=np.int32)
+    offset = 0
+    for label, shard in enumerate(shards):
+        images[offset:offset + len(shard)] = shard
+        labels[offset:offset + len(shard)] = label
+        offset += len(shard)
+    images.flush()
+    del images
+
+    labels_tmp = os.path.join(cache_dir, LABELS_FILENAME + ".tmp")
+    with open(labels_tmp, 'wb') as f:
+        np.save(f, labels)
+    with open(os.path.join(cache_dir, CLASSES_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(class_names, f, ensure_ascii=False)
+    os.replace(labels_tmp, os.path.join(cache_dir, LABELS_FILENAME))
+    os.replace(images_tmp, os.path.join(cache_dir, IMAGES_FILENAME))
+    print(f"Caché con {total} imágenes escrita en {cache_dir}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aumentación paralela de plantillas en shards.")
+    parser.add_argument("--input-dir", default=INPUT_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--variations", type=int, default=NUM_VARIATIONS_PER_TEMPLATE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", help="Si se indica, convierte los shards en la caché de entrenamiento")
+    args = parser.parse_args()
+
+    augment_to_shards(args.input_dir, args.output_dir, args.variations, args.workers, args.seed)
+    if args.cache_dir:
+        shards_to_cache(args.output_dir, args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,59 @@
 # src/ml_core/data_utils.py
 import numpy as np
 
-def create_pairs_from_data(images, labels):
+def create_pairs_from_data(images, labels, seed=None):
     """
     Crea pares de índices a partir de datos ya cargados en memoria.
-    
+
+    Por cada imagen genera un par positivo (otra imagen de su clase) y uno
+    negativo (una imagen de otra clase elegida al azar). Todo el muestreo se
+    hace con operaciones vectorizadas sobre los índices agrupados por clase.
+
     Args:
         images (np.array): Array con todas las imágenes.
         labels (np.array): Array con todas las etiquetas numéricas.
-        
+        seed (int, opcional): Semilla del generador aleatorio, para pares reproducibles.
+
     Returns:
         tuple: (pares_de_indices, etiquetas_de_pares)
     """
     print("Creando pares de índices a partir de datos en memoria...")
-    
-    num_classes = len(np.unique(labels))
-    map_label_to_indices = {label: np.flatnonzero(labels == label) for label in range(num_classes)}
-    
-    pair_indices = []
-    pair_labels = []
-    
+    rng = np.random.default_rng(seed)
+
+    labels = np.asarray(labels)
     num_images = len(images)
-    for i in range(num_images):
-        current_label = labels[i]
-        
-        # Par positivo
-        pos_idx = i
-        while pos_idx == i:
-            pos_idx = np.random.choice(map_label_to_indices[current_label])
-        pair_indices.append([i, pos_idx])
-        pair_labels.append(1.0)
-        
-        # Par negativo
-        neg_label = np.random.randint(0, num_classes)
-        while neg_label == current_label:
-            neg_label = np.random.randint(0, num_classes)
-        neg_idx = np.random.choice(map_label_to_indices[neg_label])
-        pair_indices.append([i, neg_idx])
-        pair_labels.append(0.0)
-        
+    classes, class_of, class_counts = np.unique(labels, return_inverse=True, return_counts=True)
+    num_classes = len(classes)
+    if num_classes < 2:
+        raise ValueError("Se necesitan al menos dos clases para crear pares negativos.")
+
+    # Índices de imágenes agrupados por clase: la clase k ocupa
+    # by_class[class_starts[k] : class_starts[k] + class_counts[k]]
+    by_class = np.argsort(class_of, kind="stable")
+    class_starts = np.concatenate(([0], np.cumsum(class_counts)[:-1]))
+    position_in_class = np.empty(num_images, dtype=np.int64)
+    position_in_class[by_class] = np.arange(num_images) - class_starts[class_of[by_class]]
+
+    anchors = np.arange(num_images)
+    counts = class_counts[class_of]
+
+    # Par positivo: desplazamiento aleatorio en [1, n_clase - 1] dentro de la
+    # clase, de modo que nunca coincide con el ancla (salvo clases de una sola imagen)
+    offsets = rng.integers(1, np.maximum(counts, 2))
+    pos_idx = by_class[class_starts[class_of] + (position_in_class + offsets) % counts]
+
+    # Par negativo: clase desplazada en [1, num_clases - 1], siempre distinta a la del ancla
+    neg_class = (class_of + rng.integers(1, num_classes, size=num_images)) % num_classes
+    neg_offsets = (rng.random(num_images) * class_counts[neg_class]).astype(np.int64)
+    neg_idx = by_class[class_starts[neg_class] + neg_offsets]
+
+    # Intercalar (ancla, positivo), (ancla, negativo) como hacía la versión iterativa
+    pair_indices = np.empty((2 * num_images, 2), dtype=np.int64)
+    pair_indices[0::2, 0] = anchors
+    pair_indices[0::2, 1] = pos_idx
+    pair_indices[1::2, 0] = anchors
+    pair_indices[1::2, 1] = neg_idx
+    pair_labels = np.tile(np.array([1.0, 0.0], dtype="float32"), num_images)
+
     print(f"Se crearon {len(pair_indices)} pares de índices.")
-    return np.array(pair_indices), np.array(pair_labels, dtype="float32")
\ No newline at end of file
+    return pair_indices, pair_labels
@@ -0,0 +1,122 @@
+# src/ml_core/data/dataset_cache.py
+"""
+Caché del dataset preprocesado en un array mapeado en memoria.
+
+Se construye una sola vez a partir de un directorio con una subcarpeta por
+clase (como dataset/variations) y deja en `cache_dir`:
+
+    images.npy     # uint8 (N, alto, ancho, 1), se abre con mmap sin copiar
+    labels.npy     # int32 (N,)
+    classes.json   # nombre de clase de cada etiqueta, en orden
+
+Los entrenamientos mapean el archivo en lugar de decodificar miles de PNG y
+normalizan a float32 por batch, de modo que nunca hay una copia float32 del
+dataset completo en memoria.
+"""
+import os
+import json
+import argparse
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+IMAGES_FILENAME = "images.npy"
+LABELS_FILENAME = "labels.npy"
+CLASSES_FILENAME = "classes.json"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def cache_exists(cache_dir: str) -> bool:
+    return all(
+        os.path.exists(os.path.join(cache_dir, name))
+        for name in (IMAGES_FILENAME, LABELS_FILENAME, CLASSES_FILENAME)
+    )
+
+
+def build_dataset_cache(dataset_dir: str, cache_dir: str, img_size: Tuple[int, int] = (128, 128)) -> int:
+    """
+    Decodifica todas las imágenes de `dataset_dir` y las escribe en la caché.
+
+    Las clases se ordenan alfabéticamente, igual que en
+    `tf.keras.utils.image_dataset_from_directory`, para conservar las etiquetas.
+
+    Args:
+        dataset_dir: Directorio con una subcarpeta por clase
+        cache_dir: Directorio donde se escribe la caché
+        img_size: Tamaño (alto, ancho) al que se redimensionan las imágenes
+
+    Returns:
+        Número de imágenes escritas
+    """
+    class_names = sorted(
+        name for name in os.listdir(dataset_dir)
+        if os.path.isdir(os.path.join(dataset_dir, name))
+    )
+    files, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(dataset_dir, class_name)
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                files.append(os.path.join(class_dir, filename))
+                labels.append(label)
+
+    if not files:
+        raise ValueError(f"No se encontraron imágenes en '{dataset_dir}'.")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    print(f"Construyendo caché de {len(files)} imágenes ({len(class_names)} clases) en {cache_dir}...")
+
+    # Se escribe con nombres temporales y se renombra al final, para que una
+    # ejecución interrumpida nunca deje una caché a medias que parezca válida
+    images_tmp = os.path.join(cache_dir, IMAGES_FILENAME + ".tmp")
+    images = np.lib.format.open_memmap(images_tmp, mode='w+', dtype=np.uint8, shape=(len(files), *img_size, 1))
+    height, width = img_size
+    for i, path in enumerate(files):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"No se pudo leer la imagen {path}")
+        if image.shape != (height, width):
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+        images[i, :, :, 0] = image
+    images.flush()
+    del images
+
+    labels_tmp = os.path.join(cache_dir, LABELS_FILENAME + ".tmp")
+    with open(labels_tmp, 'wb') as f:
+        np.save(f, np.array(labels, dtype=np.int32))
+    with open(os.path.join(cache_dir, CLASSES_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(class_names, f, ensure_ascii=False)
+    os.replace(labels_tmp, os.path.join(cache_dir, LABELS_FILENAME))
+    os.replace(images_tmp, os.path.join(cache_dir, IMAGES_FILENAME))
+
+    print("Caché construida.")
+    return len(files)
+
+
+def load_dataset_cache(cache_dir: str) -> Tuple[np.memmap, np.ndarray, List[str]]:
+    """
+    Abre la caché sin copiarla a memoria.
+
+    Returns:
+        Tupla de (imágenes uint8 mapeadas en memoria, etiquetas, nombres de clase)
+    """
+    if not cache_exists(cache_dir):
+        raise FileNotFoundError(f"No existe una caché completa en '{cache_dir}'. Ejecuta build_dataset_cache primero.")
+    images = np.load(os.path.join(cache_dir, IMAGES_FILENAME), mmap_mode='r')
+    labels = np.load(os.path.join(cache_dir, LABELS_FILENAME))
+    with open(os.path.join(cache_dir, CLASSES_FILENAME), 'r', encoding='utf-8') as f:
+        class_names = json.load(f)
+    return images, labels, class_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye la caché mapeada en memoria de un dataset de imágenes.")
+    parser.add_argument("--dataset-dir", default="dataset/variations")
+    parser.add_argument("--cache-dir", default="dataset/cache/variations")
+    parser.add_argument("--img-size", type=int, nargs=2, default=(128, 128), metavar=("ALTO", "ANCHO"))
+    args = parser.parse_args()
+    build_dataset_cache(args.dataset_dir, args.cache_dir, tuple(args.img_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,84 @@
 """
 Módulo para cargar y preprocesar datasets.
 """
+import os
 import tensorflow as tf
 import tensorflow_datasets as tfds
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 
 
 class EMNISTDataLoader:
     """
     Carga y preprocesa el dataset EMNIST para entrenamiento.
     Usa tf.data.Dataset para manejar grandes volúmenes de datos sin cargar todo a memoria.
+    
+    La orientación y el redimensionado son iguales en todas las épocas, así que
+    se calculan en la primera y se cachean en uint8 (en memoria, ~1.8 GB para
+    emnist/balanced a 128x128, o en disco con `cache=<directorio>`).
     """
     
-    def __init__(self, img_size: Tuple[int, int] = (128, 128), batch_size: int = 64):
+    def __init__(
+        self,
+        img_size: Tuple[int, int] = (128, 128),
+        batch_size: int = 64,
+        cache: Optional[str] = "",
+        resize_before_cache: bool = True
+    ):
         """
         Args:
             img_size: Tamaño objetivo de las imágenes (altura, ancho)
             batch_size: Tamaño del batch para el dataset
+            cache: Dónde guardar las imágenes ya orientadas (y redimensionadas):
+                   "" para memoria, una ruta para una caché en disco, o None para
+                   no cachear y repetir el preprocesamiento en cada época
+            resize_before_cache: Si redimensionar antes de cachear. Con False se
+                   cachea en 28x28 (ocupa ~20 veces menos) y se redimensiona por batch
         """
         self.img_size = img_size
         self.batch_size = batch_size
+        self.cache = cache
+        self.resize_before_cache = resize_before_cache
         self.num_classes = None
         self.ds_info = None
     
+    def orient_image(self, image: tf.Tensor, label: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+        """
+        Parte determinista del preprocesamiento: corrige la orientación de EMNIST
+        y, si `resize_before_cache`, redimensiona. Devuelve uint8 para que la
+        caché ocupe un byte por píxel.
+        
+        Args:
+            image: Imagen del dataset EMNIST (28x28 o 28x28x1, uint8)
+            label: Etiqueta de la imagen
+            
+        Returns:
+            Tupla de (imagen uint8 [alto, ancho, 1], etiqueta)
+        """
+        # La forma de EMNIST es estática: las comprobaciones se resuelven al trazar, no por imagen
+        if image.shape.rank == 2:
+            image = tf.expand_dims(image, axis=-1)
+        image = image[:, :, 0:1]
+        
+        # EMNIST viene transpuesto y espejado: transponer [1, 0, 2] intercambia H y W
+        image = tf.image.flip_left_right(tf.transpose(image, [1, 0, 2]))
+        
+        if self.resize_before_cache:
+            image = tf.image.resize(image, self.img_size, method='bilinear')
+            image = tf.cast(tf.clip_by_value(tf.round(image), 0.0, 255.0), tf.uint8)
+        return image, label
+    
+    def finish_batch(self, images: tf.Tensor, labels: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+        """
+        Parte por batch: redimensiona si no se hizo antes de cachear y normaliza a [0, 1].
+        """
+        images = tf.cast(images, tf.float32)
+        if not self.resize_before_cache:
+            images = tf.image.resize(images, self.img_size, method='bilinear')
+        return images / 255.0, labels
+    
     def preprocess_image(self, image: tf.Tensor, label: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
         """
-        Normaliza y redimensiona las imágenes del dataset EMNIST.
+        Normaliza y redimensiona una imagen del dataset EMNIST.
         EMNIST es 28x28, nuestro modelo necesita 128x128.
         
         Args:
@@ -36,44 +89,46 @@ class EMNISTDataLoader:
         Returns:
             Tupla de (imagen procesada, etiqueta)
         """
-        # EMNIST está rotado y transpuesto, lo corregimos
-        # Asegurar que la imagen tenga la forma correcta
-        image = tf.cast(image, tf.float32)
-        
-        # Asegurar que tenga dimensión de canal (EMNIST viene como [28, 28])
-        # Verificar el rank de la imagen
-        rank = tf.rank(image)
-        image = tf.cond(
-            tf.equal(rank, 2),
-            lambda: tf.expand_dims(image, axis=-1),  # Agregar canal si es 2D
-            lambda: image  # Ya tiene canal
-        )
-        
-        # Transponer: EMNIST viene transpuesto, necesitamos corregirlo
-        # Si la imagen es [H, W, C], transponer [1, 0, 2] intercambia H y W
-        image = tf.transpose(image, [1, 0, 2])
-        
-        # Voltear horizontalmente (EMNIST está espejado)
-        image = tf.image.flip_left_right(image)
-        
-        # Redimensionar a tamaño objetivo
-        # tf.image.resize funciona con [H, W, C]
-        image = tf.image.resize(image, self.img_size, method='bilinear')
-        
-        # Asegurar que tenga solo 1 canal (por si acaso)
-        # Si tiene más canales, tomar solo el primero
-        image_shape = tf.shape(image)
-        num_channels = image_shape[2]
-        image = tf.cond(
-            tf.greater(num_channels, 1),
-            lambda: image[:, :, 0:1],  # Tomar solo el primer canal
-            lambda: image  # Ya tiene 1 canal
-        )
+        image, label = self.orient_image(image, label)
+        image, label = self.finish_batch(image[tf.newaxis], label)
+        return image[0], label
+    
+    def prepare_split(
+        self,
+        dataset: tf.data.Dataset,
+        shuffle: bool = True,
+        cache_path: Optional[str] = None
+    ) -> tf.data.Dataset:
+        """
+        Construye el pipeline de un split a partir de pares (imagen, etiqueta) sin procesar.
         
-        # Normalizar a [0, 1]
-        image = image / 255.0
+        La orientación y el redimensionado se calculan una vez y se cachean; en
+        cada época solo se mezclan, agrupan en batches y normalizan.
         
-        return image, label
+        Args:
+            dataset: Dataset de (imagen uint8, etiqueta)
+            shuffle: Si mezclar de nuevo en cada época
+            cache_path: Ruta de la caché en disco de este split ("" para memoria, None sin caché)
+            
+        Returns:
+            Dataset de batches (imágenes float32 [batch, alto, ancho, 1], etiquetas)
+        """
+        dataset = dataset.map(self.orient_image, num_parallel_calls=tf.data.AUTOTUNE)
+        if cache_path is not None:
+            dataset = dataset.cache(cache_path)
+        # Con shuffle=False se mezcla una sola vez, igual que antes para el split de test
+        dataset = dataset.shuffle(buffer_size=10000, reshuffle_each_iteration=shuffle)
+        # Batch antes de normalizar: una operación por batch en lugar de una por imagen
+        dataset = dataset.batch(self.batch_size)
+        dataset = dataset.map(self.finish_batch, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+    
+    def _cache_path(self, dataset_name: str, split: str) -> Optional[str]:
+        if not self.cache:
+            return self.cache
+        height, width = self.img_size if self.resize_before_cache else (28, 28)
+        os.makedirs(self.cache, exist_ok=True)
+        return os.path.join(self.cache, f"{dataset_name.replace('/', '_')}_{split}_{height}x{width}")
     
     def load_dataset(self, dataset_name: str = 'emnist/balanced') -> Tuple[Dict[str, tf.data.Dataset], Any]:
         """
@@ -100,28 +155,9 @@ class EMNISTDataLoader:
         self.num_classes = ds_info.features['label'].num_classes
         print(f"Dataset cargado. Número de clases: {self.num_classes}")
         
-        # Aplicar preprocesamiento
-        ds_train = ds_train.map(
-            self.preprocess_image,
-            num_parallel_calls=tf.data.AUTOTUNE
-        )
-        ds_test = ds_test.map(
-            self.preprocess_image,
-            num_parallel_calls=tf.data.AUTOTUNE
-        )
-        
-        # Mezclar antes de hacer batching (importante para crear pares diversos)
-        # Nota: No cacheamos aquí porque los pares se generan dinámicamente después
-        ds_train = ds_train.shuffle(buffer_size=10000, reshuffle_each_iteration=True)
-        ds_test = ds_test.shuffle(buffer_size=10000, reshuffle_each_iteration=False)
-        
-        # Hacer batching
-        ds_train = ds_train.batch(self.batch_size)
-        ds_test = ds_test.batch(self.batch_size)
-        
-        # Prefetch para mejorar rendimiento
-        ds_train = ds_train.prefetch(tf.data.AUTOTUNE)
-        ds_test = ds_test.prefetch(tf.data.AUTOTUNE)
+        # Los pares se generan después, por batch: cachear las imágenes no los fija
+        ds_train = self.prepare_split(ds_train, shuffle=True, cache_path=self._cache_path(dataset_name, 'train'))
+        ds_test = self.prepare_split(ds_test, shuffle=False, cache_path=self._cache_path(dataset_name, 'test'))
         
         print(f"Dataset preparado con batch_size={self.batch_size}")
         
@@ -0,0 +1,98 @@
+# src/ml_core/data/online_augmentation.py
+"""
+Aumentación sobre la marcha dentro del pipeline de entrenamiento.
+
+En lugar de precalcular NUM_VARIATIONS_PER_TEMPLATE imágenes por plantilla,
+cada par se construye aplicando `augment_dataset.transform` a las plantillas
+en el momento: el modelo ve variaciones nuevas en cada época y no hace falta
+el paso de aumentación offline.
+"""
+import os
+import cv2
+import numpy as np
+import tensorflow as tf
+from typing import List, Tuple
+
+from .augment_dataset import transform
+
+
+def load_templates(templates_dir: str, img_size: Tuple[int, int] = (128, 128)) -> Tuple[np.ndarray, List[str]]:
+    """
+    Carga las plantillas como un array uint8 (num_clases, alto, ancho).
+
+    Las clases se nombran y ordenan igual que las subcarpetas de dataset/variations
+    (`<caracter>_template.png` -> `<caracter>`), para que las etiquetas coincidan.
+    """
+    template_files = sorted(f for f in os.listdir(templates_dir) if f.endswith('.png'))
+    class_names = sorted(f.replace('_template.png', '') for f in template_files)
+    height, width = img_size
+    templates = np.empty((len(class_names), height, width), dtype=np.uint8)
+    for i, class_name in enumerate(class_names):
+        path = os.path.join(templates_dir, f"{class_name}_template.png")
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"No se pudo leer la imagen {path}")
+        if image.shape != (height, width):
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        templates[i] = image
+    return templates, class_names
+
+
+def _augment(image: np.ndarray) -> np.ndarray:
+    return transform(image=image)["image"]
+
+
+def build_augmented_pair_dataset(
+    templates: np.ndarray,
+    batch_size: int,
+    num_pairs: int = None
+) -> tf.data.Dataset:
+    """
+    Crea un dataset de pares aumentados al vuelo.
+
+    Los pares alternan positivo (dos aumentaciones independientes de la misma
+    plantilla) y negativo (aumentaciones de dos plantillas distintas). La
+    aumentación de cada muestra corre en workers paralelos de tf.data y se
+    solapa con el entrenamiento mediante prefetch.
+
+    Args:
+        templates: Plantillas uint8 (num_clases, alto, ancho), de `load_templates`
+        batch_size: Pares por batch
+        num_pairs: Pares a generar; None para un dataset infinito
+
+    Returns:
+        Dataset con estructura ((image1_batch, image2_batch), pair_labels)
+    """
+    num_classes, height, width = templates.shape
+    if num_classes < 2:
+        raise ValueError("Se necesitan al menos dos plantillas para crear pares negativos.")
+    template_tensor = tf.constant(templates)
+
+    def sample_pair(i):
+        is_positive = tf.equal(i % 2, 0)
+        anchor = tf.random.uniform([], 0, num_classes, dtype=tf.int32)
+        shift = tf.random.uniform([], 1, num_classes, dtype=tf.int32)
+        other = tf.where(is_positive, anchor, (anchor + shift) % num_classes)
+        return anchor, other, tf.cast(is_positive, tf.float32)
+
+    def augment_pair(anchor, other, label):
+        images = []
+        for index in (anchor, other):
+            image = tf.numpy_function(_augment, [template_tensor[index]], tf.uint8)
+            image.set_shape((height, width))
+            images.append(image)
+        return (images[0], images[1]), label
+
+    def normalize(images, labels):
+        image_a, image_b = images
+        image_a = tf.cast(image_a[..., tf.newaxis], tf.float32) / 255.0
+        image_b = tf.cast(image_b[..., tf.newaxis], tf.float32) / 255.0
+        return (image_a, image_b), labels
+
+    dataset = tf.data.Dataset.range(num_pairs) if num_pairs is not None else tf.data.Dataset.range(2 ** 62)
+    dataset = dataset.map(sample_pair, num_parallel_calls=tf.data.AUTOTUNE)
+    # La aumentación es el trabajo caro: un worker por muestra, sin imponer orden
+    dataset = dataset.map(augment_pair, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(normalize, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
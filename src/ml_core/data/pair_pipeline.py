@@ -0,0 +1,90 @@
+# src/ml_core/data/pair_pipeline.py
+"""
+Pipeline de pares construido dentro del grafo de tf.data.
+
+Las imágenes se guardan una sola vez como tensor; el dataset solo recorre
+(y mezcla) los índices de los pares, y cada batch de imágenes se obtiene con
+`tf.gather` en etapas `map` paralelas, sin pasar por Python ni por el GIL.
+"""
+import numpy as np
+import tensorflow as tf
+
+
+def make_image_gather(images: np.ndarray):
+    """
+    Crea una función de grafo que obtiene un batch de imágenes a partir de índices.
+
+    Returns:
+        Tupla de (gather(indices) -> imágenes, si las imágenes son uint8 y hay que normalizarlas)
+    """
+    if isinstance(images, np.memmap):
+        # Caché mapeada en memoria: se lee solo lo que pide cada batch, sin copiar el dataset
+        image_shape = images.shape[1:]
+        image_dtype = tf.as_dtype(images.dtype)
+
+        def gather(indices):
+            images_batch = tf.numpy_function(lambda idx: images[idx], [indices], image_dtype)
+            images_batch.set_shape((None, *image_shape))
+            return images_batch
+    else:
+        # Una única copia de las imágenes, fija en CPU, compartida por todas las etapas del pipeline
+        with tf.device("/cpu:0"):
+            image_tensor = tf.convert_to_tensor(images)
+        image_dtype = image_tensor.dtype
+
+        def gather(indices):
+            return tf.gather(image_tensor, indices)
+    normalize = image_dtype == tf.uint8
+    return gather, normalize
+
+
+def build_pair_dataset(
+    images: np.ndarray,
+    pair_indices: np.ndarray,
+    pair_labels: np.ndarray,
+    batch_size: int,
+    shuffle: bool = True,
+    repeat: bool = False,
+    seed: int = None
+) -> tf.data.Dataset:
+    """
+    Crea un dataset de batches ((imagenes_a, imagenes_b), etiquetas) a partir de índices de pares.
+
+    Args:
+        images: Todas las imágenes (N, alto, ancho, 1); float32 en [0, 1] o uint8 en [0, 255].
+                También acepta la caché de `dataset_cache.load_dataset_cache` (np.memmap)
+        pair_indices: Pares de índices (num_pares, 2), como los de `create_pairs_from_data`
+        pair_labels: Etiqueta de cada par (1 = misma clase, 0 = distinta)
+        batch_size: Pares por batch
+        shuffle: Si mezclar los pares en cada época (solo se mezclan índices, no imágenes)
+        repeat: Si repetir el dataset indefinidamente
+        seed: Semilla para la mezcla
+
+    Returns:
+        Dataset con estructura ((image1_batch, image2_batch), pair_labels)
+    """
+    gather, normalize = make_image_gather(images)
+
+    dataset = tf.data.Dataset.from_tensor_slices((
+        pair_indices.astype(np.int32),
+        pair_labels.astype(np.float32)
+    ))
+    if shuffle:
+        # Mezclar todos los índices es barato: 8 bytes por par
+        dataset = dataset.shuffle(len(pair_indices), seed=seed, reshuffle_each_iteration=True)
+    if repeat:
+        dataset = dataset.repeat()
+
+    # Batch antes de gather: un tf.gather por batch en lugar de uno por par
+    dataset = dataset.batch(batch_size)
+
+    def gather_pairs(indices, labels):
+        images_a = gather(indices[:, 0])
+        images_b = gather(indices[:, 1])
+        if normalize:
+            images_a = tf.cast(images_a, tf.float32) / 255.0
+            images_b = tf.cast(images_b, tf.float32) / 255.0
+        return (images_a, images_b), labels
+
+    dataset = dataset.map(gather_pairs, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,89 @@
+# src/ml_core/data/pk_sampler.py
+"""
+Muestreador de batches balanceados por clase (P clases x K muestras).
+
+Con un barajado aleatorio normal, en un batch de 128 imágenes de 68 clases
+muchas imágenes no tienen ninguna compañera de su clase y no pueden formar
+un par positivo. Este muestreador construye cada batch eligiendo P clases
+distintas y K imágenes de cada una, de modo que `random_pairs_from_batch`
+siempre encuentra un positivo válido y negativos de P - 1 clases.
+"""
+import numpy as np
+import tensorflow as tf
+
+from .pair_pipeline import make_image_gather
+
+
+def build_pk_dataset(
+    images: np.ndarray,
+    labels: np.ndarray,
+    classes_per_batch: int,
+    samples_per_class: int,
+    indices: np.ndarray = None
+) -> tf.data.Dataset:
+    """
+    Crea un dataset infinito de batches (imágenes, etiquetas) con P x K muestras.
+
+    Args:
+        images: Todas las imágenes (array, tensor-compatible o caché np.memmap)
+        labels: Etiqueta de cada imagen
+        classes_per_batch: P, clases distintas por batch
+        samples_per_class: K, imágenes por clase (K >= 2 garantiza positivos)
+        indices: Subconjunto de índices a muestrear (por ejemplo, el split de entrenamiento)
+
+    Returns:
+        Dataset con batches (images [P*K, ...] float32, labels [P*K])
+    """
+    if indices is None:
+        indices = np.arange(len(labels))
+    subset_labels = np.asarray(labels)[indices]
+    classes, class_of = np.unique(subset_labels, return_inverse=True)
+    num_classes = len(classes)
+    if classes_per_batch > num_classes:
+        raise ValueError(f"classes_per_batch={classes_per_batch} supera el número de clases ({num_classes}).")
+
+    # Índices agrupados por clase en una matriz [clases, max_por_clase], con su número real por clase
+    order = np.argsort(class_of, kind="stable")
+    counts = np.bincount(class_of, minlength=num_classes)
+    max_count = counts.max()
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    members = np.zeros((num_classes, max_count), dtype=np.int64)
+    for c in range(num_classes):
+        members[c, :counts[c]] = np.asarray(indices)[order[starts[c]:starts[c] + counts[c]]]
+
+    members_tensor = tf.constant(members)
+    counts_tensor = tf.constant(counts, dtype=tf.int32)
+    classes_tensor = tf.constant(classes.astype(np.int32))
+    gather, normalize = make_image_gather(images)
+
+    def sample_batch_indices(_):
+        chosen = tf.random.shuffle(tf.range(num_classes))[:classes_per_batch]
+        chosen_counts = tf.gather(counts_tensor, chosen)
+        # K miembros distintos por clase: top-k de puntuaciones aleatorias, anulando
+        # las posiciones de relleno; si una clase tiene menos de K, se repiten
+        scores = tf.random.uniform([classes_per_batch, max_count])
+        valid = tf.sequence_mask(chosen_counts, max_count)
+        scores = tf.where(valid, scores, -tf.ones_like(scores))
+        k = min(samples_per_class, max_count)
+        _, positions = tf.math.top_k(scores, k=k)
+        if k < samples_per_class:
+            positions = tf.tile(positions, [1, -(-samples_per_class // k)])[:, :samples_per_class]
+        positions = positions % tf.expand_dims(chosen_counts, 1)
+
+        batch_indices = tf.gather_nd(
+            tf.gather(members_tensor, chosen),
+            tf.stack([tf.repeat(tf.range(classes_per_batch)[:, tf.newaxis], samples_per_class, axis=1), positions], axis=-1)
+        )
+        batch_labels = tf.repeat(tf.gather(classes_tensor, chosen), samples_per_class)
+        return tf.reshape(batch_indices, [-1]), batch_labels
+
+    def load_images(batch_indices, batch_labels):
+        batch_images = gather(batch_indices)
+        if normalize:
+            batch_images = tf.cast(batch_images, tf.float32) / 255.0
+        return batch_images, batch_labels
+
+    dataset = tf.data.Dataset.range(2 ** 62)
+    dataset = dataset.map(sample_batch_indices, num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.map(load_images, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    return dataset.prefetch(tf.data.AUTOTUNE)
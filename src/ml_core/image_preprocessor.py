@@ -4,26 +4,70 @@ import numpy as np
 
 IMG_SIZE = (128, 128)
 
+def binarize_image(image_bytes: bytes) -> np.ndarray:
+    """
+    Decodifica los bytes de una imagen y la deja binarizada: trazo blanco (255) sobre fondo negro (0).
+    """
+    # 1. Decodificar bytes a escala de grises
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    img_gray = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+    if img_gray is None:
+        raise ValueError("No se pudo decodificar la imagen.")
+    
+    # 2. Binarización (umbral adaptativo e inversión)
+    # El trazo será blanco (255) y el fondo negro (0)
+    block_size = 31 # Ajustar según el grosor del trazo
+    C = 5
+    img_thresh = cv2.adaptiveThreshold(
+        img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+        cv2.THRESH_BINARY_INV, block_size, C
+    )
+
+    # 3. Eliminar ruido (opcional, pero recomendado)
+    return cv2.medianBlur(img_thresh, 3)
+
+
+def center_on_canvas(char_crop: np.ndarray) -> np.ndarray:
+    """
+    Centra un recorte binarizado en un canvas cuadrado sin distorsionarlo y lo
+    normaliza para la red: float32 en [0, 1] con forma (alto, ancho, 1).
+    """
+    h, w = char_crop.shape[:2]
+    
+    # Crear un canvas cuadrado y pegar la letra en el centro
+    canvas = np.zeros(IMG_SIZE, dtype=np.uint8)
+    
+    # Calcular el aspect ratio para redimensionar sin distorsión
+    aspect_ratio = w / h
+    if aspect_ratio > 1: # Más ancha que alta
+        new_w = IMG_SIZE[0]
+        new_h = max(int(new_w / aspect_ratio), 1)
+    else: # Más alta que ancha
+        new_h = IMG_SIZE[1]
+        new_w = max(int(new_h * aspect_ratio), 1)
+
+    resized_char = cv2.resize(char_crop, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    # Calcular posición para pegar
+    pad_x = (IMG_SIZE[0] - new_w) // 2
+    pad_y = (IMG_SIZE[1] - new_h) // 2
+    
+    canvas[pad_y:pad_y+new_h, pad_x:pad_x+new_w] = resized_char
+    
+    # Normalizar para la red neuronal (valores entre 0 y 1)
+    final_img = canvas.astype('float32') / 255.0
+    
+    # Añadir dimensión de canal (Keras/TF lo requiere)
+    return np.expand_dims(final_img, axis=-1)
+
+
 def preprocess_image(image_bytes: bytes) -> np.ndarray:
     """
     Toma los bytes de una imagen, la limpia, estandariza y prepara para el modelo.
     """
     try:
-        # 1. Decodificar bytes a escala de grises
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img_gray = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        # 2. Binarización (umbral adaptativo e inversión)
-        # El trazo será blanco (255) y el fondo negro (0)
-        block_size = 31 # Ajustar según el grosor del trazo
-        C = 5
-        img_thresh = cv2.adaptiveThreshold(
-            img_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY_INV, block_size, C
-        )
-
-        # 3. Eliminar ruido (opcional, pero recomendado)
-        img_denoised = cv2.medianBlur(img_thresh, 3)
+        # 1-3. Decodificar, binarizar y eliminar ruido
+        img_denoised = binarize_image(image_bytes)
 
         # 4. Centrar la letra en un nuevo canvas
         # Encontrar el contorno más grande (la letra)
@@ -35,37 +79,9 @@ def preprocess_image(image_bytes: bytes) -> np.ndarray:
         main_contour = max(contours, key=cv2.contourArea)
         x, y, w, h = cv2.boundingRect(main_contour)
         
-        # Recortar la letra
-        char_crop = img_denoised[y:y+h, x:x+w]
-        
-        # Crear un canvas cuadrado y pegar la letra en el centro
-        canvas = np.zeros(IMG_SIZE, dtype=np.uint8)
-        
-        # Calcular el aspect ratio para redimensionar sin distorsión
-        aspect_ratio = w / h
-        if aspect_ratio > 1: # Más ancha que alta
-            new_w = IMG_SIZE[0]
-            new_h = int(new_w / aspect_ratio)
-        else: # Más alta que ancha
-            new_h = IMG_SIZE[1]
-            new_w = int(new_h * aspect_ratio)
-
-        resized_char = cv2.resize(char_crop, (new_w, new_h), interpolation=cv2.INTER_AREA)
-
-        # Calcular posición para pegar
-        pad_x = (IMG_SIZE[0] - new_w) // 2
-        pad_y = (IMG_SIZE[1] - new_h) // 2
-        
-        canvas[pad_y:pad_y+new_h, pad_x:pad_x+new_w] = resized_char
-        
-        # 5. Normalizar para la red neuronal (valores entre 0 y 1)
-        final_img = canvas.astype('float32') / 255.0
-        
-        # 6. Añadir dimensión de canal (Keras/TF lo requiere)
-        final_img = np.expand_dims(final_img, axis=-1)
-        
-        return final_img
+        # Recortar la letra y 5-6. centrarla y normalizarla
+        return center_on_canvas(img_denoised[y:y+h, x:x+w])
 
     except Exception as e:
         print(f"Error preprocesando la imagen: {e}")
-        raise ValueError("No se pudo procesar la imagen.")
\ No newline at end of file
+        raise ValueError("No se pudo procesar la imagen.")
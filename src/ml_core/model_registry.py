@@ -0,0 +1,226 @@
+# src/ml_core/model_registry.py
+"""
+Registro versionado de modelos y de sus bancos de embeddings de plantillas.
+
+Estructura del directorio del registro:
+
+    ml_models/registry/
+        ACTIVE              # nombre de la versión activa (opcional)
+        v1/
+            saved_model/    # red base exportada para servir (training/export_model.py)
+            model.h5        # o bien la red base tal como la guardó el entrenamiento
+            templates.npz   # banco de embeddings de plantillas, float16 (se crea si no existe)
+        v2/
+            ...
+
+Cada versión guarda su propio banco de plantillas porque los embeddings
+dependen de los pesos del modelo que los generó.
+"""
+import os
+import shutil
+import numpy as np
+import tensorflow as tf
+from typing import List, Optional
+
+from .image_preprocessor import preprocess_image, IMG_SIZE
+from .template_index import TemplateIndex
+
+# Por orden de preferencia: el artefacto de servicio carga más rápido y ocupa menos memoria
+MODEL_FILENAMES = ("saved_model", "model.h5", "model.keras")
+TEMPLATES_FILENAME = "templates.npz"
+ACTIVE_FILENAME = "ACTIVE"
+
+
+class ServingModel:
+    """
+    Envuelve un SavedModel exportado con `export_model.py` y expone la misma
+    interfaz `predict` que un modelo Keras.
+    """
+
+    def __init__(self, saved_model_dir: str, max_batch_size: int = 256):
+        self._module = tf.saved_model.load(saved_model_dir)
+        self._serve = self._module.signatures["serving_default"]
+        self.max_batch_size = max_batch_size
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        outputs = []
+        for begin in range(0, len(batch), self.max_batch_size):
+            chunk = tf.constant(batch[begin:begin + self.max_batch_size], dtype=tf.float32)
+            outputs.append(self._serve(images=chunk)["embedding"].numpy())
+        return np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+
+def load_base_model(model_path: str):
+    """Carga un SavedModel de servicio (directorio) o un modelo Keras (archivo)."""
+    if os.path.isdir(model_path):
+        return ServingModel(model_path)
+    return tf.keras.models.load_model(model_path, compile=False)
+
+
+class LoadedModel:
+    """
+    Una versión del modelo ya cargada en memoria junto con sus plantillas.
+
+    No se modifica después de construirse: el servicio cambia de versión
+    reemplazando la instancia completa, así que una petición que ya tomó una
+    referencia termina con el mismo modelo con el que empezó.
+    """
+
+    def __init__(self, version: str, base_model, templates: TemplateIndex):
+        self.version = version
+        self.base_model = base_model
+        self.templates = templates
+
+    def embed(self, batch: np.ndarray) -> np.ndarray:
+        """Calcula los embeddings de un batch de imágenes preprocesadas."""
+        return self.base_model.predict(batch, verbose=0)
+
+    def warm_up(self):
+        """Ejecuta una inferencia de prueba para que la primera petición real no pague la inicialización."""
+        self.embed(np.zeros((1, *IMG_SIZE, 1), dtype="float32"))
+
+
+def compute_template_embeddings(base_model, templates_dir: str, **index_options) -> TemplateIndex:
+    """
+    Preprocesa las plantillas de `templates_dir` y calcula sus embeddings en una sola llamada a predict.
+
+    El caracter se toma del prefijo del nombre de archivo (`a_ord97_template.png`,
+    `a_ord97_cursiva_template.png`...), así que todos los archivos con el mismo
+    prefijo se conservan como variantes del mismo caracter.
+    """
+    if not os.path.isdir(templates_dir):
+        print(f"ADVERTENCIA: El directorio de plantillas '{templates_dir}' no existe.")
+        return TemplateIndex.from_dict({}, **index_options)
+
+    chars, processed = [], []
+    for filename in sorted(os.listdir(templates_dir)):
+        path = os.path.join(templates_dir, filename)
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        chars.append(filename.split('_')[0])
+        processed.append(preprocess_image(image_bytes))
+
+    if not processed:
+        return TemplateIndex.from_dict({}, **index_options)
+
+    embeddings = base_model.predict(np.stack(processed), verbose=0)
+    return TemplateIndex(chars, embeddings, **index_options)
+
+
+def load_legacy_model(model_path: str, templates_dir: str, **index_options) -> LoadedModel:
+    """
+    Carga un modelo suelto (fuera del registro), como hacía el servicio originalmente.
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"El modelo no se encontró en {model_path}. Asegúrate de entrenarlo y guardarlo.")
+    base_model = load_base_model(model_path)
+    print(f"Modelo base cargado desde {model_path}")
+
+    templates = compute_template_embeddings(base_model, templates_dir, **index_options)
+    print(f"Se cargaron y procesaron {templates.num_variants} plantillas de {len(templates)} caracteres.")
+    return LoadedModel("legacy", base_model, templates)
+
+
+class ModelRegistry:
+    """
+    Acceso al directorio de versiones de modelos.
+    """
+
+    def __init__(self, registry_dir: str, templates_dir: str = "dataset/plantillas", template_aggregation: str = "min"):
+        """
+        Args:
+            registry_dir: Directorio raíz del registro
+            templates_dir: Directorio con las imágenes de plantillas, usado para
+                           construir el banco de embeddings si la versión no lo trae
+            template_aggregation: Cómo combinar las variantes de un caracter ("min" o "softmin")
+        """
+        self.registry_dir = registry_dir
+        self.templates_dir = templates_dir
+        self.template_aggregation = template_aggregation
+
+    def _version_dir(self, version: str) -> str:
+        # Evita que un nombre de versión como "../x" salga del registro
+        if not version or os.path.basename(version) != version or version.startswith('.'):
+            raise ValueError(f"Nombre de versión inválido: '{version}'.")
+        return os.path.join(self.registry_dir, version)
+
+    def _find_model_file(self, version_dir: str) -> Optional[str]:
+        for filename in MODEL_FILENAMES:
+            path = os.path.join(version_dir, filename)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def list_versions(self) -> List[str]:
+        """Devuelve las versiones disponibles, ordenadas por nombre."""
+        if not os.path.isdir(self.registry_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.registry_dir)
+            if os.path.isdir(os.path.join(self.registry_dir, name))
+            and self._find_model_file(os.path.join(self.registry_dir, name)) is not None
+        )
+
+    def get_active_version(self) -> Optional[str]:
+        """
+        Versión marcada en el archivo ACTIVE o, si no existe, la última disponible.
+        """
+        active_path = os.path.join(self.registry_dir, ACTIVE_FILENAME)
+        if os.path.exists(active_path):
+            with open(active_path, 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+            if version:
+                return version
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+    def set_active_version(self, version: str):
+        """Marca `version` como activa reescribiendo ACTIVE de forma atómica."""
+        self._version_dir(version)
+        active_path = os.path.join(self.registry_dir, ACTIVE_FILENAME)
+        tmp_path = active_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, active_path)
+
+    def register(self, version: str, model_path: str) -> str:
+        """
+        Copia un modelo entrenado al registro como una nueva versión.
+
+        Returns:
+            El directorio de la versión creada
+        """
+        version_dir = self._version_dir(version)
+        if os.path.exists(version_dir):
+            raise FileExistsError(f"La versión '{version}' ya existe en el registro.")
+        os.makedirs(version_dir)
+        extension = os.path.splitext(model_path)[1] or ".h5"
+        shutil.copy2(model_path, os.path.join(version_dir, f"model{extension}"))
+        print(f"Versión '{version}' registrada en {version_dir}")
+        return version_dir
+
+    def _load_templates(self, version_dir: str, base_model) -> TemplateIndex:
+        bank_path = os.path.join(version_dir, TEMPLATES_FILENAME)
+        if os.path.exists(bank_path):
+            with np.load(bank_path) as bank:
+                return TemplateIndex(list(bank["chars"]), bank["embeddings"], aggregation=self.template_aggregation)
+
+        # Primera carga de la versión: calcular el banco y guardarlo junto al modelo
+        templates = compute_template_embeddings(base_model, self.templates_dir, aggregation=self.template_aggregation)
+        if len(templates):
+            np.savez(bank_path, chars=templates.row_chars.astype(str), embeddings=templates.matrix)
+        return templates
+
+    def load(self, version: str) -> LoadedModel:
+        """
+        Carga en memoria el modelo y el banco de plantillas de una versión.
+        """
+        version_dir = self._version_dir(version)
+        model_path = self._find_model_file(version_dir)
+        if model_path is None:
+            raise FileNotFoundError(f"No se encontró un modelo para la versión '{version}' en {version_dir}.")
+
+        base_model = load_base_model(model_path)
+        templates = self._load_templates(version_dir, base_model)
+        print(f"Versión '{version}' cargada desde {model_path} con {templates.num_variants} plantillas de {len(templates)} caracteres.")
+        return LoadedModel(version, base_model, templates)
@@ -1,6 +1,12 @@
 # src/ml_core/models/__init__.py
 from .siamese_model import build_base_network, build_siamese_model, euclidean_distance
-from .losses import contrastive_loss
-
-__all__ = ['build_base_network', 'build_siamese_model', 'contrastive_loss', 'euclidean_distance']
+from .losses import (
+    contrastive_loss, siamese_contrastive_accuracy, pairwise_distances,
+    batch_hard_triplet_loss, batch_all_triplet_loss, batch_pair_accuracy
+)
 
+__all__ = [
+    'build_base_network', 'build_siamese_model', 'contrastive_loss', 'euclidean_distance',
+    'siamese_contrastive_accuracy', 'pairwise_distances', 'batch_hard_triplet_loss',
+    'batch_all_triplet_loss', 'batch_pair_accuracy'
+]
@@ -26,3 +26,137 @@ def contrastive_loss(y_true, y_pred, margin: float = 1.0):
     margin_square = K.square(K.maximum(margin - y_pred, 0))
     return K.mean(y_true * square_pred + (1 - y_true) * margin_square)
 
+
+
+def siamese_contrastive_accuracy(y_true, y_pred, threshold: float = 0.5):
+    """
+    Precisión de un modelo siamés entrenado con `contrastive_loss`.
+
+    Un par se clasifica como similar cuando su distancia es menor que `threshold`
+    (la mitad del margen por defecto).
+
+    Args:
+        y_true: Etiquetas verdaderas (1 para pares similares, 0 para diferentes)
+        y_pred: Distancias predichas entre los embeddings
+        threshold: Distancia de corte entre pares similares y diferentes
+
+    Returns:
+        Fracción de pares clasificados correctamente
+    """
+    y_true = tf.cast(y_true, tf.float32)
+    predicted_similar = tf.cast(y_pred < threshold, tf.float32)
+    return K.mean(K.equal(y_true, K.reshape(predicted_similar, K.shape(y_true))))
+
+
+def pairwise_distances(embeddings, squared: bool = False):
+    """
+    Matriz de distancias euclidianas entre todos los embeddings de un batch.
+
+    Se calcula con un único producto de matrices: ||a||² - 2 a·b + ||b||².
+
+    Args:
+        embeddings: Tensor (batch, dim)
+        squared: Si devolver distancias al cuadrado
+
+    Returns:
+        Tensor (batch, batch) de distancias
+    """
+    dot_product = tf.matmul(embeddings, embeddings, transpose_b=True)
+    square_norm = tf.linalg.diag_part(dot_product)
+    distances = tf.expand_dims(square_norm, 1) - 2.0 * dot_product + tf.expand_dims(square_norm, 0)
+    distances = tf.maximum(distances, 0.0)
+    if squared:
+        return distances
+    # El gradiente de sqrt en 0 es infinito: se evita en la diagonal y en duplicados
+    zero_mask = tf.cast(tf.equal(distances, 0.0), tf.float32)
+    distances = tf.sqrt(distances + zero_mask * K.epsilon())
+    return distances * (1.0 - zero_mask)
+
+
+def _label_masks(labels):
+    """Máscaras (batch, batch) de pares positivos (misma clase, sin diagonal) y negativos."""
+    labels = tf.reshape(labels, [-1])
+    same_label = tf.equal(tf.expand_dims(labels, 0), tf.expand_dims(labels, 1))
+    not_diagonal = tf.logical_not(tf.cast(tf.eye(tf.shape(labels)[0]), tf.bool))
+    return tf.logical_and(same_label, not_diagonal), tf.logical_not(same_label)
+
+
+def batch_hard_triplet_loss(labels, embeddings, margin: float = 1.0):
+    """
+    Triplet loss con minado "batch hard".
+
+    Para cada ancla se usan su positivo más lejano y su negativo más cercano
+    dentro del batch. Cada imagen se procesa una sola vez por la red base y
+    todos los tripletes salen de la matriz de distancias del batch.
+
+    Args:
+        labels: Clase de cada imagen del batch
+        embeddings: Embeddings (batch, dim) de la red base
+        margin: Separación mínima deseada entre positivo y negativo
+
+    Returns:
+        Valor de pérdida
+    """
+    distances = pairwise_distances(embeddings)
+    positive_mask, negative_mask = _label_masks(labels)
+
+    hardest_positive = tf.reduce_max(distances * tf.cast(positive_mask, tf.float32), axis=1)
+    # Los no negativos se desplazan por encima del máximo para que no ganen el mínimo
+    max_distance = tf.reduce_max(distances, axis=1, keepdims=True)
+    hardest_negative = tf.reduce_min(distances + max_distance * (1.0 - tf.cast(negative_mask, tf.float32)), axis=1)
+
+    # Anclas sin positivo o sin negativo en el batch no aportan
+    valid = tf.cast(tf.logical_and(tf.reduce_any(positive_mask, axis=1), tf.reduce_any(negative_mask, axis=1)), tf.float32)
+    loss = tf.maximum(hardest_positive - hardest_negative + margin, 0.0) * valid
+    return tf.reduce_sum(loss) / tf.maximum(tf.reduce_sum(valid), 1.0)
+
+
+def batch_all_triplet_loss(labels, embeddings, margin: float = 1.0):
+    """
+    Triplet loss con minado "batch all".
+
+    Evalúa todos los tripletes válidos (ancla, positivo, negativo) del batch y
+    promedia solo los que aún violan el margen, de modo que los negativos
+    fáciles no diluyen la señal de los difíciles y semi-difíciles.
+
+    Args:
+        labels: Clase de cada imagen del batch
+        embeddings: Embeddings (batch, dim) de la red base
+        margin: Separación mínima deseada entre positivo y negativo
+
+    Returns:
+        Valor de pérdida
+    """
+    distances = pairwise_distances(embeddings)
+    positive_mask, negative_mask = _label_masks(labels)
+
+    # triplet[a, p, n] = d(a, p) - d(a, n) + margin
+    triplet_loss = tf.expand_dims(distances, 2) - tf.expand_dims(distances, 1) + margin
+    valid = tf.logical_and(tf.expand_dims(positive_mask, 2), tf.expand_dims(negative_mask, 1))
+    triplet_loss = tf.maximum(triplet_loss * tf.cast(valid, tf.float32), 0.0)
+
+    num_active = tf.reduce_sum(tf.cast(triplet_loss > 1e-16, tf.float32))
+    return tf.reduce_sum(triplet_loss) / tf.maximum(num_active, 1.0)
+
+
+def batch_pair_accuracy(labels, embeddings, threshold: float = 0.5):
+    """
+    Equivalente de `siamese_contrastive_accuracy` sobre todos los pares de un batch.
+
+    Args:
+        labels: Clase de cada imagen del batch
+        embeddings: Embeddings (batch, dim) de la red base
+        threshold: Distancia de corte entre pares similares y diferentes
+
+    Returns:
+        Fracción de pares (sin la diagonal) clasificados correctamente
+    """
+    distances = pairwise_distances(embeddings)
+    positive_mask, negative_mask = _label_masks(labels)
+    predicted_similar = distances < threshold
+    correct = tf.logical_or(
+        tf.logical_and(positive_mask, predicted_similar),
+        tf.logical_and(negative_mask, tf.logical_not(predicted_similar))
+    )
+    num_pairs = tf.reduce_sum(tf.cast(tf.logical_or(positive_mask, negative_mask), tf.float32))
+    return tf.reduce_sum(tf.cast(correct, tf.float32)) / tf.maximum(num_pairs, 1.0)
@@ -6,7 +6,7 @@ import tensorflow as tf
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Conv2D, MaxPooling2D, Flatten, Dense, Dropout, Lambda
 from tensorflow.keras import backend as K
-from typing import Tuple
+from typing import Optional, Tuple
 
 
 def build_base_network(input_shape: Tuple[int, int, int] = (128, 128, 1)):
@@ -61,7 +61,7 @@ def euclidean_distance(vectors):
     return K.sqrt(K.maximum(sum_square, K.epsilon()))
 
 
-def build_siamese_model(input_shape: Tuple[int, int, int] = (128, 128, 1)):
+def build_siamese_model(input_shape: Tuple[int, int, int] = (128, 128, 1), base_network: Optional[Model] = None):
     """
     Construye el modelo siamés completo que toma dos imágenes y calcula su distancia.
     
@@ -69,11 +69,14 @@ def build_siamese_model(input_shape: Tuple[int, int, int] = (128, 128, 1)):
     
     Args:
         input_shape: Forma de las imágenes de entrada (altura, ancho, canales)
+        base_network: Red base ya entrenada a reutilizar (por ejemplo, para ajuste fino).
+                      Si es None, se construye una nueva
         
     Returns:
         Modelo Keras del modelo siamés completo
     """
-    base_network = build_base_network(input_shape)
+    if base_network is None:
+        base_network = build_base_network(input_shape)
     
     # Dos entradas para el par de imágenes
     input_a = Input(shape=input_shape, name="input_a")
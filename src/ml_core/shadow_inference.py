@@ -0,0 +1,147 @@
+# src/ml_core/shadow_inference.py
+"""
+Inferencia en sombra: ejecuta un modelo candidato sobre una fracción del
+tráfico real, fuera del camino crítico, y registra cómo se compara con el
+modelo activo. El resultado de la sombra nunca se devuelve al usuario.
+"""
+import os
+import json
+import time
+import random
+import datetime
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List
+
+from .model_registry import LoadedModel
+
+
+class ShadowInferenceRunner:
+    """
+    Ejecuta el modelo en sombra en un executor propio y escribe una línea JSON
+    por petición muestreada en `log_path`.
+    """
+
+    def __init__(
+        self,
+        shadow_model: LoadedModel,
+        score_fn: Callable[[float], int],
+        sample_rate: float = 0.1,
+        max_workers: int = 1,
+        cpu_share: float = 0.25,
+        max_pending: int = 32,
+        disagreement_threshold: int = 15,
+        log_path: str = "logs/shadow_inference.jsonl"
+    ):
+        """
+        Args:
+            shadow_model: Versión candidata ya cargada
+            score_fn: Función que convierte una distancia en puntuación (la misma que usa el modelo activo)
+            sample_rate: Fracción de peticiones que se envían a la sombra (0.0 a 1.0)
+            max_workers: Hilos dedicados a la sombra
+            cpu_share: Fracción del tiempo que cada hilo puede estar ocupado; tras cada
+                       inferencia duerme lo necesario para no superarla
+            max_pending: Peticiones en cola como máximo; las que excedan se descartan
+            disagreement_threshold: Diferencia de puntuación a partir de la cual se marca un desacuerdo
+            log_path: Archivo JSONL donde se registran las comparaciones
+        """
+        if not 0.0 < cpu_share <= 1.0:
+            raise ValueError("cpu_share debe estar en el intervalo (0, 1].")
+        self.shadow_model = shadow_model
+        self.score_fn = score_fn
+        self.sample_rate = sample_rate
+        self.cpu_share = cpu_share
+        self.disagreement_threshold = disagreement_threshold
+        self.log_path = log_path
+
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow-inference")
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._log_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.stats = {"sampled": 0, "dropped": 0, "compared": 0, "disagreements": 0, "errors": 0}
+
+    @property
+    def version(self) -> str:
+        return self.shadow_model.version
+
+    def maybe_submit(self, batch: np.ndarray, template_chars: List[str], primary_results: List[Dict[str, Any]]) -> bool:
+        """
+        Decide si muestrear la petición y, en ese caso, la encola sin esperar.
+
+        Args:
+            batch: Batch ya preprocesado que usó el modelo activo (no se modifica)
+            template_chars: Caracter esperado para cada elemento del batch
+            primary_results: Distancia y puntuación del modelo activo para cada elemento
+
+        Returns:
+            True si la petición se envió a la sombra
+        """
+        if random.random() >= self.sample_rate:
+            return False
+        # Nunca bloquear al llamante: si la sombra va atrasada, se descarta la muestra
+        if not self._pending.acquire(blocking=False):
+            self._count("dropped")
+            return False
+
+        try:
+            future = self._executor.submit(self._run, batch, template_chars, primary_results)
+        except RuntimeError:
+            # La sombra se desactivó o reemplazó mientras la petición estaba en curso
+            self._pending.release()
+            self._count("dropped")
+            return False
+        self._count("sampled")
+        future.add_done_callback(lambda _: self._pending.release())
+        return True
+
+    def _run(self, batch: np.ndarray, template_chars: List[str], primary_results: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            templates = self.shadow_model.templates
+            all_distances = templates.distances(self.shadow_model.embed(batch))
+            records = []
+            for char, distances, primary in zip(template_chars, all_distances, primary_results):
+                if char not in templates:
+                    continue
+                distance = float(distances[templates.char_to_index[char]])
+                score = self.score_fn(distance)
+                disagreement = abs(score - primary["score"]) >= self.disagreement_threshold
+                records.append({
+                    "timestamp": datetime.datetime.utcnow().isoformat(),
+                    "template_char": char,
+                    "primary_version": primary["version"],
+                    "primary_distance": round(primary["distance"], 4),
+                    "primary_score": primary["score"],
+                    "shadow_version": self.shadow_model.version,
+                    "shadow_distance": round(distance, 4),
+                    "shadow_score": score,
+                    "disagreement": disagreement
+                })
+            self._write(records)
+        except Exception as e:
+            self._count("errors")
+            print(f"Error en la inferencia en sombra ({self.version}): {e}")
+        finally:
+            # Limitar la cuota de CPU: por cada segundo de trabajo, descansar (1/cpu_share - 1) segundos
+            busy = time.perf_counter() - started
+            if self.cpu_share < 1.0:
+                time.sleep(busy * (1.0 / self.cpu_share - 1.0))
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _write(self, records: List[Dict[str, Any]]):
+        with self._log_lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._count("compared", len(records))
+        self._count("disagreements", sum(1 for r in records if r["disagreement"]))
+
+    def shutdown(self):
+        """Deja de aceptar muestras; las que ya están en cola se completan en segundo plano."""
+        self._executor.shutdown(wait=False)
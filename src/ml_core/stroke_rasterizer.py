@@ -0,0 +1,167 @@
+# src/ml_core/stroke_rasterizer.py
+"""
+Entrada vectorial: trazos capturados por una tableta como secuencias de puntos.
+
+Cada trazo es una lista de puntos `[x, y]`, `[x, y, t]` o `[x, y, t, presion]`
+(coordenadas en píxeles del dispositivo, `t` en milisegundos y la presión en
+[0, 1]). Los trazos se dibujan directamente sobre el canvas de 128x128 que
+espera la red, con el mismo encuadre que `center_on_canvas`, sin pasar por
+PNG, decodificación ni umbral adaptativo.
+
+Las métricas de proporción, inclinación y grosor se calculan sobre los
+puntos, que es más barato que sobre la imagen.
+"""
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from .image_preprocessor import IMG_SIZE
+
+Stroke = Sequence[Sequence[float]]
+
+# Grosor del trazo en píxeles del canvas: similar al de una letra preprocesada desde una foto
+DEFAULT_PEN_WIDTH = 10
+# Con presión, el grosor varía entre estos factores del grosor base (presión 0 y 1)
+PRESSURE_WIDTH_RANGE = (0.5, 1.5)
+# El eje principal solo se considera definido si su varianza supera en este factor a la del secundario
+DISTINCT_AXIS_RATIO = 1.5
+
+
+def parse_strokes(strokes: Sequence[Stroke], max_points: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Valida los trazos y los convierte en arrays (n_puntos, 4) float32 con
+    columnas x, y, t, presion (NaN donde el cliente no las envió).
+
+    Raises:
+        ValueError: Si no hay puntos, un punto no tiene 2-4 valores o algún valor no es finito
+    """
+    parsed = []
+    total = 0
+    for stroke in strokes:
+        if len(stroke) == 0:
+            continue
+        points = np.full((len(stroke), 4), np.nan, dtype=np.float32)
+        for i, point in enumerate(stroke):
+            if not 2 <= len(point) <= 4:
+                raise ValueError("Cada punto debe ser [x, y], [x, y, t] o [x, y, t, presion].")
+            points[i, :len(point)] = point
+        if not np.isfinite(points[:, :2]).all():
+            raise ValueError("Las coordenadas de los trazos deben ser números finitos.")
+        parsed.append(points)
+        total += len(points)
+        if max_points is not None and total > max_points:
+            raise ValueError(f"Los trazos superan el máximo de {max_points} puntos.")
+    if not parsed:
+        raise ValueError("No se recibió ningún trazo.")
+    return parsed
+
+
+def _ink_bounds(strokes: List[np.ndarray], pen_width: float):
+    """Escala y desplazamiento que encajan los puntos en el canvas sin distorsionar."""
+    xy = np.concatenate([s[:, :2] for s in strokes])
+    origin = xy.min(axis=0)
+    extent = xy.max(axis=0) - origin
+    # El trazo ocupa medio grosor a cada lado del punto: el encuadre es sobre la tinta, no sobre los puntos
+    usable = np.array(IMG_SIZE, dtype=np.float32) - pen_width
+    # Un eje sin extensión (punto, raya horizontal o vertical) no limita la escala
+    ratios = [u / e for u, e in zip(usable, extent) if e > 0]
+    scale = float(min(ratios)) if ratios else 1.0  # Un solo punto: sin escalar, centrado
+    offset = (np.array(IMG_SIZE, dtype=np.float32) - extent * scale) / 2
+    return origin, scale, offset
+
+
+def _pen_widths(points: np.ndarray, pen_width: float) -> np.ndarray:
+    pressure = points[:, 3]
+    if np.isnan(pressure).all():
+        return np.full(len(points), pen_width, dtype=np.float32)
+    low, high = PRESSURE_WIDTH_RANGE
+    pressure = np.clip(np.nan_to_num(pressure, nan=0.5), 0.0, 1.0)
+    return pen_width * (low + (high - low) * pressure)
+
+
+def rasterize_strokes(strokes: List[np.ndarray], pen_width: float = DEFAULT_PEN_WIDTH) -> np.ndarray:
+    """
+    Dibuja los trazos (de `parse_strokes`) centrados en el canvas.
+
+    Returns:
+        Imagen uint8 (alto, ancho) con el trazo en blanco (255) sobre fondo negro
+    """
+    canvas = np.zeros(IMG_SIZE[::-1], dtype=np.uint8)
+    origin, scale, offset = _ink_bounds(strokes, pen_width)
+    for points in strokes:
+        # Coordenadas de punto fijo (4 bits de fracción) para un trazo suave con LINE_AA
+        xy = np.round(((points[:, :2] - origin) * scale + offset) * 16).astype(np.int32)
+        widths = _pen_widths(points, pen_width)
+        if len(xy) == 1:
+            cv2.circle(canvas, tuple(xy[0]), max(int(widths[0] * 8), 8), 255, -1, cv2.LINE_AA, shift=4)
+        elif np.allclose(widths, widths[0]):
+            cv2.polylines(canvas, [xy], False, 255, max(int(round(widths[0])), 1), cv2.LINE_AA, shift=4)
+        else:
+            # Grosor variable: un segmento por par de puntos con el grosor medio de sus extremos
+            for (p0, p1), width in zip(zip(xy[:-1], xy[1:]), (widths[:-1] + widths[1:]) / 2):
+                cv2.line(canvas, tuple(p0), tuple(p1), 255, max(int(round(width)), 1), cv2.LINE_AA, shift=4)
+    return canvas
+
+
+def strokes_to_model_input(strokes: List[np.ndarray], pen_width: float = DEFAULT_PEN_WIDTH) -> np.ndarray:
+    """Equivalente a `preprocess_image` para trazos: float32 en [0, 1] con forma (alto, ancho, 1)."""
+    canvas = rasterize_strokes(strokes, pen_width).astype('float32') / 255.0
+    return np.expand_dims(canvas, axis=-1)
+
+
+def stroke_geometry(strokes: List[np.ndarray]) -> Dict[str, float]:
+    """
+    Métricas geométricas calculadas sobre los puntos, con los mismos umbrales
+    y escalas que los analizadores de `geometric_analysis`.
+
+    - Proporción: ancho/alto del rectángulo que contiene los puntos.
+    - Inclinación: eje principal de los segmentos (ponderados por longitud, para
+      que la velocidad del lápiz no influya), en grados respecto a la vertical;
+      positivo si se inclina a la derecha. En formas redondas, sin eje dominante, es 0.
+    - Grosor: coeficiente de variación de la presión, si el cliente la envía.
+    """
+    xy = np.concatenate([s[:, :2] for s in strokes]).astype(np.float64)
+    w, h = xy.max(axis=0) - xy.min(axis=0)
+    geometry = {"proporcion_wh": round(float(w / h), 3) if h > 0 else 0.0}
+
+    segments = [(s[:-1, :2].astype(np.float64), s[1:, :2].astype(np.float64)) for s in strokes if len(s) > 1]
+    angle = 0.0
+    if segments:
+        starts = np.concatenate([a for a, _ in segments])
+        ends = np.concatenate([b for _, b in segments])
+        lengths = np.linalg.norm(ends - starts, axis=1)
+        if lengths.sum() > 0:
+            midpoints = (starts + ends) / 2
+            center = np.average(midpoints, axis=0, weights=lengths)
+            # Covarianza de los segmentos como varillas: la de sus centros más la propia de cada segmento
+            delta = midpoints - center
+            direction = ends - starts
+            cov = (
+                (delta * lengths[:, None]).T @ delta
+                + (direction * lengths[:, None]).T @ direction / 12
+            ) / lengths.sum()
+            values, vectors = np.linalg.eigh(cov)  # Autovalores en orden ascendente
+            minor, major = vectors[:, 0], vectors[:, 1]
+            if values[1] < DISTINCT_AXIS_RATIO * values[0]:
+                # Sin eje dominante ('o', '0'): los autovectores son ruido numérico y la
+                # inclinación no está definida, así que se toma como vertical (sin penalizar)
+                vx, vy = 0.0, -1.0
+            elif abs(major[0]) > abs(major[1]) and not np.isclose(abs(major[0]), abs(major[1])):
+                # Letra claramente ancha ('m', 'w'): la inclinación la da el eje secundario
+                vx, vy = minor
+            else:
+                # Eje principal, también en el empate a 45 grados
+                vx, vy = major
+            if vy > 0:  # Orientar el eje hacia arriba (la y de la imagen crece hacia abajo)
+                vx, vy = -vx, -vy
+            angle = float(np.degrees(np.arctan2(vx, -vy)))
+    geometry["inclinacion"] = round(angle, 2) + 0.0  # Evita "-0.0" en el JSON
+    geometry["puntuacion_inclinacion"] = round(max(0.0, 1.0 - abs(angle) / 45.0) * 100)
+
+    pressure = np.concatenate([s[:, 3] for s in strokes])
+    pressure = pressure[~np.isnan(pressure)]
+    if len(pressure) >= 5 and pressure.mean() > 0:
+        variation = float(pressure.std() / pressure.mean())
+        geometry["variacion_grosor"] = round(variation, 3)
+        geometry["puntuacion_consistencia"] = round(max(0.0, 1.0 - variation / 0.5) * 100)
+    return geometry
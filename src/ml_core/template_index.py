@@ -0,0 +1,152 @@
+# src/ml_core/template_index.py
+"""
+Índice de embeddings de plantillas para búsqueda de los caracteres más cercanos.
+"""
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+AGGREGATIONS = ("min", "softmin")
+
+
+class TemplateIndex:
+    """
+    Banco de plantillas con una o varias variantes (fuentes, ejemplares
+    manuscritos...) por caracter, guardadas en una única matriz contigua.
+
+    Las filas se ordenan por caracter para que las variantes de cada uno
+    queden juntas; así la distancia de un batch de consultas a todas las
+    variantes es un producto matricial y la agregación por caracter (mínimo
+    o soft-min) es una reducción por segmentos, sin bucles de Python.
+    """
+
+    # Filas que se convierten a float32 de una vez al calcular distancias
+    CHUNK_ROWS = 4096
+
+    def __init__(
+        self,
+        chars: List[str],
+        embeddings: np.ndarray,
+        aggregation: str = "min",
+        temperature: float = 0.5,
+        dtype=np.float16
+    ):
+        """
+        Args:
+            chars: Caracter de cada fila de `embeddings` (puede repetirse)
+            embeddings: Matriz (num_variantes, dim_embedding)
+            aggregation: "min" (variante más cercana) o "softmin" (mínimo suavizado)
+            temperature: Temperatura del soft-min, en unidades de distancia
+            dtype: Tipo con el que se almacena la matriz en memoria
+        """
+        if len(chars) != len(embeddings):
+            raise ValueError("Debe haber un caracter por cada embedding de plantilla.")
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Agregación desconocida '{aggregation}'. Opciones: {AGGREGATIONS}.")
+        self.aggregation = aggregation
+        self.temperature = temperature
+
+        row_chars = np.array([str(c) for c in chars], dtype=object)
+        order = np.argsort(row_chars, kind="stable")
+        self.row_chars = row_chars[order]
+        self.matrix = np.ascontiguousarray(np.asarray(embeddings)[order], dtype=dtype)
+
+        # Un segmento de filas por caracter
+        unique_chars, starts, counts = np.unique(self.row_chars, return_index=True, return_counts=True)
+        self.chars = [str(c) for c in unique_chars]
+        self.char_to_index = {char: i for i, char in enumerate(self.chars)}
+        self._starts = starts
+        self._counts = counts
+
+        # Normas al cuadrado precalculadas: ||q - t||² = ||q||² + ||t||² - 2·q·t
+        self._sq_norms = np.empty(len(self.matrix), dtype=np.float32)
+        for begin in range(0, len(self.matrix), self.CHUNK_ROWS):
+            block = self.matrix[begin:begin + self.CHUNK_ROWS].astype(np.float32)
+            self._sq_norms[begin:begin + len(block)] = np.einsum('ij,ij->i', block, block)
+
+    @classmethod
+    def from_dict(cls, templates: Dict[str, np.ndarray], **options) -> "TemplateIndex":
+        """
+        Construye el índice desde {caracter: embedding} o {caracter: matriz de variantes}.
+        """
+        chars, rows = [], []
+        for char, embeddings in templates.items():
+            embeddings = np.atleast_2d(embeddings)
+            chars.extend([char] * len(embeddings))
+            rows.append(embeddings)
+        embeddings = np.concatenate(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+        return cls(chars, embeddings, **options)
+
+    def __len__(self) -> int:
+        return len(self.chars)
+
+    def __contains__(self, char: str) -> bool:
+        return char in self.char_to_index
+
+    @property
+    def num_variants(self) -> int:
+        return len(self.matrix)
+
+    def get(self, char: str) -> Optional[np.ndarray]:
+        """Embeddings de todas las variantes de `char` (num_variantes, dim), o None si no existe."""
+        i = self.char_to_index.get(char)
+        if i is None:
+            return None
+        return self.matrix[self._starts[i]:self._starts[i] + self._counts[i]].astype(np.float32)
+
+    def variant_distances(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Distancia euclidiana de cada consulta a cada variante.
+
+        Returns:
+            Matriz (batch, num_variantes)
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        q_sq_norms = np.einsum('ij,ij->i', queries, queries)
+        dots = np.empty((len(queries), len(self.matrix)), dtype=np.float32)
+        for begin in range(0, len(self.matrix), self.CHUNK_ROWS):
+            block = self.matrix[begin:begin + self.CHUNK_ROWS].astype(np.float32)
+            dots[:, begin:begin + len(block)] = queries @ block.T
+        sq_dists = q_sq_norms[:, None] + self._sq_norms[None, :] - 2.0 * dots
+        return np.sqrt(np.maximum(sq_dists, 0.0))
+
+    def distances(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Distancia de cada consulta a cada caracter, agregando sus variantes.
+
+        Args:
+            queries: Embeddings (batch, dim_embedding)
+
+        Returns:
+            Matriz (batch, num_caracteres), con columnas en el orden de `self.chars`
+        """
+        variant_dists = self.variant_distances(queries)
+        min_dists = np.minimum.reduceat(variant_dists, self._starts, axis=1)
+        if self.aggregation == "min":
+            return min_dists
+
+        # Soft-min estable: d_min - T·log(Σ exp(-(d - d_min) / T))
+        shifted = variant_dists - np.repeat(min_dists, self._counts, axis=1)
+        weights = np.add.reduceat(np.exp(-shifted / self.temperature), self._starts, axis=1)
+        return min_dists - self.temperature * np.log(weights)
+
+    def top_k(self, distances: np.ndarray, k: int = 3) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        Los k caracteres más cercanos para cada fila de una matriz de distancias.
+
+        Returns:
+            Tupla de (caracteres por consulta, distancias ordenadas (batch, k))
+        """
+        k = min(k, len(self.chars))
+        if k < len(self.chars):
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(len(self.chars)), (len(distances), 1))
+        candidate_dists = np.take_along_axis(distances, candidates, axis=1)
+        order = np.argsort(candidate_dists, axis=1)
+        columns = np.take_along_axis(candidates, order, axis=1)
+        top_chars = [[self.chars[c] for c in row] for row in columns]
+        return top_chars, np.take_along_axis(candidate_dists, order, axis=1)
+
+    def query(self, queries: np.ndarray, k: int = 3) -> Tuple[List[List[str]], np.ndarray]:
+        """Atajo de `top_k(distances(queries), k)` para consultas en batch."""
+        return self.top_k(self.distances(queries), k)
@@ -1,5 +1,6 @@
 # src/ml_core/training/__init__.py
 from .trainer import SiameseTrainer
+from .export_model import export_serving_model
+from .finetune import finetune
 
-__all__ = ['SiameseTrainer']
-
+__all__ = ['SiameseTrainer', 'export_serving_model', 'finetune']
@@ -0,0 +1,156 @@
+# src/ml_core/training/callbacks.py
+"""
+Callbacks de entrenamiento propios.
+"""
+import json
+import time
+import tensorflow as tf
+from typing import Optional
+
+
+class StepsToTargetCallback(tf.keras.callbacks.Callback):
+    """
+    Registra cuántos pasos de entrenamiento (batches) hacen falta para que una
+    métrica de validación alcance un objetivo. Sirve para comparar la
+    convergencia de distintas estrategias de muestreo o de pérdida.
+    """
+
+    def __init__(
+        self,
+        monitor: str,
+        target: float,
+        mode: str = "max",
+        report_path: Optional[str] = None,
+        images_per_step: Optional[int] = None
+    ):
+        """
+        Args:
+            monitor: Métrica a vigilar (por ejemplo 'val_siamese_contrastive_accuracy')
+            target: Valor objetivo de la métrica
+            mode: 'max' si la métrica mejora al subir, 'min' si mejora al bajar
+            report_path: Archivo JSON donde guardar el resultado al terminar (opcional)
+            images_per_step: Imágenes que pasan por la red base en cada paso, para
+                             informar también de las pasadas hacia delante hasta el objetivo
+        """
+        super().__init__()
+        if mode not in ("max", "min"):
+            raise ValueError("mode debe ser 'max' o 'min'.")
+        self.monitor = monitor
+        self.target = target
+        self.mode = mode
+        self.report_path = report_path
+        self.images_per_step = images_per_step
+        self.steps = 0
+        self.steps_to_target = None
+        self.epoch_to_target = None
+        self.seconds_to_target = None
+        self._start_time = None
+
+    def on_train_begin(self, logs=None):
+        self._start_time = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        value = (logs or {}).get(self.monitor)
+        if value is None or self.steps_to_target is not None:
+            return
+        reached = value >= self.target if self.mode == "max" else value <= self.target
+        if reached:
+            self.steps_to_target = self.steps
+            self.epoch_to_target = epoch + 1
+            self.seconds_to_target = time.perf_counter() - self._start_time
+            print(f"\n{self.monitor} alcanzó {self.target} tras {self.steps} pasos "
+                  f"(época {epoch + 1}, {self.seconds_to_target:.0f} s).")
+
+    def on_train_end(self, logs=None):
+        if self.steps_to_target is None:
+            print(f"\n{self.monitor} no alcanzó {self.target} en {self.steps} pasos.")
+        if self.report_path:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "monitor": self.monitor,
+                    "target": self.target,
+                    "steps_to_target": self.steps_to_target,
+                    "epoch_to_target": self.epoch_to_target,
+                    "seconds_to_target": self.seconds_to_target,
+                    "total_steps": self.steps,
+                    "images_per_step": self.images_per_step,
+                    "forward_passes_to_target": (
+                        self.steps_to_target * self.images_per_step
+                        if self.steps_to_target is not None and self.images_per_step else None
+                    )
+                }, f, indent=2)
+
+
+class PairValidationCallback(tf.keras.callbacks.Callback):
+    """
+    Valida sobre pares fijos cuando se entrena la red base con triplet loss.
+
+    `fit` sobre la red base no conoce los pares de validación; este callback
+    evalúa el modelo siamés (que comparte pesos) al final de cada época y añade
+    `val_loss` y `val_siamese_contrastive_accuracy` a los logs, para que los
+    callbacks posteriores y el historial sean comparables con el modo de pares.
+    Debe ir antes que los callbacks que vigilan esas métricas.
+    """
+
+    def __init__(self, siamese_model: tf.keras.Model, val_dataset: tf.data.Dataset, validation_steps: int):
+        """
+        Args:
+            siamese_model: Modelo siamés compilado que comparte la red base
+            val_dataset: Dataset de pares ((image1, image2), labels)
+            validation_steps: Batches a evaluar por época
+        """
+        super().__init__()
+        self.siamese_model = siamese_model
+        self.val_dataset = val_dataset
+        self.validation_steps = validation_steps
+
+    def on_epoch_end(self, epoch, logs=None):
+        if logs is None:
+            return
+        results = self.siamese_model.evaluate(
+            self.val_dataset, steps=self.validation_steps, verbose=0, return_dict=True
+        )
+        for name, value in results.items():
+            logs['val_' + name] = value
+        print(f" - val_loss: {results['loss']:.4f} - val_siamese_contrastive_accuracy: "
+              f"{results['siamese_contrastive_accuracy']:.4f}")
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """
+    Mide el rendimiento del entrenamiento en ejemplos por segundo.
+
+    Los primeros pasos (trazado del grafo, llenado del prefetch) se descartan
+    para medir solo el régimen estable.
+    """
+
+    def __init__(self, examples_per_step: int, warmup_steps: int = 5):
+        """
+        Args:
+            examples_per_step: Ejemplos procesados por paso (el batch global)
+            warmup_steps: Pasos iniciales que no se cuentan
+        """
+        super().__init__()
+        self.examples_per_step = examples_per_step
+        self.warmup_steps = warmup_steps
+        self.steps = 0
+        self.measured_steps = 0
+        self.seconds = 0.0
+        self._start_time = None
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+        if self.steps == self.warmup_steps:
+            self._start_time = time.perf_counter()
+        elif self.steps > self.warmup_steps:
+            self.measured_steps = self.steps - self.warmup_steps
+            self.seconds = time.perf_counter() - self._start_time
+
+    @property
+    def examples_per_second(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.measured_steps * self.examples_per_step / self.seconds
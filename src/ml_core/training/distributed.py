@@ -0,0 +1,246 @@
+# src/ml_core/training/distributed.py
+"""
+Entrenamiento en paralelo de datos con varios procesos en una sola máquina (CPU).
+
+Un lanzador arranca N procesos worker en localhost con su TF_CONFIG y cada
+uno entrena una réplica del modelo con `MultiWorkerMirroredStrategy`: los
+gradientes se promedian con all-reduce en cada paso. Cada worker lee solo
+su parte de los pares (la entrada se reparte por `input_pipeline_id`) y
+usa cpu_count / N hilos, de modo que entre todos ocupan la máquina entera.
+
+Uso:
+    # Entrenar con 4 workers
+    python -m src.ml_core.training.distributed --workers 4
+
+    # Medir la eficiencia de escalado de 1 a 8 workers
+    python -m src.ml_core.training.distributed --scaling 1 2 4 8 --steps 50
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from typing import Dict, List
+
+# --- CONFIGURACIÓN ---
+CACHE_DIR = "dataset/cache/variations"
+DATASET_DIR = "dataset/variations"
+IMG_SIZE = (128, 128)
+PER_WORKER_BATCH_SIZE = 128
+EPOCHS = 50
+OUTPUT_PATH = "ml_models/distributed/base_handwriting_model.keras"
+SCALING_REPORT_PATH = "ml_models/distributed/scaling_report.json"
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def launch_workers(num_workers: int, worker_args: List[str]):
+    """
+    Arranca `num_workers` procesos worker en localhost y espera a que terminen.
+
+    Si un worker falla se detienen los demás, que si no quedarían bloqueados
+    esperando el all-reduce del worker caído.
+    """
+    cluster = {"worker": [f"localhost:{_free_port()}" for _ in range(num_workers)]}
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env["TF_CONFIG"] = json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}})
+        env["CUDA_VISIBLE_DEVICES"] = "-1"
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "src.ml_core.training.distributed", "--worker", *worker_args], env=env
+        ))
+
+    try:
+        while True:
+            codes = [p.poll() for p in processes]
+            failed = [i for i, code in enumerate(codes) if code not in (None, 0)]
+            if failed:
+                raise RuntimeError(f"El worker {failed[0]} terminó con código {codes[failed[0]]}.")
+            if all(code == 0 for code in codes):
+                return
+            time.sleep(1)
+    finally:
+        for p in processes:
+            if p.poll() is None:
+                p.terminate()
+
+
+def run_worker(args):
+    """Punto de entrada de cada proceso worker (lee su papel de TF_CONFIG)."""
+    tf_config = json.loads(os.environ["TF_CONFIG"])
+    num_workers = len(tf_config["cluster"]["worker"])
+    task_index = tf_config["task"]["index"]
+    is_chief = task_index == 0
+
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+    from .trainer import SiameseTrainer
+    from .callbacks import ThroughputCallback
+    from ..data.data_utils import create_pairs_from_data
+    from ..data.pair_pipeline import build_pair_dataset
+    from ..data.dataset_cache import build_dataset_cache, cache_exists, load_dataset_cache
+
+    # Repartir los núcleos entre los workers en lugar de que cada uno intente usarlos todos
+    tf.config.threading.set_intra_op_parallelism_threads(max((os.cpu_count() or 1) // num_workers, 1))
+    tf.config.threading.set_inter_op_parallelism_threads(2)
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING
+        )
+    )
+
+    if is_chief and not cache_exists(args.cache_dir):
+        build_dataset_cache(DATASET_DIR, args.cache_dir, IMG_SIZE)
+    while not cache_exists(args.cache_dir):
+        time.sleep(1)
+    all_images, all_labels, _ = load_dataset_cache(args.cache_dir)
+
+    # Mismo split y mismos pares en todos los workers: solo cambia la parte que lee cada uno
+    train_idx, val_idx = train_test_split(
+        np.arange(len(all_labels)), test_size=0.2, random_state=42, stratify=all_labels
+    )
+    train_pairs_idx, train_pair_labels = create_pairs_from_data(train_idx, all_labels[train_idx], seed=42)
+    val_pairs_idx, val_pair_labels = create_pairs_from_data(val_idx, all_labels[val_idx], seed=42)
+    train_pairs_idx, val_pairs_idx = train_idx[train_pairs_idx], val_idx[val_pairs_idx]
+
+    global_batch_size = args.batch_size * num_workers
+
+    def make_dataset_fn(pair_indices, pair_labels, shuffle):
+        def dataset_fn(input_context):
+            batch_size = input_context.get_per_replica_batch_size(global_batch_size)
+            shard = slice(input_context.input_pipeline_id, None, input_context.num_input_pipelines)
+            return build_pair_dataset(
+                all_images, pair_indices[shard], pair_labels[shard], batch_size,
+                shuffle=shuffle, repeat=True, seed=42 + input_context.input_pipeline_id
+            )
+        return tf.keras.utils.experimental.DatasetCreator(dataset_fn)
+
+    steps_per_epoch = args.steps or len(train_pairs_idx) // global_batch_size
+    validation_steps = len(val_pairs_idx) // global_batch_size
+
+    output_path = args.output
+    if not is_chief:
+        # Todos los workers deben guardar (el guardado usa operaciones colectivas),
+        # pero solo el chief escribe en la ruta final
+        output_path = os.path.join(tempfile.mkdtemp(), os.path.basename(args.output))
+    output_dir = os.path.dirname(output_path) or "."
+
+    with strategy.scope():
+        trainer = SiameseTrainer(
+            img_shape=(*IMG_SIZE, 1), batch_size=global_batch_size, epochs=args.epochs,
+            model_save_dir=output_dir, model_save_path=output_path,
+            # BackupAndRestore necesita el mismo directorio en todos los workers
+            backup_dir=os.path.join(os.path.dirname(args.output) or ".", "backup")
+        )
+        trainer.build_model()
+
+    throughput = ThroughputCallback(global_batch_size)
+    callbacks = [throughput]
+    if not args.benchmark:
+        # Entrenamiento real: reanudable y validado. Las mediciones de escalado no validan.
+        callbacks += trainer.resume_callbacks(resume=True)
+    trainer.history = trainer.siamese_model.fit(
+        make_dataset_fn(train_pairs_idx, train_pair_labels, shuffle=True),
+        validation_data=None if args.benchmark else make_dataset_fn(val_pairs_idx, val_pair_labels, shuffle=False),
+        validation_steps=None if args.benchmark else validation_steps,
+        epochs=args.epochs,
+        steps_per_epoch=steps_per_epoch,
+        callbacks=callbacks,
+        verbose=2 if is_chief else 0
+    )
+    trainer.base_network.save(output_path)
+    if not is_chief:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return
+
+    print(f"{num_workers} worker(s): {throughput.examples_per_second:.1f} pares/s")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({
+                "num_workers": num_workers,
+                "global_batch_size": global_batch_size,
+                "measured_steps": throughput.measured_steps,
+                "pairs_per_second": throughput.examples_per_second
+            }, f, indent=2)
+
+
+def measure_scaling(worker_counts: List[int], steps: int, batch_size: int, cache_dir: str) -> List[Dict]:
+    """
+    Entrena `steps` pasos con cada número de workers y calcula la eficiencia de escalado.
+
+    La eficiencia es el rendimiento con N workers dividido entre N veces el
+    rendimiento con 1 worker (1.0 = escalado lineal).
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_workers in worker_counts:
+            report_path = os.path.join(tmp_dir, f"workers_{num_workers}.json")
+            launch_workers(num_workers, [
+                "--cache-dir", cache_dir, "--batch-size", str(batch_size), "--epochs", "1",
+                "--steps", str(steps), "--output", os.path.join(tmp_dir, f"model_{num_workers}.keras"),
+                "--report", report_path, "--benchmark"
+            ])
+            with open(report_path, 'r', encoding='utf-8') as f:
+                results.append(json.load(f))
+
+    baseline = next((r for r in results if r["num_workers"] == 1), results[0])
+    baseline_per_worker = baseline["pairs_per_second"] / baseline["num_workers"]
+    print(f"\n{'workers':>8} {'pares/s':>10} {'speedup':>8} {'eficiencia':>10}")
+    for r in results:
+        r["speedup"] = r["pairs_per_second"] / (baseline_per_worker * baseline["num_workers"])
+        r["efficiency"] = r["pairs_per_second"] / (baseline_per_worker * r["num_workers"])
+        print(f"{r['num_workers']:>8} {r['pairs_per_second']:>10.1f} {r['speedup']:>7.2f}x {r['efficiency']:>10.0%}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento en paralelo de datos con varios procesos en CPU.")
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 1) // 4, 1),
+                        help="Procesos worker (por defecto, uno por cada 4 núcleos)")
+    parser.add_argument("--scaling", type=int, nargs="+", metavar="N",
+                        help="Medir la eficiencia de escalado con estos números de workers")
+    parser.add_argument("--steps", type=int, help="Pasos por época (por defecto, todo el dataset)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=PER_WORKER_BATCH_SIZE, help="Batch por worker")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--report", help="JSON donde el chief escribe su rendimiento")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--benchmark", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    if args.scaling:
+        results = measure_scaling(args.scaling, args.steps or 50, args.batch_size, args.cache_dir)
+        os.makedirs(os.path.dirname(SCALING_REPORT_PATH), exist_ok=True)
+        with open(SCALING_REPORT_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Informe de escalado guardado en {SCALING_REPORT_PATH}")
+        return
+
+    worker_args = ["--cache-dir", args.cache_dir, "--batch-size", str(args.batch_size),
+                   "--epochs", str(args.epochs), "--output", args.output]
+    if args.steps:
+        worker_args += ["--steps", str(args.steps)]
+    if args.report:
+        worker_args += ["--report", args.report]
+    print(f"Lanzando {args.workers} worker(s) en localhost...")
+    launch_workers(args.workers, worker_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# src/ml_core/training/export_model.py
+"""
+Exporta la red base (embedding) a un artefacto optimizado para servir.
+
+Acepta tanto la red base guardada por `SiameseTrainer.train` (.h5) como el
+modelo siamés completo guardado por `train_siamese.py` (.keras), y escribe:
+
+    <output_dir>/
+        saved_model/     # SavedModel con la firma 'serving_default' en batch
+        metadata.json    # tamaño de entrada, dimensión del embedding, hash de pesos...
+
+El artefacto no contiene el optimizador, las métricas ni las capas Dropout,
+y su firma tiene la forma de entrada fija salvo la dimensión del batch, así
+que TensorFlow puede plegar constantes y podar el grafo al cargarlo.
+"""
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+import tensorflow as tf
+from typing import Any, Dict, Union
+
+from ..models.siamese_model import euclidean_distance
+from ..models.losses import contrastive_loss
+
+SAVED_MODEL_DIRNAME = "saved_model"
+METADATA_FILENAME = "metadata.json"
+EMBEDDING_OUTPUT_KEY = "embedding"
+
+
+def extract_base_network(model: tf.keras.Model) -> tf.keras.Model:
+    """
+    Devuelve la sub-red de embedding de un modelo siamés, o el propio modelo
+    si ya es la red base (una sola entrada).
+    """
+    if len(model.inputs) == 1:
+        return model
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.Model) and len(layer.inputs) == 1:
+            return layer
+    raise ValueError(f"No se encontró la red base dentro del modelo '{model.name}'.")
+
+
+def load_training_model(path: str) -> tf.keras.Model:
+    """Carga un modelo de entrenamiento (.h5 de la red base o .keras del modelo siamés) sin compilar."""
+    return tf.keras.models.load_model(
+        path, compile=False,
+        custom_objects={"euclidean_distance": euclidean_distance, "contrastive_loss": contrastive_loss}
+    )
+
+
+def strip_training_layers(base_network: tf.keras.Model) -> tf.keras.Model:
+    """
+    Clona la red base reemplazando las capas Dropout por capas identidad y copia los pesos.
+    En inferencia Dropout ya no hace nada, pero sigue ocupando nodos del grafo.
+    """
+    def clone_layer(layer):
+        if isinstance(layer, tf.keras.layers.Dropout):
+            return tf.keras.layers.Activation("linear", name=layer.name)
+        return layer.__class__.from_config(layer.get_config())
+
+    serving_network = tf.keras.models.clone_model(base_network, clone_function=clone_layer)
+    serving_network.set_weights(base_network.get_weights())
+    return serving_network
+
+
+def weights_hash(model: tf.keras.Model) -> str:
+    """SHA-256 de los pesos del modelo, en orden, para identificar el artefacto."""
+    digest = hashlib.sha256()
+    for weight in model.get_weights():
+        digest.update(weight.tobytes())
+    return digest.hexdigest()
+
+
+def export_serving_model(source: Union[str, tf.keras.Model], output_dir: str) -> Dict[str, Any]:
+    """
+    Exporta la red base lista para servir.
+
+    Args:
+        source: Ruta a un modelo (.h5/.keras) o un modelo Keras ya cargado
+        output_dir: Directorio de salida (por ejemplo, una versión del registro)
+
+    Returns:
+        Los metadatos escritos en metadata.json
+    """
+    if isinstance(source, str):
+        print(f"Cargando modelo de entrenamiento desde {source}...")
+        model = load_training_model(source)
+        source_name = source
+    else:
+        model, source_name = source, source.name
+
+    serving_network = strip_training_layers(extract_base_network(model))
+    input_shape = tuple(serving_network.input_shape[1:])
+
+    @tf.function(input_signature=[tf.TensorSpec(shape=(None, *input_shape), dtype=tf.float32, name="images")])
+    def serve(images):
+        return {EMBEDDING_OUTPUT_KEY: serving_network(images, training=False)}
+
+    saved_model_dir = os.path.join(output_dir, SAVED_MODEL_DIRNAME)
+    if os.path.exists(saved_model_dir):
+        shutil.rmtree(saved_model_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    module = tf.Module()
+    module.network = serving_network
+    module.serve = serve
+    tf.saved_model.save(module, saved_model_dir, signatures={"serving_default": serve})
+
+    metadata = {
+        "input_shape": list(input_shape),
+        "embedding_dim": int(serving_network.output_shape[-1]),
+        "weights_sha256": weights_hash(serving_network),
+        "signature": "serving_default",
+        "output_key": EMBEDDING_OUTPUT_KEY,
+        "source": source_name,
+        "tensorflow_version": tf.__version__,
+        "exported_at": datetime.datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(output_dir, METADATA_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"Modelo de servicio exportado en {saved_model_dir} (pesos {metadata['weights_sha256'][:12]}...)")
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta la red base a un SavedModel de servicio.")
+    parser.add_argument("--source", required=True, help="Modelo entrenado (.h5 de la red base o .keras del modelo siamés)")
+    parser.add_argument("--output-dir", help="Directorio de salida")
+    parser.add_argument("--registry-dir", default="ml_models/registry", help="Registro de modelos")
+    parser.add_argument("--version", help="Si se indica, exporta a <registry-dir>/<version>")
+    args = parser.parse_args()
+
+    if not args.output_dir and not args.version:
+        parser.error("Indica --output-dir o --version.")
+    output_dir = args.output_dir or os.path.join(args.registry_dir, args.version)
+    export_serving_model(args.source, output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# src/ml_core/training/finetune.py
+"""
+Ajuste fino incremental de la red base con muestras nuevas de alumnos.
+
+En lugar de entrenar desde cero, parte de la red base de producción y la
+entrena unas pocas épocas con una tasa de aprendizaje baja sobre:
+
+    - el shard nuevo (un directorio con una subcarpeta por clase), y
+    - una muestra de repaso ("replay") de la caché del dataset original,
+      para que el modelo no olvide lo aprendido.
+
+Uso:
+    python -m src.ml_core.training.finetune \
+        --base-model ml_models/base_handwriting_model.h5 \
+        --new-data-dir dataset/new_samples/2026-10-19 --version v2026-10-19
+"""
+import os
+import argparse
+import numpy as np
+from typing import List, Tuple
+
+from .trainer import SiameseTrainer
+from .export_model import load_training_model, extract_base_network, export_serving_model
+from ..data.data_utils import create_pairs_from_data
+from ..data.pair_pipeline import build_pair_dataset
+from ..data.dataset_cache import build_dataset_cache, cache_exists, load_dataset_cache
+
+# --- CONFIGURACIÓN ---
+BASE_MODEL_PATH = "ml_models/base_handwriting_model.h5"
+BASE_CACHE_DIR = "dataset/cache/variations"
+FINETUNE_CACHE_DIR = "dataset/cache/finetune"
+IMG_SIZE = (128, 128)
+FINETUNE_EPOCHS = 3
+FINETUNE_LEARNING_RATE = 1e-4
+# Imágenes antiguas de repaso por cada imagen nueva
+REPLAY_RATIO = 1.0
+BATCH_SIZE = 128
+
+
+def build_replay_mix(
+    new_cache_dir: str,
+    base_cache_dir: str,
+    replay_ratio: float = REPLAY_RATIO,
+    seed: int = 42
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Junta el shard nuevo con una muestra aleatoria del dataset original.
+
+    Las etiquetas del shard nuevo se traducen a las del dataset original por
+    nombre de clase; las clases que no existían se añaden al final.
+
+    Args:
+        new_cache_dir: Caché del shard nuevo (de `dataset_cache.build_dataset_cache`)
+        base_cache_dir: Caché del dataset original
+        replay_ratio: Imágenes antiguas por cada imagen nueva (0 para no repasar)
+        seed: Semilla de la muestra de repaso
+
+    Returns:
+        Tupla de (imágenes uint8, etiquetas, nombres de clase)
+    """
+    new_images, new_labels, new_classes = load_dataset_cache(new_cache_dir)
+    class_names = list(new_classes)
+    replay_images = np.empty((0, *new_images.shape[1:]), dtype=np.uint8)
+    replay_labels = np.empty(0, dtype=np.int32)
+
+    if replay_ratio > 0 and cache_exists(base_cache_dir):
+        base_images, base_labels, base_classes = load_dataset_cache(base_cache_dir)
+        class_names = list(base_classes) + [name for name in new_classes if name not in base_classes]
+        num_replay = min(int(len(new_labels) * replay_ratio), len(base_labels))
+        # Índices ordenados: la lectura del memmap avanza secuencialmente por el archivo
+        replay_idx = np.sort(np.random.default_rng(seed).choice(len(base_labels), num_replay, replace=False))
+        replay_images = base_images[replay_idx]
+        replay_labels = base_labels[replay_idx]
+    elif replay_ratio > 0:
+        print(f"ADVERTENCIA: No existe la caché '{base_cache_dir}'; se ajusta sin muestras de repaso.")
+
+    label_map = np.array([class_names.index(name) for name in new_classes], dtype=np.int32)
+    images = np.concatenate([np.asarray(new_images), replay_images])
+    labels = np.concatenate([label_map[new_labels], replay_labels]).astype(np.int32)
+    print(f"Ajuste fino con {len(new_labels)} imágenes nuevas y {len(replay_labels)} de repaso "
+          f"({len(np.unique(labels))} clases).")
+    return images, labels, class_names
+
+
+def finetune(
+    base_model_path: str,
+    new_data_dir: str,
+    output_path: str,
+    base_cache_dir: str = BASE_CACHE_DIR,
+    epochs: int = FINETUNE_EPOCHS,
+    learning_rate: float = FINETUNE_LEARNING_RATE,
+    replay_ratio: float = REPLAY_RATIO,
+    batch_size: int = BATCH_SIZE,
+    validation_split: float = 0.1,
+    seed: int = 42
+):
+    """
+    Ajusta la red base de producción con el shard nuevo y guarda la red base resultante.
+
+    Returns:
+        El `SiameseTrainer` con el modelo ajustado y su historial
+    """
+    new_cache_dir = os.path.join(FINETUNE_CACHE_DIR, os.path.basename(os.path.normpath(new_data_dir)))
+    if not cache_exists(new_cache_dir):
+        build_dataset_cache(new_data_dir, new_cache_dir, IMG_SIZE)
+    images, labels, _ = build_replay_mix(new_cache_dir, base_cache_dir, replay_ratio, seed)
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(labels))
+    num_val = max(int(len(labels) * validation_split), 1)
+    val_idx, train_idx = order[:num_val], order[num_val:]
+
+    train_pairs_idx, train_pair_labels = create_pairs_from_data(train_idx, labels[train_idx], seed=seed)
+    val_pairs_idx, val_pair_labels = create_pairs_from_data(val_idx, labels[val_idx], seed=seed)
+    train_ds = build_pair_dataset(images, train_idx[train_pairs_idx], train_pair_labels, batch_size, shuffle=True, seed=seed)
+    val_ds = build_pair_dataset(images, val_idx[val_pairs_idx], val_pair_labels, batch_size, shuffle=False)
+
+    print(f"Cargando la red base de producción desde {base_model_path}...")
+    base_network = extract_base_network(load_training_model(base_model_path))
+
+    output_dir = os.path.dirname(output_path) or "."
+    trainer = SiameseTrainer(
+        img_shape=tuple(base_network.input_shape[1:]), batch_size=batch_size, epochs=epochs,
+        model_save_dir=output_dir, model_save_path=output_path,
+        backup_dir=os.path.join(output_dir, "finetune_backup")
+    )
+    trainer.build_model(base_network=base_network, learning_rate=learning_rate)
+
+    print("\n--- INICIANDO AJUSTE FINO ---")
+    trainer.history = trainer.siamese_model.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=epochs,
+        callbacks=trainer.resume_callbacks(resume=True),
+        verbose=1
+    )
+    trainer.base_network.save(output_path)
+    print(f"Red base ajustada guardada en: {output_path}")
+    return trainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajuste fino incremental de la red base con muestras nuevas.")
+    parser.add_argument("--base-model", default=BASE_MODEL_PATH, help="Red base de producción (.h5/.keras)")
+    parser.add_argument("--new-data-dir", required=True, help="Shard nuevo: una subcarpeta por clase")
+    parser.add_argument("--base-cache-dir", default=BASE_CACHE_DIR, help="Caché del dataset original para el repaso")
+    parser.add_argument("--output", default="ml_models/finetuned/base_handwriting_model.keras")
+    parser.add_argument("--epochs", type=int, default=FINETUNE_EPOCHS)
+    parser.add_argument("--learning-rate", type=float, default=FINETUNE_LEARNING_RATE)
+    parser.add_argument("--replay-ratio", type=float, default=REPLAY_RATIO)
+    parser.add_argument("--registry-dir", default="ml_models/registry", help="Registro de modelos")
+    parser.add_argument("--version", help="Si se indica, exporta el modelo ajustado a <registry-dir>/<version>")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    trainer = finetune(
+        args.base_model, args.new_data_dir, args.output, base_cache_dir=args.base_cache_dir,
+        epochs=args.epochs, learning_rate=args.learning_rate, replay_ratio=args.replay_ratio
+    )
+    if args.version:
+        export_serving_model(trainer.base_network, os.path.join(args.registry_dir, args.version))
+
+
+if __name__ == "__main__":
+    main()
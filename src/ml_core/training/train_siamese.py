@@ -1,12 +1,19 @@
 # train_siamese.py
 
 import os
+import argparse
 import tensorflow as tf
 from tensorflow import keras
 import numpy as np
 from sklearn.model_selection import train_test_split
 from src.ml_core.training import SiameseTrainer
 from src.ml_core.data.data_utils import create_pairs_from_data
+from src.ml_core.data.pair_pipeline import build_pair_dataset
+from src.ml_core.data.dataset_cache import build_dataset_cache, cache_exists, load_dataset_cache
+from src.ml_core.data.online_augmentation import load_templates, build_augmented_pair_dataset
+from src.ml_core.data.pk_sampler import build_pk_dataset
+from src.ml_core.data.pair_generator import random_pairs_from_batch
+from src.ml_core.training.callbacks import StepsToTargetCallback, PairValidationCallback
 
 # --- CONFIGURACIÓN ---
 print("TensorFlow Version:", tf.__version__)
@@ -18,8 +25,102 @@ EPOCHS = 50
 MODEL_SAVE_DIR = "ml_models"
 MODEL_SAVE_PATH = os.path.join(MODEL_SAVE_DIR, "base_handwriting_model.keras")
 DATASET_DIR = "dataset/variations"
+CACHE_DIR = "dataset/cache/variations"
+TEMPLATES_DIR = "dataset/plantillas"
+# Aumentación al vuelo: pares nuevos por época y pares fijos de validación
+ONLINE_PAIRS_PER_EPOCH = 100000
+ONLINE_VAL_PAIRS = 10000
+# Muestreo balanceado: P clases x K imágenes por batch
+PK_CLASSES_PER_BATCH = 32
+PK_SAMPLES_PER_CLASS = 4
+
+def build_cached_datasets(pk_sampler: bool = False, triplet: bool = False):
+    """
+    Pares a partir de la caché mapeada en memoria de dataset/variations (aumentación offline).
+
+    Args:
+        pk_sampler: Si True, el entrenamiento usa batches de P clases x K muestras
+                    con emparejamiento aleatorio dentro del batch
+        triplet: Si True, el entrenamiento usa los batches P x K sin emparejar
+                 (imágenes, etiquetas), para triplet loss con minado en el batch
+
+    Returns:
+        Tupla de (train_ds, val_ds, steps_per_epoch, validation_steps)
+    """
+    print("\n=== PASO 1: CARGANDO DATASET DESDE LA CACHÉ MAPEADA EN MEMORIA ===")
+    if not cache_exists(CACHE_DIR):
+        build_dataset_cache(DATASET_DIR, CACHE_DIR, IMG_SIZE)
+    # uint8 mapeado desde disco: no se decodifica ningún PNG ni se crea una copia float32
+    all_images, all_labels, class_names = load_dataset_cache(CACHE_DIR)
+    print(f"Carga completa: {len(all_images)} imágenes de {len(class_names)} clases.")
+
+    # Se separan índices, no imágenes: train y val comparten la misma caché
+    train_idx, val_idx = train_test_split(
+        np.arange(len(all_labels)), test_size=0.2, random_state=42, stratify=all_labels
+    )
+
+    print("\n=== PASO 2: CREANDO PARES DE ÍNDICES ===")
+    train_pairs_idx, train_pair_labels = create_pairs_from_data(train_idx, all_labels[train_idx])
+    val_pairs_idx, val_pair_labels = create_pairs_from_data(val_idx, all_labels[val_idx])
+    # Pasar de posiciones dentro de cada split a índices de la caché
+    train_pairs_idx = train_idx[train_pairs_idx]
+    val_pairs_idx = val_idx[val_pairs_idx]
+
+    print("\n=== PASO 3: CONSTRUYENDO PIPELINE DE DATOS ===")
+    # La validación siempre usa los mismos pares fijos, para comparar entre estrategias
+    val_ds = build_pair_dataset(all_images, val_pairs_idx, val_pair_labels, BATCH_SIZE, shuffle=False, repeat=True)
+    validation_steps = len(val_pairs_idx) // BATCH_SIZE
+
+    if pk_sampler or triplet:
+        train_ds = build_pk_dataset(all_images, all_labels, PK_CLASSES_PER_BATCH, PK_SAMPLES_PER_CLASS, indices=train_idx)
+        if not triplet:
+            # P x K imágenes por batch -> 2 * P * K pares, todos con un positivo válido
+            train_ds = train_ds.map(random_pairs_from_batch, num_parallel_calls=tf.data.AUTOTUNE)
+        steps_per_epoch = len(train_idx) // (PK_CLASSES_PER_BATCH * PK_SAMPLES_PER_CLASS)
+        return train_ds, val_ds, steps_per_epoch, validation_steps
+
+    # Los pares se forman a partir de índices y se normalizan a float32 por batch
+    train_ds = build_pair_dataset(all_images, train_pairs_idx, train_pair_labels, BATCH_SIZE, shuffle=True, repeat=True)
+    return train_ds, val_ds, len(train_pairs_idx) // BATCH_SIZE, validation_steps
+
+
+def build_online_datasets():
+    """
+    Pares aumentados al vuelo desde dataset/plantillas: no requiere dataset/variations.
+
+    Returns:
+        Tupla de (train_ds, val_ds, steps_per_epoch, validation_steps)
+    """
+    print("\n=== PASO 1: CARGANDO PLANTILLAS PARA AUMENTACIÓN AL VUELO ===")
+    templates, class_names = load_templates(TEMPLATES_DIR, IMG_SIZE)
+    print(f"Se cargaron {len(class_names)} plantillas.")
+
+    print("\n=== PASO 2-3: CONSTRUYENDO PIPELINE CON AUMENTACIÓN EN PARALELO ===")
+    steps_per_epoch = ONLINE_PAIRS_PER_EPOCH // BATCH_SIZE
+    validation_steps = ONLINE_VAL_PAIRS // BATCH_SIZE
+    train_ds = build_augmented_pair_dataset(templates, BATCH_SIZE)
+    # Validación fija: se genera una vez y se reutiliza en todas las épocas
+    val_ds = build_augmented_pair_dataset(templates, BATCH_SIZE, num_pairs=validation_steps * BATCH_SIZE).cache().repeat()
+
+    return train_ds, val_ds, steps_per_epoch, validation_steps
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Entrena la red siamesa.")
+    parser.add_argument("--online-augmentation", action="store_true",
+                        help="Aumentar las plantillas al vuelo en lugar de leer dataset/variations")
+    parser.add_argument("--pk-sampler", action="store_true",
+                        help="Batches balanceados de P clases x K muestras con pares aleatorios en el batch")
+    parser.add_argument("--target-val-accuracy", type=float, default=0.9,
+                        help="Objetivo de val_siamese_contrastive_accuracy para medir pasos hasta converger")
+    parser.add_argument("--triplet-mining", choices=["hard", "all"],
+                        help="Entrenar la red base con triplet loss (batch hard / batch all) sobre batches P x K")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Descartar el estado de reanudación guardado y entrenar desde cero")
+    args = parser.parse_args()
+    if args.triplet_mining and args.online_augmentation:
+        parser.error("--triplet-mining requiere la caché de dataset/variations (sin --online-augmentation).")
+
     print("\nVerificando disponibilidad de GPU...")
     gpus = tf.config.list_physical_devices('GPU')
     if gpus:
@@ -30,57 +131,34 @@ def main():
         except RuntimeError as e: print(e)
     else:
         print("ADVERTENCIA: No se detectó ninguna GPU. El entrenamiento será en CPU.")
+        print("Para repartirlo entre todos los núcleos: python -m src.ml_core.training.distributed --workers N")
 
-    print("\n=== PASO 1: CARGANDO DATASET CON TF.DATA (RÁPIDO) ===")
-    full_dataset = tf.keras.utils.image_dataset_from_directory(
-        DATASET_DIR, label_mode='int', color_mode='grayscale', image_size=IMG_SIZE,
-        batch_size=1024,
-        shuffle=False
-    ).unbatch()
-
-    print("Convirtiendo dataset a arrays de NumPy en memoria...")
-    images_list, labels_list = [], []
-    for image, label in full_dataset:
-        images_list.append(image.numpy())
-        labels_list.append(label.numpy())
-    
-    all_images = np.array(images_list, dtype="float32") / 255.0
-    all_labels = np.array(labels_list, dtype="int32")
-    print(f"Carga completa: {len(all_images)} imágenes.")
-
-    train_images, val_images, train_labels, val_labels = train_test_split(
-        all_images, all_labels, test_size=0.2, random_state=42, stratify=all_labels
-    )
-    
-    print("\n=== PASO 2: CREANDO PARES DE ÍNDICES ===")
-    train_pairs_idx, train_pair_labels = create_pairs_from_data(train_images, train_labels)
-    val_pairs_idx, val_pair_labels = create_pairs_from_data(val_images, val_labels)
-
-    print("\n=== PASO 3: CONSTRUYENDO PIPELINE DE DATOS EN MEMORIA ===")
-    def generator(pair_indices, pair_labels, image_data):
-        def gen():
-            for (idx_a, idx_b), label in zip(pair_indices, pair_labels):
-                yield (image_data[idx_a], image_data[idx_b]), label
-        return gen
-
-    output_signature = (
-        (tf.TensorSpec(shape=IMG_SHAPE, dtype=tf.float32), tf.TensorSpec(shape=IMG_SHAPE, dtype=tf.float32)),
-        tf.TensorSpec(shape=(), dtype=tf.float32)
-    )
-
-    train_ds = tf.data.Dataset.from_generator(generator(train_pairs_idx, train_pair_labels, train_images), output_signature=output_signature)
-    val_ds = tf.data.Dataset.from_generator(generator(val_pairs_idx, val_pair_labels, val_images), output_signature=output_signature)
-
-    train_ds = train_ds.shuffle(len(train_pairs_idx)).batch(BATCH_SIZE).repeat().prefetch(tf.data.AUTOTUNE)
-    val_ds = val_ds.batch(BATCH_SIZE).repeat().prefetch(tf.data.AUTOTUNE)
+    if args.online_augmentation:
+        train_ds, val_ds, steps_per_epoch, validation_steps = build_online_datasets()
+    else:
+        train_ds, val_ds, steps_per_epoch, validation_steps = build_cached_datasets(pk_sampler=args.pk_sampler, triplet=bool(args.triplet_mining))
 
     print("\n=== PASO 4: ENTRENANDO MODELO ===")
     trainer = SiameseTrainer(
         img_shape=IMG_SHAPE, batch_size=BATCH_SIZE, epochs=EPOCHS,
         model_save_dir=MODEL_SAVE_DIR, model_save_path=MODEL_SAVE_PATH
     )
-    
-    callbacks = [
+    if args.triplet_mining:
+        # Cada imagen del batch P x K pasa una sola vez por la red base
+        train_model = trainer.build_triplet_model(mining=args.triplet_mining)
+        images_per_step = PK_CLASSES_PER_BATCH * PK_SAMPLES_PER_CLASS
+    else:
+        # Cada par pasa sus dos imágenes por la red base
+        train_model = trainer.build_model()
+        images_per_step = 2 * (2 * PK_CLASSES_PER_BATCH * PK_SAMPLES_PER_CLASS if args.pk_sampler else BATCH_SIZE)
+
+    steps_to_target = StepsToTargetCallback(
+        monitor='val_siamese_contrastive_accuracy', target=args.target_val_accuracy, mode='max',
+        report_path=os.path.join(MODEL_SAVE_DIR, "convergence_report.json"), images_per_step=images_per_step
+    )
+    # Pesos, optimizador y época se guardan cada época: un entrenamiento interrumpido continúa donde se quedó
+    callbacks = trainer.resume_callbacks(resume=not args.fresh) + [
+        steps_to_target,
         keras.callbacks.ModelCheckpoint(
             filepath=os.path.join(MODEL_SAVE_DIR, "best_model.keras"),
             monitor='val_siamese_contrastive_accuracy', mode='max', save_best_only=True, verbose=1
@@ -92,24 +170,26 @@ def main():
             monitor='val_siamese_contrastive_accuracy', patience=5, verbose=1, mode='max', restore_best_weights=True
         )
     ]
-    
-    steps_per_epoch = len(train_pairs_idx) // BATCH_SIZE
-    validation_steps = len(val_pairs_idx) // BATCH_SIZE
 
     # --- ¡CORRECCIÓN AQUÍ! ---
     # La función .fit() de Keras usa los argumentos que definimos dentro de la clase SiameseTrainer.
     # El método .train() dentro de la clase ahora llama a .fit() con la sintaxis correcta.
     # Necesitamos pasar los argumentos correctamente a nuestra función `train`.
-    trainer.history = trainer.model.fit(
+    if args.triplet_mining:
+        # La validación sobre pares la hace el callback, antes que los que vigilan sus métricas
+        callbacks.insert(1, PairValidationCallback(trainer.siamese_model, val_ds, validation_steps))
+        fit_validation = {}
+    else:
+        fit_validation = dict(validation_data=val_ds, validation_steps=validation_steps)
+    trainer.history = train_model.fit(
         train_ds,
-        validation_data=val_ds, # La función .fit() SÍ espera 'validation_data'
         epochs=EPOCHS,
         steps_per_epoch=steps_per_epoch,
-        validation_steps=validation_steps,
         callbacks=callbacks,
-        verbose=1
+        verbose=1,
+        **fit_validation
     )
-    trainer.model.save(trainer.model_save_path)
+    trainer.siamese_model.save(trainer.model_save_path)
 
 
     print("\n=== PASO 5: VISUALIZANDO RESULTADOS ===")
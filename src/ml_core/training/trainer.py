@@ -3,13 +3,22 @@
 Módulo de entrenamiento para la red siamesa.
 """
 import os
+import shutil
 import matplotlib.pyplot as plt
 import tensorflow as tf
-from typing import Dict, Any, Optional
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
+from typing import Dict, Any, List, Optional
+from tensorflow.keras.callbacks import BackupAndRestore, ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
 
 from ..models.siamese_model import build_siamese_model
-from ..models.losses import contrastive_loss
+from ..models.losses import (
+    contrastive_loss, siamese_contrastive_accuracy,
+    batch_hard_triplet_loss, batch_all_triplet_loss, batch_pair_accuracy
+)
+
+TRIPLET_LOSSES = {
+    "hard": batch_hard_triplet_loss,
+    "all": batch_all_triplet_loss,
+}
 
 
 class SiameseTrainer:
@@ -23,7 +32,8 @@ class SiameseTrainer:
         batch_size: int = 64,
         epochs: int = 15,
         model_save_dir: str = "ml_models",
-        model_save_path: Optional[str] = None
+        model_save_path: Optional[str] = None,
+        backup_dir: Optional[str] = None
     ):
         """
         Args:
@@ -32,12 +42,15 @@ class SiameseTrainer:
             epochs: Número de épocas
             model_save_dir: Directorio para guardar el modelo
             model_save_path: Ruta completa para guardar el modelo (si None, usa model_save_dir/base_handwriting_model.h5)
+            backup_dir: Directorio del estado de reanudación (pesos, optimizador y época).
+                        Si None, usa model_save_dir/backup
         """
         self.img_shape = img_shape
         self.batch_size = batch_size
         self.epochs = epochs
         self.model_save_dir = model_save_dir
         self.model_save_path = model_save_path or os.path.join(model_save_dir, "base_handwriting_model.h5")
+        self.backup_dir = backup_dir or os.path.join(model_save_dir, "backup")
         
         # Crear directorio si no existe
         os.makedirs(model_save_dir, exist_ok=True)
@@ -47,11 +60,87 @@ class SiameseTrainer:
         self.base_network = None
         self.history = None
     
+    def build_model(self, base_network: Optional[tf.keras.Model] = None, learning_rate: Optional[float] = None):
+        """
+        Construye y compila el modelo siamés y su red base.
+
+        Args:
+            base_network: Red base ya entrenada de la que partir (ajuste fino); None para una nueva
+            learning_rate: Tasa de aprendizaje de Adam; None para la de Keras por defecto
+        """
+        print("\n--- CONSTRUYENDO MODELO ---")
+        self.siamese_model, self.base_network = build_siamese_model(self.img_shape, base_network=base_network)
+        
+        # Crear wrapper para la función de pérdida con margen
+        def contrastive_loss_wrapper(y_true, y_pred):
+            return contrastive_loss(y_true, y_pred, margin=1.0)
+        
+        # Compilar el modelo
+        self.siamese_model.compile(
+            loss=contrastive_loss_wrapper,
+            optimizer=tf.keras.optimizers.Adam(learning_rate) if learning_rate else "adam",
+            metrics=[siamese_contrastive_accuracy]
+        )
+        
+        self.siamese_model.summary()
+        return self.siamese_model
+
+    def build_triplet_model(self, mining: str = "hard", margin: float = 1.0):
+        """
+        Construye el modelo y compila la red base para entrenar con triplet loss.
+
+        Se entrena directamente la red base sobre batches (imágenes, etiquetas)
+        de P clases x K muestras: cada imagen se procesa una vez por paso y los
+        positivos y negativos se minan en la matriz de distancias del batch.
+        El modelo siamés comparte pesos con la red base y sigue sirviendo para
+        validar sobre pares.
+
+        Args:
+            mining: 'hard' (batch hard) o 'all' (batch all)
+            margin: Margen de la triplet loss
+
+        Returns:
+            La red base compilada
+        """
+        if mining not in TRIPLET_LOSSES:
+            raise ValueError(f"mining debe ser uno de {sorted(TRIPLET_LOSSES)}.")
+        self.build_model()
+        triplet_loss = TRIPLET_LOSSES[mining]
+
+        def triplet_loss_wrapper(y_true, y_pred):
+            return triplet_loss(y_true, y_pred, margin=margin)
+
+        self.base_network.compile(
+            loss=triplet_loss_wrapper,
+            optimizer="adam",
+            metrics=[batch_pair_accuracy]
+        )
+        return self.base_network
+    
+    def resume_callbacks(self, resume: bool = True) -> List[tf.keras.callbacks.Callback]:
+        """
+        Callbacks para que un entrenamiento interrumpido continúe donde se quedó.
+
+        BackupAndRestore guarda al final de cada época los pesos, el estado del
+        optimizador y el número de época en backup_dir, los restaura al inicio
+        de `fit` si existen y los borra cuando el entrenamiento termina bien.
+
+        Args:
+            resume: Si False, descarta cualquier estado previo y empieza de cero
+        """
+        if not resume and os.path.exists(self.backup_dir):
+            print(f"Descartando el estado de reanudación en {self.backup_dir}")
+            shutil.rmtree(self.backup_dir)
+        elif os.path.exists(self.backup_dir):
+            print(f"Reanudando el entrenamiento desde {self.backup_dir}")
+        return [BackupAndRestore(backup_dir=self.backup_dir)]
+
     def train(
         self,
         train_dataset: tf.data.Dataset,
         val_dataset: tf.data.Dataset,
-        verbose: int = 1
+        verbose: int = 1,
+        resume: bool = True
     ) -> Dict[str, Any]:
         """
         Entrena el modelo siamés.
@@ -60,28 +149,16 @@ class SiameseTrainer:
             train_dataset: Dataset de entrenamiento con pares ((image1, image2), labels)
             val_dataset: Dataset de validación con pares ((image1, image2), labels)
             verbose: Verbosidad del entrenamiento (0, 1, o 2)
+            resume: Si continuar desde el último estado guardado en backup_dir
+                    (pesos, optimizador y época) cuando un entrenamiento anterior se interrumpió
             
         Returns:
             Diccionario con el historial de entrenamiento
         """
-        print("\n--- CONSTRUYENDO MODELO ---")
-        self.siamese_model, self.base_network = build_siamese_model(self.img_shape)
-        
-        # Crear wrapper para la función de pérdida con margen
-        def contrastive_loss_wrapper(y_true, y_pred):
-            return contrastive_loss(y_true, y_pred, margin=1.0)
-        
-        # Compilar el modelo
-        self.siamese_model.compile(
-            loss=contrastive_loss_wrapper,
-            optimizer="adam",
-            metrics=["accuracy"]
-        )
-        
-        self.siamese_model.summary()
+        self.build_model()
         
         # Callbacks para mejorar el entrenamiento
-        callbacks = [
+        callbacks = self.resume_callbacks(resume) + [
             ModelCheckpoint(
                 filepath=self.model_save_path.replace('.h5', '_checkpoint.h5'),
                 monitor='val_loss',
@@ -145,9 +222,10 @@ class SiameseTrainer:
         
         # Gráfico de accuracy
         plt.subplot(1, 2, 2)
-        if 'accuracy' in self.history.history:
-            plt.plot(self.history.history['accuracy'], label='Training Accuracy')
-            plt.plot(self.history.history['val_accuracy'], label='Validation Accuracy')
+        accuracy_key = 'siamese_contrastive_accuracy'
+        if accuracy_key in self.history.history:
+            plt.plot(self.history.history[accuracy_key], label='Training Accuracy')
+            plt.plot(self.history.history['val_' + accuracy_key], label='Validation Accuracy')
             plt.title('Accuracy del Entrenamiento')
             plt.xlabel('Epoch')
             plt.ylabel('Accuracy')
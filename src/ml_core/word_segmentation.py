@@ -0,0 +1,185 @@
+# src/ml_core/word_segmentation.py
+"""
+Segmentación de una palabra manuscrita en glifos.
+
+A partir de la imagen binarizada (trazo blanco sobre negro):
+
+    1. Componentes conexas: cada trazo continuo es un candidato a glifo.
+    2. Fusión: los componentes que se solapan en horizontal se unen, lo que
+       recoge los puntos de la 'i' y la 'j', la tilde de la 'ñ' y los trazos
+       partidos de una misma letra.
+    3. División: una caja mucho más ancha que el resto (letras que se tocan)
+       se parte por las columnas con menos tinta (proyección vertical).
+    4. Si el número de cajas no cuadra con la palabra esperada, `fit_to_count`
+       parte la más ancha o une las más próximas hasta que cuadre.
+
+Las cajas resultantes se asignan, de izquierda a derecha, a los caracteres
+esperados de la palabra; un dígrafo como 'Ch' o 'll' ocupa dos glifos si se
+escribió separado o uno si se escribió unido.
+"""
+import cv2
+import numpy as np
+from typing import Iterable, List, Sequence, Tuple
+
+from .image_preprocessor import center_on_canvas
+
+Box = Tuple[int, int, int, int]  # (x, y, ancho, alto)
+
+# Componentes con menos área que esta fracción del mayor se consideran ruido
+MIN_AREA_RATIO = 0.02
+# Solape horizontal mínimo (sobre el ancho del más estrecho) para fusionar dos componentes
+MERGE_OVERLAP_RATIO = 0.5
+# Una caja más ancha que esto por la altura mediana se intenta dividir
+SPLIT_WIDTH_RATIO = 1.6
+# Ancho típico de una letra respecto a la altura mediana, para estimar en cuántas partir
+GLYPH_ASPECT = 0.8
+
+
+def _union(a: Box, b: Box) -> Box:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def _horizontal_overlap(a: Box, b: Box) -> float:
+    overlap = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    return max(overlap, 0) / max(min(a[2], b[2]), 1)
+
+
+def _merge_overlapping(boxes: List[Box]) -> List[Box]:
+    """Une las cajas que comparten columnas (puntos, tildes, trazos partidos)."""
+    merged: List[Box] = []
+    for box in sorted(boxes, key=lambda b: b[0]):
+        if merged and _horizontal_overlap(merged[-1], box) >= MERGE_OVERLAP_RATIO:
+            merged[-1] = _union(merged[-1], box)
+        else:
+            merged.append(box)
+    return merged
+
+
+def _split_wide(binary: np.ndarray, box: Box, pieces: int) -> List[Box]:
+    """Parte una caja demasiado ancha en `pieces` por los valles de la proyección vertical de tinta."""
+    x, y, w, h = box
+    if pieces < 2 or w < 2 * pieces:
+        return [box]
+
+    projection = (binary[y:y + h, x:x + w] > 0).sum(axis=0).astype(np.float32)
+    # Suavizado para que un píxel suelto no cree un valle falso
+    projection = np.convolve(projection, np.ones(3, dtype=np.float32) / 3, mode="same")
+    cuts = []
+    for i in range(1, pieces):
+        # Buscar el valle cerca de cada corte ideal, no en toda la caja
+        center = int(i * w / pieces)
+        radius = max(int(w / pieces / 3), 1)
+        lo, hi = max(center - radius, 1), min(center + radius, w - 1)
+        if lo < hi:
+            cuts.append(lo + int(np.argmin(projection[lo:hi])))
+    edges = [0] + sorted(set(cuts)) + [w]
+
+    result = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        rows = np.flatnonzero((binary[y:y + h, x + start:x + end] > 0).any(axis=1))
+        if end > start and len(rows):
+            result.append((x + start, y + int(rows[0]), end - start, int(rows[-1] - rows[0] + 1)))
+    return result or [box]
+
+
+def segment_glyphs(binary: np.ndarray) -> List[Box]:
+    """
+    Devuelve las cajas de los glifos de una imagen binarizada, de izquierda a derecha.
+
+    Args:
+        binary: Imagen uint8 con el trazo en blanco (255) sobre fondo negro
+
+    Returns:
+        Lista de cajas (x, y, ancho, alto)
+    """
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    # La etiqueta 0 es el fondo
+    components = stats[1:]
+    if len(components) == 0:
+        return []
+    min_area = components[:, cv2.CC_STAT_AREA].max() * MIN_AREA_RATIO
+    boxes = [
+        (int(c[cv2.CC_STAT_LEFT]), int(c[cv2.CC_STAT_TOP]), int(c[cv2.CC_STAT_WIDTH]), int(c[cv2.CC_STAT_HEIGHT]))
+        for c in components if c[cv2.CC_STAT_AREA] >= min_area
+    ]
+    boxes = _merge_overlapping(boxes)
+
+    # Letras unidas: la referencia es la altura típica (el ancho varía mucho entre 'l' y 'm')
+    median_height = max(float(np.median([b[3] for b in boxes])), 1.0)
+    result: List[Box] = []
+    for box in boxes:
+        if box[2] > SPLIT_WIDTH_RATIO * median_height:
+            result.extend(_split_wide(binary, box, int(round(box[2] / (GLYPH_ASPECT * median_height)))))
+        else:
+            result.append(box)
+    return result
+
+
+def fit_to_count(binary: np.ndarray, boxes: Sequence[Box], count: int) -> List[Box]:
+    """
+    Ajusta la segmentación al número de glifos esperado: parte la caja más
+    ancha mientras falten y une las dos vecinas más próximas mientras sobren.
+    """
+    boxes = sorted(boxes, key=lambda b: b[0])
+    while 0 < len(boxes) < count:
+        widest = max(range(len(boxes)), key=lambda i: boxes[i][2])
+        pieces = _split_wide(binary, boxes[widest], 2)
+        if len(pieces) < 2:
+            break
+        boxes[widest:widest + 1] = pieces
+    while len(boxes) > count > 0:
+        gaps = [boxes[i + 1][0] - (boxes[i][0] + boxes[i][2]) for i in range(len(boxes) - 1)]
+        closest = int(np.argmin(gaps))
+        boxes[closest:closest + 2] = [_union(boxes[closest], boxes[closest + 1])]
+    return boxes
+
+
+def tokenize_word(word: str, characters: Iterable[str]) -> List[str]:
+    """
+    Divide la palabra esperada en caracteres con plantilla, prefiriendo los
+    dígrafos: 'Chillo' -> ['Ch', 'i', 'll', 'o'].
+    """
+    known = set(characters)
+    longest = max((len(c) for c in known), default=1)
+    tokens, i = [], 0
+    while i < len(word):
+        for length in range(min(longest, len(word) - i), 0, -1):
+            candidate = word[i:i + length]
+            if candidate in known:
+                tokens.append(candidate)
+                i += length
+                break
+        else:
+            raise ValueError(f"No hay plantilla para el caracter '{word[i]}' de la palabra '{word}'.")
+    return tokens
+
+
+def assign_boxes(boxes: Sequence[Box], tokens: Sequence[str]) -> List[Box]:
+    """
+    Asigna las cajas a los caracteres esperados, en orden.
+
+    Si hay una caja por letra, cada dígrafo une las suyas; si hay una caja
+    por caracter, se usan tal cual.
+    """
+    if len(boxes) == len(tokens):
+        return list(boxes)
+    if len(boxes) == sum(len(token) for token in tokens):
+        assigned, i = [], 0
+        for token in tokens:
+            box = boxes[i]
+            for extra in boxes[i + 1:i + len(token)]:
+                box = _union(box, extra)
+            assigned.append(box)
+            i += len(token)
+        return assigned
+    raise ValueError(
+        f"Se detectaron {len(boxes)} glifos pero se esperaban {len(tokens)} caracteres "
+        f"({''.join(tokens)}). Escribe las letras un poco más separadas."
+    )
+
+
+def crop_glyphs(binary: np.ndarray, boxes: Sequence[Box]) -> np.ndarray:
+    """Recorta y centra cada caja como entrada del modelo: (N, alto, ancho, 1) float32."""
+    return np.stack([center_on_canvas(binary[y:y + h, x:x + w]) for x, y, w, h in boxes])
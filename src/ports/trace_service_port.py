@@ -20,4 +20,22 @@ class ITraceServicePort(ABC):
         Returns:
             True si la notificación fue exitosa, False en caso contrario.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def notify_analysis_batch(self, analyses: Dict[uuid.UUID, Dict[str, Any]]) -> Dict[uuid.UUID, bool]:
+        """
+        Envía los resultados de varios análisis de una vez.
+
+        La implementación por defecto notifica uno a uno; los adaptadores pueden
+        sobrescribirla para enviarlos en paralelo o en una sola llamada.
+
+        Args:
+            analyses: Resultados de cada análisis, por ID de práctica.
+
+        Returns:
+            Si la notificación de cada práctica fue exitosa.
+        """
+        return {
+            practice_id: self.notify_analysis_complete(practice_id, analysis_data)
+            for practice_id, analysis_data in analyses.items()
+        }
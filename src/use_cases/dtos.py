@@ -1,5 +1,6 @@
 # src/use_cases/dtos.py
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
 import uuid
 
 # DTO para la petición que recibe este servicio (desde el bus de eventos o una API)
@@ -12,4 +13,24 @@ class AnalysisRequestDTO(BaseModel):
 class AnalysisResponseDTO(BaseModel):
     practice_id: str
     status: str
-    message: str
\ No newline at end of file
+    message: str
+
+# DTO de respuesta de la subida directa: en modo síncrono incluye los resultados
+class AnalysisUploadResponseDTO(AnalysisResponseDTO):
+    results: Optional[Dict[str, Any]] = None
+
+# DTO de la entrada vectorial: trazos de una tableta en lugar de una imagen.
+# Cada trazo es una lista de puntos [x, y], [x, y, t] o [x, y, t, presion]
+class StrokeAnalysisRequestDTO(BaseModel):
+    practice_id: uuid.UUID
+    template_char: str
+    strokes: List[List[List[float]]]
+
+# DTOs del análisis masivo: muchas prácticas en una sola petición
+class AnalysisBulkRequestDTO(BaseModel):
+    items: List[AnalysisRequestDTO]
+
+class AnalysisBulkResponseDTO(BaseModel):
+    status: str
+    message: str
+    items: List[AnalysisResponseDTO]
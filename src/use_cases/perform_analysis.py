@@ -1,8 +1,11 @@
 # src/use_cases/perform_analysis.py
+import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from src.ml_core.analysis_service import HandwritingAnalysisService
 from src.ports.trace_service_port import ITraceServicePort
-from .dtos import AnalysisRequestDTO, AnalysisResponseDTO
+from .dtos import AnalysisRequestDTO, AnalysisResponseDTO, StrokeAnalysisRequestDTO
 
 class PerformAnalysisUseCase:
     """
@@ -16,6 +19,73 @@ class PerformAnalysisUseCase:
         self.analysis_service = analysis_service
         self.trace_service_adapter = trace_service_adapter
 
+    def analyze(self, image_bytes: bytes, template_char: str) -> dict:
+        """Ejecuta solo el análisis de IA sobre una imagen ya disponible."""
+        print("Iniciando análisis con el modelo de IA...")
+        analysis_results = self.analysis_service.analyze_handwriting(
+            image_bytes=image_bytes,
+            template_char=template_char
+        )
+        print("Análisis de IA completado.")
+        return analysis_results
+
+    def analyze_word(self, image_bytes: bytes, expected_word: str) -> dict:
+        """Analiza una imagen con una palabra completa, glifo a glifo."""
+        print(f"Iniciando análisis de la palabra '{expected_word}'...")
+        analysis_results = self.analysis_service.analyze_word(image_bytes=image_bytes, expected_word=expected_word)
+        print(f"Análisis de {len(analysis_results['glifos'])} glifos completado.")
+        return analysis_results
+
+    def analyze_strokes(self, strokes: List[List[List[float]]], template_char: str, pen_width: Optional[float] = None) -> dict:
+        """Analiza un caracter enviado como trazos vectoriales, sin imagen intermedia."""
+        print(f"Iniciando análisis de {len(strokes)} trazos...")
+        options = {} if pen_width is None else {"pen_width": pen_width}
+        analysis_results = self.analysis_service.analyze_strokes(strokes=strokes, template_char=template_char, **options)
+        print("Análisis de IA completado.")
+        return analysis_results
+
+    def notify(self, practice_id: uuid.UUID, analysis_results: dict) -> AnalysisResponseDTO:
+        """Notifica al TraceService los resultados de un análisis ya hecho."""
+        success = self.trace_service_adapter.notify_analysis_complete(
+            practice_id=practice_id,
+            analysis_data=analysis_results
+        )
+        if not success:
+            return AnalysisResponseDTO(practice_id=str(practice_id), status="ERROR", message="Falló la notificación al TraceService.")
+        return AnalysisResponseDTO(
+            practice_id=str(practice_id),
+            status="COMPLETED",
+            message="Análisis completado y notificado exitosamente."
+        )
+
+    def execute_bytes(
+        self,
+        practice_id: uuid.UUID,
+        template_char: str,
+        image_bytes: bytes,
+        word_mode: bool = False
+    ) -> AnalysisResponseDTO:
+        """
+        Analiza una imagen recibida directamente (sin descargarla) y notifica el resultado.
+        Con `word_mode`, `template_char` es la palabra completa esperada.
+        """
+        try:
+            analyze = self.analyze_word if word_mode else self.analyze
+            analysis_results = analyze(image_bytes, template_char)
+            return self.notify(practice_id, analysis_results)
+        except Exception as e:
+            print(f"Error durante el caso de uso de análisis: {e}")
+            return AnalysisResponseDTO(practice_id=str(practice_id), status="ERROR", message=f"Ocurrió un error inesperado: {e}")
+
+    def execute_strokes(self, request: StrokeAnalysisRequestDTO, pen_width: Optional[float] = None) -> AnalysisResponseDTO:
+        """Analiza los trazos de una práctica y notifica el resultado."""
+        try:
+            analysis_results = self.analyze_strokes(request.strokes, request.template_char, pen_width)
+            return self.notify(request.practice_id, analysis_results)
+        except Exception as e:
+            print(f"Error durante el caso de uso de análisis: {e}")
+            return AnalysisResponseDTO(practice_id=str(request.practice_id), status="ERROR", message=f"Ocurrió un error inesperado: {e}")
+
     def execute(self, request: AnalysisRequestDTO) -> AnalysisResponseDTO:
         try:
             # 1. Descargar la imagen desde la URL proporcionada
@@ -23,35 +93,72 @@ class PerformAnalysisUseCase:
             response = requests.get(request.image_url, timeout=10)
             response.raise_for_status()
             image_bytes = response.content
-            
-            # 2. Llamar al servicio de IA para obtener los resultados
-            print("Iniciando análisis con el modelo de IA...")
-            analysis_results = self.analysis_service.analyze_handwriting(
-                image_bytes=image_bytes,
-                template_char=request.template_char
-            )
-            print("Análisis de IA completado.")
-
-            # 3. Notificar al TraceService con los resultados
-            success = self.trace_service_adapter.notify_analysis_complete(
-                practice_id=request.practice_id,
-                analysis_data=analysis_results
-            )
-
-            if not success:
-                raise RuntimeError("Falló la notificación al TraceService.")
-                
-            return AnalysisResponseDTO(
-                practice_id=str(request.practice_id),
-                status="COMPLETED",
-                message="Análisis completado y notificado exitosamente."
-            )
-
         except requests.exceptions.RequestException as e:
             print(f"Error al descargar la imagen: {e}")
             # Aquí podrías notificar al TraceService que hubo un error
             return AnalysisResponseDTO(practice_id=str(request.practice_id), status="ERROR", message="No se pudo descargar la imagen.")
+
+        # 2. Analizar y 3. notificar al TraceService con los resultados
+        return self.execute_bytes(request.practice_id, request.template_char, image_bytes)
+
+    def execute_bulk(self, items: List[AnalysisRequestDTO], max_parallel_downloads: int = 8) -> List[AnalysisResponseDTO]:
+        """
+        Analiza muchas prácticas de una vez (por ejemplo, una hoja de ejercicios completa).
+
+        Las descargas se hacen en paralelo, el preprocesamiento y la inferencia
+        como un único batch y las notificaciones en bloque. Cada práctica recibe
+        su propio estado: un fallo en una no afecta a las demás.
+        """
+        # 1. Descargar todas las imágenes en paralelo, reutilizando conexiones
+        with requests.Session() as session:
+            def download(item: AnalysisRequestDTO) -> Optional[bytes]:
+                try:
+                    response = session.get(item.image_url, timeout=10)
+                    response.raise_for_status()
+                    return response.content
+                except requests.exceptions.RequestException as e:
+                    print(f"Error al descargar la imagen de {item.practice_id}: {e}")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=max(min(max_parallel_downloads, len(items)), 1)) as executor:
+                downloads = list(executor.map(download, items))
+
+        responses: List[Optional[AnalysisResponseDTO]] = [None] * len(items)
+        downloaded = []
+        for i, (item, image_bytes) in enumerate(zip(items, downloads)):
+            if image_bytes is None:
+                responses[i] = AnalysisResponseDTO(practice_id=str(item.practice_id), status="ERROR", message="No se pudo descargar la imagen.")
+            else:
+                downloaded.append(i)
+
+        # 2. Un único batch para preprocesar y puntuar todas las imágenes descargadas
+        print(f"Analizando {len(downloaded)} de {len(items)} prácticas en un único batch...")
+        try:
+            outcomes = self.analysis_service.analyze_handwriting_batch(
+                [(downloads[i], items[i].template_char) for i in downloaded]
+            )
         except Exception as e:
-            print(f"Error durante el caso de uso de análisis: {e}")
-            # Aquí también podrías notificar un error
-            return AnalysisResponseDTO(practice_id=str(request.practice_id), status="ERROR", message=f"Ocurrió un error inesperado: {e}")
\ No newline at end of file
+            # Fallo del batch completo (modelo, memoria...): cada práctica recibe su ERROR
+            print(f"Error en el análisis por lotes: {e}")
+            outcomes = [e] * len(downloaded)
+        analyses = {}
+        for i, outcome in zip(downloaded, outcomes):
+            if isinstance(outcome, Exception):
+                responses[i] = AnalysisResponseDTO(practice_id=str(items[i].practice_id), status="ERROR", message=f"Ocurrió un error en el análisis: {outcome}")
+            else:
+                analyses[i] = outcome
+
+        # 3. Notificar al TraceService todos los resultados en bloque
+        notified = self.trace_service_adapter.notify_analysis_batch(
+            {items[i].practice_id: analysis for i, analysis in analyses.items()}
+        )
+        for i in analyses:
+            practice_id = items[i].practice_id
+            if notified.get(practice_id):
+                responses[i] = AnalysisResponseDTO(practice_id=str(practice_id), status="COMPLETED", message="Análisis completado y notificado exitosamente.")
+            else:
+                responses[i] = AnalysisResponseDTO(practice_id=str(practice_id), status="ERROR", message="Falló la notificación al TraceService.")
+
+        completed = sum(response.status == "COMPLETED" for response in responses)
+        print(f"Análisis masivo terminado: {completed}/{len(items)} prácticas completadas.")
+        return responses
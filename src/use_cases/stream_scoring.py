@@ -0,0 +1,249 @@
+# src/use_cases/stream_scoring.py
+"""
+Puntuación incremental mientras el alumno escribe.
+
+Cada conexión mantiene una `StrokeStreamSession` con los trazos recibidos
+hasta el momento. Cuando el dibujo cambia, la sesión pide una nueva
+puntuación como mucho cada `min_interval` segundos y nunca tiene más de una
+en vuelo: los cambios que llegan mientras tanto se agrupan en la siguiente.
+
+Las peticiones de todas las sesiones pasan por un único `InferenceBatcher`,
+que las junta en batches para que cientos de sesiones compartan las pasadas
+por la red en lugar de lanzar una cada una.
+"""
+import time
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from src.ml_core.analysis_service import HandwritingAnalysisService
+from src.ml_core.stroke_rasterizer import parse_strokes, DEFAULT_PEN_WIDTH
+
+# Puntos mínimos del dibujo para que tenga sentido puntuarlo
+MIN_POINTS_TO_SCORE = 2
+
+
+class TokenBucket:
+    """Limitador de mensajes por sesión: `rate` por segundo con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class InferenceBatcher:
+    """
+    Junta las peticiones de puntuación de todas las sesiones en batches.
+
+    Un solo hilo ejecuta la inferencia: mientras corre un batch, las peticiones
+    nuevas se acumulan en la cola y salen juntas en el siguiente, de modo que
+    el tamaño del batch crece solo con la carga.
+    """
+
+    def __init__(
+        self,
+        analysis_service: HandwritingAnalysisService,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 10.0,
+        pen_width: float = DEFAULT_PEN_WIDTH
+    ):
+        """
+        Args:
+            analysis_service: Servicio que puntúa los trazos
+            max_batch_size: Peticiones máximas por pasada
+            max_wait_ms: Espera máxima para completar un batch desde que llega su primera petición
+            pen_width: Grosor del trazo en píxeles del canvas
+        """
+        self.analysis_service = analysis_service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pen_width = pen_width
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0, "inference_seconds": 0.0}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-inference")
+
+    async def score(self, strokes: List[np.ndarray], template_char: str) -> dict:
+        """
+        Puntúa el dibujo actual de una sesión.
+
+        Raises:
+            ValueError: Si el caracter no tiene plantilla
+        """
+        if self._worker is None or self._worker.done():
+            # Se crean con el primer uso, dentro del bucle de eventos del servidor
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((strokes, template_char, future))
+        return await future
+
+    async def _next_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Las sesiones que se cerraron mientras esperaban ya no necesitan su puntuación
+        return [item for item in batch if not item[2].done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                outcomes = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self.analysis_service.analyze_strokes_batch(
+                        [(strokes, char) for strokes, char, _ in batch], self.pen_width, submit_shadow=False
+                    )
+                )
+            except Exception as e:
+                print(f"Error en la inferencia del streaming: {e}")
+                outcomes = [e] * len(batch)
+
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            self.stats["inference_seconds"] += time.perf_counter() - started
+            for (_, _, future), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+
+class StrokeStreamSession:
+    """
+    Estado de una sesión de escritura: los trazos recibidos y la lógica para
+    repuntuar con límite de frecuencia.
+
+    Los arrays de los trazos nunca se modifican en sitio, así que la lista
+    puede copiarse sin coste para puntuarla mientras siguen llegando cambios.
+    """
+
+    def __init__(
+        self,
+        batcher: InferenceBatcher,
+        template_char: str,
+        min_interval: float = 0.25,
+        max_points: int = 5000
+    ):
+        """
+        Args:
+            batcher: Batcher compartido por todas las sesiones
+            template_char: Caracter que escribe el alumno
+            min_interval: Segundos mínimos entre dos puntuaciones de la sesión
+            max_points: Puntos máximos entre todos los trazos
+        """
+        self.batcher = batcher
+        self.template_char = template_char
+        self.min_interval = min_interval
+        self.max_points = max_points
+        self.strokes: List[np.ndarray] = []
+        self.num_points = 0
+        # Número de cambios aplicados; cada puntuación indica a qué revisión corresponde
+        self.revision = 0
+        self.last_results: Optional[dict] = None
+        self._changed = asyncio.Event()
+        self._last_scored_at = 0.0
+
+    def _check_limit(self, new_points: int):
+        if self.num_points + new_points > self.max_points:
+            raise ValueError(f"El dibujo supera el máximo de {self.max_points} puntos.")
+
+    def _touch(self):
+        self.revision += 1
+        self._changed.set()
+
+    def add_stroke(self, points: Sequence[Sequence[float]]):
+        """Empieza un trazo nuevo con los puntos dados."""
+        parsed = parse_strokes([points])[0]
+        self._check_limit(len(parsed))
+        self.strokes.append(parsed)
+        self.num_points += len(parsed)
+        self._touch()
+
+    def extend_stroke(self, points: Sequence[Sequence[float]]):
+        """Añade puntos al último trazo (el alumno sigue escribiéndolo)."""
+        if not self.strokes:
+            self.add_stroke(points)
+            return
+        parsed = parse_strokes([points])[0]
+        self._check_limit(len(parsed))
+        self.strokes[-1] = np.concatenate([self.strokes[-1], parsed])
+        self.num_points += len(parsed)
+        self._touch()
+
+    def undo(self):
+        """Elimina el último trazo."""
+        if self.strokes:
+            self.num_points -= len(self.strokes.pop())
+            self._touch()
+
+    def clear(self):
+        self.strokes = []
+        self.num_points = 0
+        self._touch()
+
+    async def score_now(self) -> dict:
+        """Puntúa el dibujo actual sin esperar al límite de frecuencia (por ejemplo, al terminar)."""
+        if self.num_points < MIN_POINTS_TO_SCORE:
+            raise ValueError("No hay suficientes trazos para puntuar.")
+        self._last_scored_at = asyncio.get_running_loop().time()
+        self.last_results = await self.batcher.score(list(self.strokes), self.template_char)
+        return self.last_results
+
+    async def run_scorer(self, send: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """
+        Repuntúa cada vez que el dibujo cambia, como mucho cada `min_interval`
+        segundos, y envía las puntuaciones parciales con `send`. Se ejecuta
+        hasta que se cancela.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._changed.wait()
+            wait = self._last_scored_at + self.min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Todo lo que llegó durante la espera entra en esta puntuación
+            self._changed.clear()
+            if self.num_points < MIN_POINTS_TO_SCORE:
+                continue
+
+            revision = self.revision
+            try:
+                results = await self.score_now()
+            except ValueError as e:
+                await send({"type": "error", "detail": str(e)})
+                continue
+            except Exception as e:
+                # Fallo de la inferencia (modelo, memoria...): se avisa y se sigue con el próximo cambio
+                print(f"Error al puntuar la sesión de trazos: {e}")
+                await send({"type": "error", "detail": f"Ocurrió un error al puntuar: {e}"})
+                continue
+            await send({"type": "score", "revision": revision, "results": results})
@@ -0,0 +1,40 @@
+# test_stroke_geometry.py
+"""
+Comprobaciones de `stroke_geometry` con trazos sintéticos (sin modelo ni datos).
+
+Uso:
+    python test_stroke_geometry.py
+"""
+import numpy as np
+
+from src.ml_core.stroke_rasterizer import parse_strokes, stroke_geometry
+
+# Número de puntos con los que se muestrea cada figura: la inclinación no debe depender de él
+POINT_COUNTS = [5, 8, 13, 20, 37, 50, 64, 100, 257]
+TOLERANCE_DEGREES = 1.0
+
+
+def sampled_ellipse(num_points: int, rx: float, ry: float, cx: float = 50, cy: float = 50):
+    t = np.linspace(0, 2 * np.pi, num_points)
+    return [list(zip(cx + rx * np.cos(t), cy + ry * np.sin(t)))]
+
+
+def test_round_shapes_are_upright():
+    """Círculos y elipses sin inclinar: ~0 grados y puntuación completa, con cualquier número de puntos."""
+    for rx, ry in [(30, 30), (30, 40), (40, 30), (30, 33)]:
+        for num_points in POINT_COUNTS:
+            geometry = stroke_geometry(parse_strokes(sampled_ellipse(num_points, rx, ry)))
+            assert abs(geometry["inclinacion"]) <= TOLERANCE_DEGREES, (rx, ry, num_points, geometry)
+            assert geometry["puntuacion_inclinacion"] >= 97, (rx, ry, num_points, geometry)
+
+
+def test_diagonal_stroke():
+    """Un trazo hacia arriba a la derecha se inclina +45 grados; el simétrico, -45."""
+    assert stroke_geometry(parse_strokes([[[0, 50], [50, 0]]]))["inclinacion"] == 45.0
+    assert stroke_geometry(parse_strokes([[[0, 0], [50, 50]]]))["inclinacion"] == -45.0
+
+
+if __name__ == "__main__":
+    test_round_shapes_are_upright()
+    test_diagonal_stroke()
+    print("Comprobaciones de stroke_geometry superadas.")